@@ -1,9 +1,26 @@
+import atexit
+import json
 import os
-from flask import Flask, request, jsonify
+import time
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
+from src.cache import LRUCache
+from src.database.cache import DigitalTwinCache
+from src.database.changes import EVICTED, ChangeBus
+from src.database.connection import get_driver
+from src.database.embedded import EmbeddedBatteryRepository, EmbeddedStore
+from src.database.markets import MarketRegistry
+from src.database.owner_status import OwnerStatusStore, serialize
 from src.database.repository import BatteryRepository
+from src.database.rulesets import RuleSetRegistry
+from src.database.schema import apply_schema
+from src.database.telemetry import downsample, parse_timestamp
+from src.database.write_buffer import MeasurementWriteBuffer
 from src.engine.decision import DecisionEngine
+from src.engine.memo import DecisionMemo
+from src.ingest import ingest_stream, read_lines
+from src.metrics import metrics
 
 load_dotenv()
 
@@ -16,6 +33,188 @@ NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_DB_PASSWORD")
 NEO4J_DB_NAME = os.getenv("NEO4J_DB_NAME", "neo4j")
 
+# Storage backend: "neo4j" (default) or "embedded" (in-process store, no Neo4j server; run a single worker)
+REPOSITORY_BACKEND = (os.getenv("REPOSITORY_BACKEND") or "neo4j").lower()
+if REPOSITORY_BACKEND not in ("neo4j", "embedded"):
+    raise ValueError(f"Unknown REPOSITORY_BACKEND: {REPOSITORY_BACKEND} (expected neo4j or embedded)")
+# JSON file loaded at startup and saved on exit by the embedded backend (unset = start empty, keep nothing)
+EMBEDDED_DATA_FILE = os.getenv("EMBEDDED_DATA_FILE") or None
+
+# Upper bound on IDs accepted by /recycler/evaluate/batch
+MAX_BATCH_SIZE = int(os.getenv("RECYCLER_MAX_BATCH_SIZE") or 1000)
+
+# Rows per UNWIND write in /garagist/battery/bulk
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE") or 500)
+
+# Upper bound on buckets returned by /garagist/battery/<id>/telemetry
+TELEMETRY_MAX_BUCKETS = int(os.getenv("TELEMETRY_MAX_BUCKETS") or 1000)
+
+# Optional per-worker digital twin cache (disabled when TWIN_CACHE_MAX_ENTRIES is 0)
+TWIN_CACHE_MAX_ENTRIES = int(os.getenv("TWIN_CACHE_MAX_ENTRIES") or 0)
+TWIN_CACHE_TTL = float(os.getenv("TWIN_CACHE_TTL") or 60)
+twin_cache = DigitalTwinCache(
+    max_entries=TWIN_CACHE_MAX_ENTRIES,
+    ttl_seconds=TWIN_CACHE_TTL,
+    market_ttl_seconds=TWIN_CACHE_TTL
+) if TWIN_CACHE_MAX_ENTRIES > 0 else None
+
+# Optional materialized owner-status read model (SQLite file shared by the workers of this host);
+# when set, /proprietaire/status is served from it (build it with `maintenance rebuild-owner-status`)
+OWNER_STATUS_STORE = os.getenv("OWNER_STATUS_STORE") or None
+owner_status_store = OwnerStatusStore(OWNER_STATUS_STORE) if OWNER_STATUS_STORE else None
+
+# Per-worker change bus pushing repository writes to GET /battery/events/<id> subscribers
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE") or 64)
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS") or 10000)
+# Keep-alive (and cross-worker version check) interval; streams end after EVENTS_STREAM_SECONDS
+# and the browser reconnects, which keeps sync Gunicorn workers under their timeout
+EVENTS_HEARTBEAT_INTERVAL = float(os.getenv("EVENTS_HEARTBEAT_INTERVAL") or 10)
+EVENTS_STREAM_SECONDS = float(os.getenv("EVENTS_STREAM_SECONDS") or 25)
+change_bus = ChangeBus(max_queue=EVENTS_QUEUE_SIZE, max_subscribers=EVENTS_MAX_SUBSCRIBERS)
+
+# In-memory MarketConfig registry, re-checked for changes every MARKET_REFRESH_INTERVAL seconds
+MARKET_REFRESH_INTERVAL = float(os.getenv("MARKET_REFRESH_INTERVAL") or 60)
+market_registry = MarketRegistry(refresh_interval=MARKET_REFRESH_INTERVAL)
+
+embedded_store = None
+if REPOSITORY_BACKEND == "embedded":
+    embedded_store = EmbeddedStore.open(EMBEDDED_DATA_FILE)
+    market_registry.install(embedded_store.market_rows())
+
+# Per-route / per-stage / per-query instrumentation, exposed on /metrics (METRICS_ENABLED=false turns it off)
+metrics.enabled = (os.getenv("METRICS_ENABLED") or "true").lower() in ("1", "true", "yes")
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_started_at = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started_at = g.pop('request_started_at', None)
+    if started_at is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.http_requests_total.inc((route, request.method, str(response.status_code)))
+        metrics.http_request_seconds.observe((route, request.method), time.perf_counter() - started_at)
+    return response
+
+# Shared decision engine; identical attribute fingerprints reuse memoized scores (0 disables)
+DECISION_MEMO_SIZE = int(os.getenv("DECISION_MEMO_SIZE") or 4096)
+decision_engine = DecisionEngine(memo=DecisionMemo(DECISION_MEMO_SIZE) if DECISION_MEMO_SIZE > 0 else None)
+
+# Versioned business rules (RULES_FILE, else the active :RuleSet node), hot-swapped into decision_engine
+RULES_FILE = os.getenv("RULES_FILE") or None
+RULES_REFRESH_INTERVAL = float(os.getenv("RULES_REFRESH_INTERVAL") or 60)
+rule_registry = RuleSetRegistry(decision_engine, path=RULES_FILE, refresh_interval=RULES_REFRESH_INTERVAL)
+
+def get_repository():
+    """Repository of the configured backend; the Neo4j one borrows sessions from this worker's pooled driver."""
+    if embedded_store is not None:
+        return EmbeddedBatteryRepository(embedded_store, owner_status=owner_status_store, changes=change_bus)
+    driver = get_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    return BatteryRepository(
+        database_name=NEO4J_DB_NAME, driver=driver, cache=twin_cache, markets=market_registry,
+        owner_status=owner_status_store, changes=change_bus
+    )
+
+# Optional write-behind buffer for PATCH /garagist/battery/<id> (disabled when WRITE_BUFFER_FLUSH_INTERVAL is 0)
+WRITE_BUFFER_FLUSH_INTERVAL = float(os.getenv("WRITE_BUFFER_FLUSH_INTERVAL") or 0)
+WRITE_BUFFER_MAX_PENDING = int(os.getenv("WRITE_BUFFER_MAX_PENDING") or 500)
+write_buffer = MeasurementWriteBuffer(
+    lambda updates: get_repository().update_battery_measurements_batch(updates),
+    flush_interval=WRITE_BUFFER_FLUSH_INTERVAL,
+    max_pending=WRITE_BUFFER_MAX_PENDING
+) if WRITE_BUFFER_FLUSH_INTERVAL > 0 else None
+if write_buffer is not None:
+    atexit.register(write_buffer.close)
+
+# Battery IDs already found in Neo4j (batteries are never deleted), so a buffered PATCH
+# only reads the graph the first time this worker sees a battery
+known_batteries = LRUCache(max_entries=max(WRITE_BUFFER_MAX_PENDING, 100000))
+
+def battery_exists(battery_id):
+    """Existence check for buffered PATCHes, served from known_batteries when possible."""
+    if known_batteries.get(battery_id):
+        return True
+    exists = get_repository().battery_exists(battery_id)
+    if exists:
+        known_batteries.put(battery_id, True)
+    return exists
+
+def save_embedded_store():
+    """Persist the embedded backend to EMBEDDED_DATA_FILE (after the write buffer is drained)."""
+    if embedded_store is not None and EMBEDDED_DATA_FILE:
+        embedded_store.save(EMBEDDED_DATA_FILE)
+
+# atexit runs handlers in reverse order: registered after write_buffer.close, so it runs after it
+atexit.register(save_embedded_store)
+
+def sync_measurements(battery_id=None):
+    """Read-your-writes barrier: flush buffered PATCHes (of one battery, or all) before touching Neo4j."""
+    if write_buffer is None:
+        return
+    if battery_id is None:
+        write_buffer.flush()
+    else:
+        write_buffer.barrier(battery_id)
+
+def battery_etag(version):
+    """ETag of a battery's read endpoints: Battery.version, bumped by every repository write."""
+    return f"v{version}"
+
+def not_modified(version):
+    """304 response if the request's If-None-Match matches `version`, else None."""
+    if version is None or not request.if_none_match.contains_weak(battery_etag(version)):
+        return None
+    response = Response(status=304)
+    response.set_etag(battery_etag(version))
+    return response
+
+def sse_message(event, data, event_id=None):
+    """One server-sent event (`data` is a single-line JSON string)."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {data}"]
+    return "\n".join(lines) + "\n\n"
+
+def status_message(payload, version):
+    """`status` event: the GET /proprietaire/status payload, with the battery's ETag as event ID."""
+    return sse_message('status', payload.decode('utf-8').rstrip('\n'), battery_etag(version))
+
+def change_message(event, data, sent_version):
+    """
+    (SSE message or None, version sent) for a change bus event; status events
+    not newer than the last version sent are skipped.
+    """
+    if event == 'status':
+        version = data.get('version') or 0
+        if sent_version is not None and version <= sent_version:
+            return None, sent_version
+        return status_message(serialize(data), version), version
+    if event == EVICTED:
+        return sse_message(EVICTED, '{}'), sent_version
+    return sse_message(event, json.dumps(data, separators=(',', ':'))), sent_version
+
+def refresh_markets():
+    """Load the market registry on first use, then re-check it (the embedded backend installs its own)."""
+    if embedded_store is None:
+        market_registry.ensure_fresh(get_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD), NEO4J_DB_NAME)
+
+def is_known_market(market_id):
+    """Check a market ID against the in-memory registry (loaded on first use)."""
+    refresh_markets()
+    return market_registry.has(market_id)
+
+def ensure_rules():
+    """Install the current rule set into decision_engine (loaded on first use, then re-checked)."""
+    if RULES_FILE is None and embedded_store is not None:
+        return  # No :RuleSet nodes without Neo4j: BusinessRules defaults
+    driver = get_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD) if RULES_FILE is None else None
+    rule_registry.ensure_fresh(driver, NEO4J_DB_NAME)
+
+# Optional idempotent schema bootstrap (constraints + indexes) at startup
+if REPOSITORY_BACKEND == "neo4j" and os.getenv("NEO4J_APPLY_SCHEMA", "").lower() in ("1", "true", "yes"):
+    apply_schema(get_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD), NEO4J_DB_NAME)
+
 # Recycler endpoint - takes only an ID and runs the decision algorithm
 @app.route('/recycler/evaluate', methods=['POST'])
 def recycler_evaluate():
@@ -27,28 +226,150 @@ def recycler_evaluate():
         if not battery_id:
             return jsonify({'error': 'Battery ID is required'}), 400
         
-        # Connect to Neo4j
-        repo = BatteryRepository(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, database_name=NEO4J_DB_NAME)
-        engine = DecisionEngine()
+        if not is_known_market(market_id):
+            return jsonify({'error': 'Market config not found'}), 404
+        
+        ensure_rules()
+        repo = get_repository()
+        
+        # Read digital twin, run decision algorithm and save decision in one transaction
+        result = repo.evaluate_and_save_decision(battery_id, decision_engine, market_id)
         
+        if not result:
+            return jsonify({'error': 'Battery not found'}), 404
+        
+        # Return the scores (4 string-integer pairs)
+        return jsonify(result['scores']), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def evaluate_twins(digital_twins):
+    """
+    Score {battery_id: twin} in one vectorized pass; if the batch raises, log it
+    and score each twin alone so a malformed twin only fails its own battery.
+    Returns ({battery_id: result}, [{id, error}]).
+    """
+    try:
+        results = decision_engine.evaluate_batch(list(digital_twins.values()))
+        return dict(zip(digital_twins, results)), []
+    except Exception:
+        app.logger.exception("Batch evaluation of %d twins failed, scoring each twin alone", len(digital_twins))
+        if metrics.enabled:
+            metrics.engine_batch_fallbacks_total.inc(())
+    decisions, errors = {}, []
+    for battery_id, twin in digital_twins.items():
         try:
-            # Get digital twin data
-            digital_twin = repo.get_digital_twin(battery_id, market_id)
-            
-            if not digital_twin:
-                return jsonify({'error': 'Battery not found'}), 404
-            
-            # Run decision algorithm
-            result = engine.evaluate_battery(digital_twin)
-            
-            # Save decision to database
-            decision_id = repo.save_decision(battery_id, result, market_id)
-            
-            # Return the scores (4 string-integer pairs)
-            return jsonify(result['scores']), 200
-            
-        finally:
-            repo.close()
+            decisions[battery_id] = decision_engine.evaluate_battery(twin)
+        except Exception as e:
+            errors.append({'id': battery_id, 'error': f'Evaluation failed: {e}'})
+    return decisions, errors
+
+# Recycler batch endpoint - evaluates a list of IDs with one read and one write round-trip
+@app.route('/recycler/evaluate/batch', methods=['POST'])
+def recycler_evaluate_batch():
+    try:
+        data = request.get_json() or {}
+        battery_ids = data.get('ids')
+        market_id = data.get('market_id', 'MKT_STD_2024')
+        
+        if not isinstance(battery_ids, list) or not battery_ids or \
+                not all(isinstance(battery_id, str) for battery_id in battery_ids):
+            return jsonify({'error': 'A non-empty list of battery IDs is required'}), 400
+        
+        if len(battery_ids) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} battery IDs per batch'}), 400
+        
+        if not is_known_market(market_id):
+            return jsonify({'error': 'Market config not found'}), 404
+        
+        battery_ids = list(dict.fromkeys(battery_ids))  # dedupe, keep order
+        ensure_rules()
+        repo = get_repository()
+        
+        # Get all digital twins in one UNWIND query
+        digital_twins = repo.get_digital_twins(battery_ids, market_id)
+        found_ids = [battery_id for battery_id in battery_ids if battery_id in digital_twins]
+        
+        # Run decision algorithm on the whole batch (per twin if the batch fails)
+        decisions, failures = evaluate_twins({battery_id: digital_twins[battery_id] for battery_id in found_ids})
+        
+        # Save all decisions in one write transaction
+        repo.save_decisions(decisions, market_id)
+        
+        return jsonify({
+            'market_id': market_id,
+            'results': [
+                {'id': battery_id, 'scores': decisions[battery_id]['scores']}
+                for battery_id in found_ids if battery_id in decisions
+            ],
+            'errors': [
+                {'id': battery_id, 'error': 'Battery not found'}
+                for battery_id in battery_ids if battery_id not in digital_twins
+            ] + failures
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def unknown_markets(market_ids):
+    """Market IDs of `market_ids` missing from the in-memory registry (loaded on first use)."""
+    refresh_markets()
+    return [market_id for market_id in market_ids or [] if not market_registry.has(market_id)]
+
+def parse_markets_request(data):
+    """(battery_id, market_ids or None, save) of a multi-market request, or an error message."""
+    battery_id = data.get('id')
+    market_ids = data.get('market_ids')
+    if not battery_id:
+        return None, 'Battery ID is required'
+    if market_ids is not None and (not isinstance(market_ids, list) or not market_ids or
+                                   not all(isinstance(market_id, str) for market_id in market_ids)):
+        return None, 'market_ids must be a non-empty list of market IDs'
+    return (battery_id, market_ids, data.get('save') is True), None
+
+def markets_response(battery_id, results, saved):
+    """Ranked best-market / best-route table of a multi-market evaluation."""
+    best = results[0] if results else None
+    return {
+        'id': battery_id,
+        'best_market': best['market_id'] if best else None,
+        'recommendation': best['recommendation'] if best else None,
+        'saved': saved and best is not None,
+        'markets': [
+            {
+                'market_id': result['market_id'],
+                'recommendation': result['recommendation'],
+                'score': result['scores'][result['recommendation']],
+                'scores': result['scores']
+            }
+            for result in results
+        ]
+    }
+
+# Recycler multi-market endpoint - one read, base scores once, every MarketConfig ranked
+@app.route('/recycler/evaluate/markets', methods=['POST'])
+def recycler_evaluate_markets():
+    try:
+        parsed, error = parse_markets_request(request.get_json() or {})
+        if error:
+            return jsonify({'error': error}), 400
+        battery_id, market_ids, save = parsed
+        
+        unknown = unknown_markets(market_ids)
+        if unknown:
+            return jsonify({'error': 'Market config not found', 'market_ids': unknown}), 404
+        
+        ensure_rules()
+        repo = get_repository()
+        
+        # Read the twin, score it for every market, optionally save the winning decision
+        results = repo.evaluate_markets(battery_id, decision_engine, market_ids, save=save)
+        
+        if results is None:
+            return jsonify({'error': 'Battery not found'}), 404
+        
+        return jsonify(markets_response(battery_id, results, save)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -71,13 +392,32 @@ def garagist_create():
                 'error': 'All fields are required: battery_id, voltage, capacity, temperature'
             }), 400
         
-        repo = BatteryRepository(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, database_name=NEO4J_DB_NAME)
+        sync_measurements(battery_id)
+        repo = get_repository()
         
-        try:
-            result = repo.create_battery_record(battery_id, voltage, capacity, temperature)
-            return jsonify(result), 201
-        finally:
-            repo.close()
+        result = repo.create_battery_record(battery_id, voltage, capacity, temperature)
+        return jsonify(result), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Garagist bulk endpoint - streams NDJSON or CSV measurements and writes them in chunks
+@app.route('/garagist/battery/bulk', methods=['POST'])
+def garagist_bulk_create():
+    try:
+        fmt = request.args.get('format')
+        if fmt is None:
+            fmt = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({'error': "format must be 'ndjson' or 'csv'"}), 400
+        
+        sync_measurements()
+        repo = get_repository()
+        
+        # request.stream is read incrementally (bounded lines); the body is never buffered whole
+        summary = ingest_stream(read_lines(request.stream), repo, fmt=fmt, chunk_size=INGEST_CHUNK_SIZE)
+        # A failed chunk stops the upload: report what was written so it can be resumed
+        return jsonify(summary), 500 if 'error' in summary else 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -94,22 +434,30 @@ def garagist_update(battery_id):
         if voltage is None and capacity is None and temperature is None:
             return jsonify({'error': 'Provide at least one field to update'}), 400
 
-        repo = BatteryRepository(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, database_name=NEO4J_DB_NAME)
-
-        try:
-            result = repo.update_battery_measurements(
-                battery_id,
-                voltage=voltage,
-                capacity=capacity,
-                temperature=temperature,
-            )
-
-            if not result:
+        if write_buffer is not None:
+            # Unknown IDs are rejected now: the batched flush would silently skip them
+            if not battery_exists(battery_id):
                 return jsonify({'error': 'Battery not found'}), 404
+            # Coalesced with other pending updates of this battery and written in the next flush
+            write_buffer.submit(battery_id, voltage=voltage, capacity=capacity, temperature=temperature)
+            return jsonify({
+                'message': 'Battery update queued',
+                'battery_id': battery_id,
+            }), 202
+
+        repo = get_repository()
+
+        result = repo.update_battery_measurements(
+            battery_id,
+            voltage=voltage,
+            capacity=capacity,
+            temperature=temperature,
+        )
 
-            return jsonify(result), 200
-        finally:
-            repo.close()
+        if not result:
+            return jsonify({'error': 'Battery not found'}), 404
+
+        return jsonify(result), 200
     except ValueError as invalid:
         return jsonify({'error': str(invalid)}), 400
     except Exception as e:
@@ -119,17 +467,51 @@ def garagist_update(battery_id):
 @app.route('/garagist/battery/<battery_id>', methods=['GET'])
 def garagist_read(battery_id):
     try:
-        repo = BatteryRepository(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, database_name=NEO4J_DB_NAME)
+        sync_measurements(battery_id)
+        repo = get_repository()
+        
+        # Conditional GET: answered from the version alone, without the full read
+        if request.if_none_match:
+            cached = not_modified(repo.get_battery_version(battery_id))
+            if cached is not None:
+                return cached
+        
+        result = repo.get_all_battery_data(battery_id)
+        
+        if not result:
+            return jsonify({'error': 'Battery not found'}), 404
         
+        version = result.pop('version')
+        response = jsonify(result)
+        response.set_etag(battery_etag(version))
+        return response, 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Garagist telemetry endpoint - measurement history downsampled to min/max/mean per time bucket
+@app.route('/garagist/battery/<battery_id>/telemetry', methods=['GET'])
+def garagist_telemetry(battery_id):
+    try:
         try:
-            result = repo.get_all_battery_data(battery_id)
-            
-            if not result:
-                return jsonify({'error': 'Battery not found'}), 404
-            
-            return jsonify(result), 200
-        finally:
-            repo.close()
+            start = parse_timestamp(request.args.get('start'))
+            end = parse_timestamp(request.args.get('end'))
+            buckets = int(request.args.get('buckets', 100))
+        except ValueError:
+            return jsonify({'error': 'start/end must be epoch milliseconds or ISO 8601, buckets an integer'}), 400
+        if not 1 <= buckets <= TELEMETRY_MAX_BUCKETS:
+            return jsonify({'error': f'buckets must be between 1 and {TELEMETRY_MAX_BUCKETS}'}), 400
+        if start is not None and end is not None and start > end:
+            return jsonify({'error': 'start must be before end'}), 400
+        
+        sync_measurements(battery_id)
+        repo = get_repository()
+        
+        blocks = repo.get_telemetry_blocks(battery_id, start, end)
+        if blocks is None:
+            return jsonify({'error': 'Battery not found'}), 404
+        
+        return jsonify(dict(battery_id=battery_id, **downsample(blocks, start, end, buckets))), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -138,20 +520,92 @@ def garagist_read(battery_id):
 @app.route('/proprietaire/status/<battery_id>', methods=['GET'])
 def proprietaire_status(battery_id):
     try:
-        repo = BatteryRepository(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, database_name=NEO4J_DB_NAME)
+        # The read model is served as is: buffered PATCHes show up once flushed
+        if owner_status_store is None:
+            sync_measurements(battery_id)
+        repo = get_repository()
+        
+        # Conditional GET: answered from the version alone, without reading the payload
+        if request.if_none_match:
+            cached = not_modified(repo.get_owner_status_version(battery_id))
+            if cached is not None:
+                return cached
+        
+        # Pre-serialized payload (materialized read model, or serialized from Neo4j without it)
+        payload, version = repo.get_battery_status_payload(battery_id)
+        
+        if payload is None:
+            return jsonify({'error': 'Battery not found'}), 404
+        
+        response = Response(payload, status=200, mimetype='application/json')
+        response.set_etag(battery_etag(version))
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Battery events endpoint - server-sent events on status changes and saved decisions
+@app.route('/battery/events/<battery_id>', methods=['GET'])
+def battery_events(battery_id):
+    try:
+        sync_measurements(battery_id)
+        repo = get_repository()
         
+        # Subscribe before reading the current status so no write falls in between
         try:
-            result = repo.get_battery_status(battery_id)
-            
-            if not result:
-                return jsonify({'error': 'Battery not found'}), 404
-            
-            return jsonify(result), 200
-        finally:
-            repo.close()
+            subscription = change_bus.subscribe(battery_id)
+        except RuntimeError as full:
+            return jsonify({'error': str(full)}), 503
+        
+        try:
+            payload, version = repo.get_battery_status_payload(battery_id)
+        except Exception:
+            subscription.close()
+            raise
+        
+        if payload is None:
+            subscription.close()
+            return jsonify({'error': 'Battery not found'}), 404
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    # A reconnecting EventSource sends the last event ID: skip the snapshot if it is still current
+    resumed = request.headers.get('Last-Event-ID') == battery_etag(version)
+    
+    def stream():
+        with subscription:
+            deadline = time.monotonic() + EVENTS_STREAM_SECONDS
+            yield "retry: 1000\n\n"  # reconnect delay (ms) once the stream ends
+            if not resumed:
+                yield status_message(payload, version)
+            sent_version = version
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                change = subscription.get(min(remaining, EVENTS_HEARTBEAT_INTERVAL))
+                if change is not None:
+                    message, sent_version = change_message(*change, sent_version)
+                    if message is not None:
+                        yield message
+                    if change[0] == EVICTED:
+                        return
+                    continue
+                if subscription.closed:
+                    return
+                # Heartbeat: also catches writes made by other workers (cheap version lookup)
+                current = repo.get_owner_status_version(battery_id)
+                if current is not None and current > sent_version:
+                    latest, current = repo.get_battery_status_payload(battery_id)
+                    if latest is not None:
+                        yield status_message(latest, current)
+                        sent_version = current
+                        continue
+                yield ": keep-alive\n\n"
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # Update battery status endpoint
 @app.route('/battery/status/<battery_id>', methods=['PUT'])
@@ -165,25 +619,51 @@ def update_battery_status(battery_id):
         if not new_status:
             return jsonify({'error': 'Status field is required'}), 400
         
-        repo = BatteryRepository(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, database_name=NEO4J_DB_NAME)
+        repo = get_repository()
         
-        try:
-            success = repo.update_battery_status(battery_id, new_status)
-            
-            if not success:
-                return jsonify({'error': 'Battery not found or update failed'}), 404
-            
-            return jsonify({
-                'message': 'Battery status updated successfully',
-                'battery_id': battery_id,
-                'new_status': new_status
-            }), 200
-        finally:
-            repo.close()
+        success = repo.update_battery_status(battery_id, new_status)
+        
+        if not success:
+            return jsonify({'error': 'Battery not found or update failed'}), 404
+        
+        return jsonify({
+            'message': 'Battery status updated successfully',
+            'battery_id': battery_id,
+            'new_status': new_status
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(collect_cache_stats()), 200
+
+def collect_cache_stats():
+    """Counters of this worker's caches (also served by asgi.py)."""
+    stats = {'enabled': twin_cache is not None}
+    if twin_cache is not None:
+        stats.update(twin_cache.stats())
+    if decision_engine.memo is not None:
+        stats['decisions'] = decision_engine.memo.stats()
+    if write_buffer is not None:
+        stats['write_buffer'] = write_buffer.stats()
+    if owner_status_store is not None:
+        stats['owner_status'] = owner_status_store.stats()
+    stats['events'] = change_bus.stats()
+    if embedded_store is not None:
+        stats['embedded'] = embedded_store.stats()
+    return stats
+
+@app.route('/rules', methods=['GET'])
+def rules_info():
+    ensure_rules()
+    return jsonify(rule_registry.current()), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy'}), 200
@@ -0,0 +1,505 @@
+"""
+Async (ASGI) serving mode: the routes and JSON contracts of app.py, served by
+Quart with async handlers on neo4j.AsyncGraphDatabase.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001 --workers 4
+
+Settings, caches, the market registry, the decision engine, its rule set
+registry and the write buffer are shared with app.py (same environment variables). DecisionEngine
+work runs in a thread pool (ENGINE_EXECUTOR_WORKERS) so it never blocks the
+event loop.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
+
+import app as sync_app
+from src.database.async_repository import AsyncBatteryRepository
+from src.database.changes import EVICTED
+from src.database.connection import close_async_driver, get_async_driver
+from src.database.telemetry import downsample, parse_timestamp
+from src.ingest import ingest_stream_async
+from src.metrics import metrics
+
+if sync_app.embedded_store is not None:
+    raise RuntimeError("asgi.py serves the neo4j backend only: run app.py for REPOSITORY_BACKEND=embedded")
+
+app = cors(Quart(__name__))  # Enable CORS for React frontend
+# Bulk uploads are streamed, never buffered: no body size cap (same as Flask)
+app.config['MAX_CONTENT_LENGTH'] = None
+
+# CPU-bound work (decision engine, telemetry downsampling) runs off the event loop
+ENGINE_EXECUTOR_WORKERS = int(os.getenv("ENGINE_EXECUTOR_WORKERS") or 4)
+engine_executor = ThreadPoolExecutor(max_workers=ENGINE_EXECUTOR_WORKERS, thread_name_prefix='engine')
+
+decision_engine = sync_app.decision_engine
+write_buffer = sync_app.write_buffer
+
+@app.before_request
+async def start_request_timer():
+    if metrics.enabled:
+        g.request_started_at = time.perf_counter()
+
+@app.after_request
+async def record_request_metrics(response):
+    started_at = g.pop('request_started_at', None)
+    if started_at is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.http_requests_total.inc((route, request.method, str(response.status_code)))
+        metrics.http_request_seconds.observe((route, request.method), time.perf_counter() - started_at)
+    return response
+
+@app.after_serving
+async def shutdown():
+    # Drain buffered PATCHes (blocking driver, so off the loop), then release Bolt connections
+    if write_buffer is not None:
+        await asyncio.get_running_loop().run_in_executor(None, write_buffer.close)
+    await close_async_driver()
+    engine_executor.shutdown(wait=False)
+
+def get_repository():
+    """Async repository borrowing sessions from this worker's pooled async driver."""
+    driver = get_async_driver(sync_app.NEO4J_URI, sync_app.NEO4J_USER, sync_app.NEO4J_PASSWORD)
+    return AsyncBatteryRepository(
+        driver,
+        database_name=sync_app.NEO4J_DB_NAME,
+        cache=sync_app.twin_cache,
+        markets=sync_app.market_registry,
+        executor=engine_executor,
+        owner_status=sync_app.owner_status_store,
+        changes=sync_app.change_bus
+    )
+
+async def is_known_market(market_id):
+    """Check a market ID against the in-memory registry (loaded on first use)."""
+    driver = get_async_driver(sync_app.NEO4J_URI, sync_app.NEO4J_USER, sync_app.NEO4J_PASSWORD)
+    await sync_app.market_registry.ensure_fresh_async(driver, sync_app.NEO4J_DB_NAME)
+    return sync_app.market_registry.has(market_id)
+
+async def ensure_rules():
+    """Install the current rule set into decision_engine (see app.ensure_rules)."""
+    driver = None
+    if sync_app.RULES_FILE is None:
+        driver = get_async_driver(sync_app.NEO4J_URI, sync_app.NEO4J_USER, sync_app.NEO4J_PASSWORD)
+    await sync_app.rule_registry.ensure_fresh_async(driver, sync_app.NEO4J_DB_NAME)
+
+async def sync_measurements(battery_id=None):
+    """Read-your-writes barrier of the write buffer (see app.sync_measurements)."""
+    if write_buffer is not None:
+        await asyncio.get_running_loop().run_in_executor(None, sync_app.sync_measurements, battery_id)
+
+async def battery_exists(battery_id):
+    """Existence check for buffered PATCHes (shares app.known_batteries)."""
+    if sync_app.known_batteries.get(battery_id):
+        return True
+    exists = await get_repository().battery_exists(battery_id)
+    if exists:
+        sync_app.known_batteries.put(battery_id, True)
+    return exists
+
+def not_modified(version):
+    """304 response if the request's If-None-Match matches `version` (see app.not_modified)."""
+    if version is None or not request.if_none_match.contains_weak(sync_app.battery_etag(version)):
+        return None
+    response = Response('', status=304)
+    response.set_etag(sync_app.battery_etag(version))
+    return response
+
+# Recycler endpoint - takes only an ID and runs the decision algorithm
+@app.route('/recycler/evaluate', methods=['POST'])
+async def recycler_evaluate():
+    try:
+        data = await request.get_json()
+        battery_id = data.get('id')
+        market_id = data.get('market_id', 'MKT_STD_2024')  # Default market config
+
+        if not battery_id:
+            return jsonify({'error': 'Battery ID is required'}), 400
+
+        if not await is_known_market(market_id):
+            return jsonify({'error': 'Market config not found'}), 404
+
+        await ensure_rules()
+        repo = get_repository()
+
+        # Read digital twin, run decision algorithm in the executor and save the decision
+        result = await repo.evaluate_and_save_decision(battery_id, decision_engine, market_id)
+
+        if not result:
+            return jsonify({'error': 'Battery not found'}), 404
+
+        # Return the scores (4 string-integer pairs)
+        return jsonify(result['scores']), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Recycler batch endpoint - evaluates a list of IDs with one read and one write round-trip
+@app.route('/recycler/evaluate/batch', methods=['POST'])
+async def recycler_evaluate_batch():
+    try:
+        data = await request.get_json() or {}
+        battery_ids = data.get('ids')
+        market_id = data.get('market_id', 'MKT_STD_2024')
+
+        if not isinstance(battery_ids, list) or not battery_ids or \
+                not all(isinstance(battery_id, str) for battery_id in battery_ids):
+            return jsonify({'error': 'A non-empty list of battery IDs is required'}), 400
+
+        if len(battery_ids) > sync_app.MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {sync_app.MAX_BATCH_SIZE} battery IDs per batch'}), 400
+
+        if not await is_known_market(market_id):
+            return jsonify({'error': 'Market config not found'}), 404
+
+        battery_ids = list(dict.fromkeys(battery_ids))  # dedupe, keep order
+        await ensure_rules()
+        repo = get_repository()
+
+        # Get all digital twins in one UNWIND query
+        digital_twins = await repo.get_digital_twins(battery_ids, market_id)
+        found_ids = [battery_id for battery_id in battery_ids if battery_id in digital_twins]
+
+        # Run decision algorithm on the whole batch in the executor (per twin if the batch fails)
+        decisions, failures = await asyncio.get_running_loop().run_in_executor(
+            engine_executor, sync_app.evaluate_twins,
+            {battery_id: digital_twins[battery_id] for battery_id in found_ids}
+        )
+
+        # Save all decisions in one write transaction
+        await repo.save_decisions(decisions, market_id)
+
+        return jsonify({
+            'market_id': market_id,
+            'results': [
+                {'id': battery_id, 'scores': decisions[battery_id]['scores']}
+                for battery_id in found_ids if battery_id in decisions
+            ],
+            'errors': [
+                {'id': battery_id, 'error': 'Battery not found'}
+                for battery_id in battery_ids if battery_id not in digital_twins
+            ] + failures
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+async def unknown_markets(market_ids):
+    """Market IDs missing from the in-memory registry (see app.unknown_markets)."""
+    driver = get_async_driver(sync_app.NEO4J_URI, sync_app.NEO4J_USER, sync_app.NEO4J_PASSWORD)
+    await sync_app.market_registry.ensure_fresh_async(driver, sync_app.NEO4J_DB_NAME)
+    return [market_id for market_id in market_ids or [] if not sync_app.market_registry.has(market_id)]
+
+# Recycler multi-market endpoint - one read, base scores once, every MarketConfig ranked
+@app.route('/recycler/evaluate/markets', methods=['POST'])
+async def recycler_evaluate_markets():
+    try:
+        parsed, error = sync_app.parse_markets_request(await request.get_json() or {})
+        if error:
+            return jsonify({'error': error}), 400
+        battery_id, market_ids, save = parsed
+
+        unknown = await unknown_markets(market_ids)
+        if unknown:
+            return jsonify({'error': 'Market config not found', 'market_ids': unknown}), 404
+
+        await ensure_rules()
+        repo = get_repository()
+
+        # Read the twin, score it for every market in the executor, optionally save the winning decision
+        results = await repo.evaluate_markets(battery_id, decision_engine, market_ids, save=save)
+
+        if results is None:
+            return jsonify({'error': 'Battery not found'}), 404
+
+        return jsonify(sync_app.markets_response(battery_id, results, save)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Garagist POST endpoint - push data to Neo4j
+@app.route('/garagist/battery', methods=['POST'])
+async def garagist_create():
+    try:
+        data = await request.get_json()
+
+        # Extract the 4 inputs for battery data
+        battery_id = data.get('battery_id')
+        voltage = data.get('voltage')
+        capacity = data.get('capacity')
+        temperature = data.get('temperature')
+
+        # Validate required fields
+        if None in [battery_id, voltage, capacity, temperature]:
+            return jsonify({
+                'error': 'All fields are required: battery_id, voltage, capacity, temperature'
+            }), 400
+
+        await sync_measurements(battery_id)
+        repo = get_repository()
+
+        result = await repo.create_battery_record(battery_id, voltage, capacity, temperature)
+        return jsonify(result), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Garagist bulk endpoint - streams NDJSON or CSV measurements and writes them in chunks
+@app.route('/garagist/battery/bulk', methods=['POST'])
+async def garagist_bulk_create():
+    try:
+        fmt = request.args.get('format')
+        if fmt is None:
+            fmt = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+        if fmt not in ('ndjson', 'csv'):
+            return jsonify({'error': "format must be 'ndjson' or 'csv'"}), 400
+
+        await sync_measurements()
+        repo = get_repository()
+
+        # request.body is consumed chunk by chunk; the body is never buffered whole
+        summary = await ingest_stream_async(request.body, repo, fmt=fmt, chunk_size=sync_app.INGEST_CHUNK_SIZE)
+        # A failed chunk stops the upload: report what was written so it can be resumed
+        return jsonify(summary), 500 if 'error' in summary else 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Garagist PATCH endpoint - update select battery measurements
+@app.route('/garagist/battery/<battery_id>', methods=['PATCH'])
+async def garagist_update(battery_id):
+    try:
+        data = await request.get_json() or {}
+        voltage = data.get('voltage')
+        capacity = data.get('capacity')
+        temperature = data.get('temperature')
+
+        if voltage is None and capacity is None and temperature is None:
+            return jsonify({'error': 'Provide at least one field to update'}), 400
+
+        if write_buffer is not None:
+            # Unknown IDs are rejected now: the batched flush would silently skip them
+            if not await battery_exists(battery_id):
+                return jsonify({'error': 'Battery not found'}), 404
+            # Coalesced with other pending updates of this battery and written in the next flush
+            write_buffer.submit(battery_id, voltage=voltage, capacity=capacity, temperature=temperature)
+            return jsonify({
+                'message': 'Battery update queued',
+                'battery_id': battery_id,
+            }), 202
+
+        repo = get_repository()
+
+        result = await repo.update_battery_measurements(
+            battery_id,
+            voltage=voltage,
+            capacity=capacity,
+            temperature=temperature,
+        )
+
+        if not result:
+            return jsonify({'error': 'Battery not found'}), 404
+
+        return jsonify(result), 200
+    except ValueError as invalid:
+        return jsonify({'error': str(invalid)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Garagist GET endpoint - read all battery information from Neo4j
+@app.route('/garagist/battery/<battery_id>', methods=['GET'])
+async def garagist_read(battery_id):
+    try:
+        await sync_measurements(battery_id)
+        repo = get_repository()
+
+        # Conditional GET: answered from the version alone, without the full read
+        if request.if_none_match:
+            cached = not_modified(await repo.get_battery_version(battery_id))
+            if cached is not None:
+                return cached
+
+        result = await repo.get_all_battery_data(battery_id)
+
+        if not result:
+            return jsonify({'error': 'Battery not found'}), 404
+
+        version = result.pop('version')
+        response = jsonify(result)
+        response.set_etag(sync_app.battery_etag(version))
+        return response, 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Garagist telemetry endpoint - measurement history downsampled to min/max/mean per time bucket
+@app.route('/garagist/battery/<battery_id>/telemetry', methods=['GET'])
+async def garagist_telemetry(battery_id):
+    try:
+        try:
+            start = parse_timestamp(request.args.get('start'))
+            end = parse_timestamp(request.args.get('end'))
+            buckets = int(request.args.get('buckets', 100))
+        except ValueError:
+            return jsonify({'error': 'start/end must be epoch milliseconds or ISO 8601, buckets an integer'}), 400
+        if not 1 <= buckets <= sync_app.TELEMETRY_MAX_BUCKETS:
+            return jsonify({'error': f'buckets must be between 1 and {sync_app.TELEMETRY_MAX_BUCKETS}'}), 400
+        if start is not None and end is not None and start > end:
+            return jsonify({'error': 'start must be before end'}), 400
+
+        await sync_measurements(battery_id)
+        repo = get_repository()
+
+        blocks = await repo.get_telemetry_blocks(battery_id, start, end)
+        if blocks is None:
+            return jsonify({'error': 'Battery not found'}), 404
+
+        history = await asyncio.get_running_loop().run_in_executor(
+            engine_executor, downsample, blocks, start, end, buckets
+        )
+        return jsonify(dict(battery_id=battery_id, **history)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Proprietaire endpoint - get battery status
+@app.route('/proprietaire/status/<battery_id>', methods=['GET'])
+async def proprietaire_status(battery_id):
+    try:
+        # The read model is served as is: buffered PATCHes show up once flushed
+        if sync_app.owner_status_store is None:
+            await sync_measurements(battery_id)
+        repo = get_repository()
+
+        # Conditional GET: answered from the version alone, without reading the payload
+        if request.if_none_match:
+            cached = not_modified(await repo.get_owner_status_version(battery_id))
+            if cached is not None:
+                return cached
+
+        # Pre-serialized payload (materialized read model, or serialized from Neo4j without it)
+        payload, version = await repo.get_battery_status_payload(battery_id)
+
+        if payload is None:
+            return jsonify({'error': 'Battery not found'}), 404
+
+        response = Response(payload, status=200, mimetype='application/json')
+        response.set_etag(sync_app.battery_etag(version))
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Update battery status endpoint
+@app.route('/battery/status/<battery_id>', methods=['PUT'])
+async def update_battery_status(battery_id):
+    try:
+        data = await request.get_json()
+
+        # Extract new status
+        new_status = data.get('status')
+
+        if not new_status:
+            return jsonify({'error': 'Status field is required'}), 400
+
+        repo = get_repository()
+
+        success = await repo.update_battery_status(battery_id, new_status)
+
+        if not success:
+            return jsonify({'error': 'Battery not found or update failed'}), 404
+
+        return jsonify({
+            'message': 'Battery status updated successfully',
+            'battery_id': battery_id,
+            'new_status': new_status
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Battery events endpoint - server-sent events on status changes and saved decisions
+@app.route('/battery/events/<battery_id>', methods=['GET'])
+async def battery_events(battery_id):
+    try:
+        await sync_measurements(battery_id)
+        repo = get_repository()
+
+        # Subscribe before reading the current status so no write falls in between
+        try:
+            subscription = sync_app.change_bus.subscribe(battery_id)
+        except RuntimeError as full:
+            return jsonify({'error': str(full)}), 503
+
+        try:
+            payload, version = await repo.get_battery_status_payload(battery_id)
+        except Exception:
+            subscription.close()
+            raise
+
+        if payload is None:
+            subscription.close()
+            return jsonify({'error': 'Battery not found'}), 404
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    # A reconnecting EventSource sends the last event ID: skip the snapshot if it is still current
+    resumed = request.headers.get('Last-Event-ID') == sync_app.battery_etag(version)
+
+    async def stream():
+        with subscription:
+            deadline = time.monotonic() + sync_app.EVENTS_STREAM_SECONDS
+            yield "retry: 1000\n\n"  # reconnect delay (ms) once the stream ends
+            if not resumed:
+                yield sync_app.status_message(payload, version)
+            sent_version = version
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                change = await subscription.get_async(min(remaining, sync_app.EVENTS_HEARTBEAT_INTERVAL))
+                if change is not None:
+                    message, sent_version = sync_app.change_message(*change, sent_version)
+                    if message is not None:
+                        yield message
+                    if change[0] == EVICTED:
+                        return
+                    continue
+                if subscription.closed:
+                    return
+                # Heartbeat: also catches writes made by other workers (cheap version lookup)
+                current = await repo.get_owner_status_version(battery_id)
+                if current is not None and current > sent_version:
+                    latest, current = await repo.get_battery_status_payload(battery_id)
+                    if latest is not None:
+                        yield sync_app.status_message(latest, current)
+                        sent_version = current
+                        continue
+                yield ": keep-alive\n\n"
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # the stream ends by itself after EVENTS_STREAM_SECONDS
+    return response
+
+@app.route('/cache/stats', methods=['GET'])
+async def cache_stats():
+    return jsonify(sync_app.collect_cache_stats()), 200
+
+@app.route('/rules', methods=['GET'])
+async def rules_info():
+    await ensure_rules()
+    return jsonify(sync_app.rule_registry.current()), 200
+
+@app.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/health', methods=['GET'])
+async def health():
+    return jsonify({'status': 'healthy'}), 200
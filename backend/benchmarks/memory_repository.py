@@ -0,0 +1,80 @@
+"""
+In-memory stand-in for BatteryRepository, limited to the methods used by the
+recycler routes and the re-scoring job. Keeps the same return contracts without a Neo4j server.
+"""
+import itertools
+from datetime import datetime, timezone
+
+
+class InMemoryBatteryRepository:
+    def __init__(self, twins, markets):
+        # Battery side of each twin (market attached at read time, as in Neo4j)
+        self.batteries = {
+            twin["battery_id"]: {key: value for key, value in twin.items() if key != "market"}
+            for twin in twins
+        }
+        self.markets = dict(markets)
+        self.decisions = []
+        self._ids = itertools.count()
+        # battery_id -> last passport/diagnosis change (Battery.inputs_updated_at)
+        self.inputs_updated_at = {}
+
+    def close(self):
+        pass
+
+    def get_digital_twin(self, battery_id, market_config_id="MKT_STD_2024"):
+        battery = self.batteries.get(battery_id)
+        market = self.markets.get(market_config_id)
+        if battery is None or market is None:
+            return None
+        return dict(battery, market=market)
+
+    def get_digital_twins(self, battery_ids, market_config_id="MKT_STD_2024"):
+        twins = {}
+        for battery_id in battery_ids:
+            twin = self.get_digital_twin(battery_id, market_config_id)
+            if twin is not None:
+                twins[battery_id] = twin
+        return twins
+
+    def get_digital_twin_page(self, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        if market_config_id not in self.markets:
+            return []
+        ids = sorted(battery_id for battery_id in self.batteries if battery_id > after_id)[:limit]
+        return [self.get_digital_twin(battery_id, market_config_id) for battery_id in ids]
+
+    def get_changed_twin_page(self, since, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        if market_config_id not in self.markets:
+            return []
+        ids = sorted(
+            battery_id for battery_id, changed_at in self.inputs_updated_at.items()
+            if changed_at > since and battery_id > after_id and battery_id in self.batteries
+        )[:limit]
+        return [self.get_digital_twin(battery_id, market_config_id) for battery_id in ids]
+
+    def get_database_time(self):
+        return datetime.now(timezone.utc)
+
+    def touch_inputs(self, battery_id, **fields):
+        """Change engine inputs of one battery (what a passport/diagnosis write does)."""
+        self.batteries[battery_id].update(fields)
+        self.inputs_updated_at[battery_id] = self.get_database_time()
+
+    def save_decision(self, battery_id, decision_result, market_config_id="MKT_STD_2024"):
+        decision_id = f"DEC_{next(self._ids)}_{battery_id}"
+        self.decisions.append((decision_id, battery_id, market_config_id, decision_result))
+        return decision_id
+
+    def save_decisions(self, decisions, market_config_id="MKT_STD_2024"):
+        return {
+            battery_id: self.save_decision(battery_id, result, market_config_id)
+            for battery_id, result in decisions.items()
+        }
+
+    def evaluate_and_save_decision(self, battery_id, engine, market_config_id="MKT_STD_2024"):
+        twin = self.get_digital_twin(battery_id, market_config_id)
+        if twin is None:
+            return None
+        result = engine.evaluate_battery(twin)
+        self.save_decision(battery_id, result, market_config_id)
+        return result
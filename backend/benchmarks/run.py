@@ -0,0 +1,186 @@
+"""
+Benchmarks for the decision engine and the recycler API hot paths.
+
+Usage (from backend/):
+    python -m benchmarks.run                              # print results
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --tolerance 0.10
+
+Reports ops/sec, p50/p99 latency per call and bytes allocated per call
+(tracemalloc peak). --compare exits with status 1 when a case is slower than
+the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from src.engine.decision import DecisionEngine
+from src.engine.memo import DecisionMemo
+
+from .memory_repository import InMemoryBatteryRepository
+from .twins import MARKETS, generate_fleet
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(name, calls, items_per_call=1, warmup=20, alloc_samples=50):
+    """
+    Time each zero-argument callable of `calls` once.
+
+    Returns:
+        Dict with ops_per_sec (items/sec), p50_us, p99_us, alloc_bytes_per_call
+    """
+    for call in calls[:warmup]:
+        call()
+
+    durations = []
+    for call in calls:
+        start = time.perf_counter_ns()
+        call()
+        durations.append(time.perf_counter_ns() - start)
+
+    allocations = []
+    tracemalloc.start()
+    try:
+        for call in calls[:alloc_samples]:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call()
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    durations.sort()
+    total_seconds = sum(durations) / 1e9
+    return {
+        'name': name,
+        'calls': len(calls),
+        'ops_per_sec': round(len(calls) * items_per_call / total_seconds, 1) if total_seconds else None,
+        'p50_us': round(_percentile(durations, 0.50) / 1e3, 2),
+        'p99_us': round(_percentile(durations, 0.99) / 1e3, 2),
+        'alloc_bytes_per_call': int(statistics.mean(allocations)) if allocations else None,
+    }
+
+
+def engine_cases(fleet, batch_size):
+    engine = DecisionEngine()
+    memo_engine = DecisionEngine(memo=DecisionMemo(max_entries=len(fleet)))
+    batches = [fleet[i:i + batch_size] for i in range(0, len(fleet), batch_size)]
+
+    yield measure('engine.evaluate_battery', [lambda t=t: engine.evaluate_battery(t) for t in fleet])
+    # Second pass over the same fleet: every call after the first is a memo hit
+    for twin in fleet:
+        memo_engine.evaluate_battery(twin)
+    yield measure('engine.evaluate_battery[memo hit]', [lambda t=t: memo_engine.evaluate_battery(t) for t in fleet])
+    yield measure(
+        f'engine.evaluate_batch[{batch_size}]',
+        [lambda b=b: engine.evaluate_batch(b) for b in batches],
+        items_per_call=batch_size, warmup=2, alloc_samples=5
+    )
+    yield measure('engine.export_matrix', [lambda t=t: engine.export_matrix(t) for t in fleet])
+
+
+def api_cases(fleet, batch_size):
+    import app as api
+
+    repo = InMemoryBatteryRepository(fleet, MARKETS)
+    api.get_repository = lambda: repo
+    api.is_known_market = lambda market_id: market_id in repo.markets
+    # No :RuleSet node in the stand-in: the engine keeps the rules it has installed
+    api.ensure_rules = lambda: None
+    client = api.app.test_client()
+
+    def evaluate(battery_id):
+        response = client.post('/recycler/evaluate', json={'id': battery_id, 'market_id': 'MKT_STD_2024'})
+        assert response.status_code == 200, response.get_json()
+
+    def evaluate_batch(battery_ids):
+        response = client.post('/recycler/evaluate/batch', json={'ids': battery_ids, 'market_id': 'MKT_STD_2024'})
+        assert response.status_code == 200, response.get_json()
+
+    ids = [twin['battery_id'] for twin in fleet]
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    yield measure('POST /recycler/evaluate', [lambda i=i: evaluate(i) for i in ids])
+    yield measure(
+        f'POST /recycler/evaluate/batch[{batch_size}]',
+        [lambda b=b: evaluate_batch(b) for b in batches],
+        items_per_call=batch_size, warmup=2, alloc_samples=5
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Cases whose ops/sec dropped more than `tolerance` below the baseline."""
+    previous = {case['name']: case for case in baseline.get('results', [])}
+    regressions = []
+    for case in results:
+        old = previous.get(case['name'])
+        if not old or not old.get('ops_per_sec') or not case.get('ops_per_sec'):
+            continue
+        ratio = case['ops_per_sec'] / old['ops_per_sec']
+        case['vs_baseline'] = round(ratio, 3)
+        if ratio < 1 - tolerance:
+            regressions.append(case)
+    return regressions
+
+
+def print_table(results):
+    print(f"{'case':<42} {'ops/sec':>12} {'p50 µs':>10} {'p99 µs':>10} {'alloc B':>10} {'vs base':>8}")
+    for case in results:
+        print(
+            f"{case['name']:<42} {case['ops_per_sec'] or 0:>12.1f} {case['p50_us']:>10.2f} "
+            f"{case['p99_us']:>10.2f} {case['alloc_bytes_per_call'] or 0:>10} {case.get('vs_baseline', ''):>8}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decision engine and API benchmarks")
+    parser.add_argument('--size', type=int, default=5000, help='number of synthetic twins')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-api', action='store_true', help='only benchmark the engine')
+    parser.add_argument('--save', metavar='PATH', help='write results as a baseline JSON file')
+    parser.add_argument('--compare', metavar='PATH', help='baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed ops/sec drop (fraction)')
+    args = parser.parse_args(argv)
+
+    fleet = generate_fleet(args.size, seed=args.seed)
+    results = list(engine_cases(fleet, args.batch_size))
+    if not args.skip_api:
+        results.extend(api_cases(fleet, args.batch_size))
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump({
+                'meta': {
+                    'size': args.size,
+                    'batch_size': args.batch_size,
+                    'seed': args.seed,
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                },
+                'results': results,
+            }, baseline_file, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    for case in regressions:
+        print(f"❌ {case['name']}: {case['vs_baseline']:.0%} of baseline ops/sec")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
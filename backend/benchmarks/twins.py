@@ -0,0 +1,79 @@
+"""
+Seeded synthetic digital twins, shaped like BatteryRepository.get_digital_twin output.
+
+Categories are read from BusinessRules so every chemistry, model category and
+status weight is exercised, plus unknown values, missing fields and
+kill-switch cases.
+"""
+import random
+from datetime import date, timedelta
+
+from src.engine.rules import BusinessRules
+
+UNKNOWN_CHEMISTRIES = ["NIMH", "SOLID-STATE"]
+UNKNOWN_MODELS = ["prototype-x", "pack-generic"]
+UNKNOWN_STATUSES = ["repurposed", "re-used", "remanufactured"]
+DESIGNS = [True, False, "high", "medium", "low", "unknown"]
+INTENTS = ["repurpose", "remanufacture", "repurpose, remanufacture", "remanufacturing", "none"]
+
+MARKETS = {
+    "MKT_STD_2024": {"id": "MKT_STD_2024", "weight_reuse": 1.0, "weight_remanufacture": 1.0,
+                     "weight_repurpose": 1.0, "weight_recycle": 1.0},
+    "MKT_FAVOR_REUSE_2024": {"id": "MKT_FAVOR_REUSE_2024", "weight_reuse": 1.5, "weight_remanufacture": 1.2,
+                             "weight_repurpose": 1.0, "weight_recycle": 0.8},
+    "MKT_FAVOR_RECYCLE_2024": {"id": "MKT_FAVOR_RECYCLE_2024", "weight_reuse": 0.8, "weight_remanufacture": 0.9,
+                               "weight_repurpose": 0.9, "weight_recycle": 1.3},
+}
+
+
+def _maybe(rng, value, missing_rate):
+    """Value, or None to simulate a property absent from the graph."""
+    return None if rng.random() < missing_rate else value
+
+
+def generate_twin(rng, battery_id, market=None, missing_rate=0.15, kill_switch_rate=0.05):
+    """One digital twin. Missing string attributes are omitted (the engine expects strings)."""
+    rules = BusinessRules
+    chemistry = rng.choice(list(rules.CHEMISTRY_WEIGHTS) + UNKNOWN_CHEMISTRIES)
+    model = rng.choice(list(rules.MODEL_CATEGORIES) + UNKNOWN_MODELS)
+    status = rng.choice(list(rules.STATUS_WEIGHTS) + UNKNOWN_STATUSES)
+    soh = round(rng.uniform(40, 100), 1)
+    placed = date(2025, 1, 1) - timedelta(days=rng.randint(0, 10 * 365))
+
+    passport = {
+        "soh_percent": soh,
+        "chemistry": chemistry,
+        "battery_model": f"{model}-{rng.randint(2015, 2025)}",
+        "battery_status": status,
+        "date_placing_market": _maybe(rng, placed.isoformat(), missing_rate),
+        "total_energy_throughput_kwh": rng.choice([0, rng.randint(50, 3000)]),
+        "potentials_repurposing_remanufacturing": _maybe(rng, rng.choice(INTENTS), missing_rate),
+        "design_for_disassembly": _maybe(rng, rng.choice(DESIGNS), missing_rate),
+        "capacity_fade_percent_per_year": _maybe(rng, round(rng.uniform(0.5, 4.5), 2), missing_rate),
+        "critical_defects": rng.random() < kill_switch_rate,
+        "history_of_abuse": False,
+    }
+    diagnosis = {
+        "soh_percent": _maybe(rng, round(soh - rng.uniform(0, 3), 1), missing_rate),
+        "soc_percent": _maybe(rng, round(rng.uniform(0, 100), 1), missing_rate),
+        "internal_resistance_mOhm": _maybe(rng, round(rng.uniform(10, 60), 1), missing_rate),
+        "history_of_abuse": rng.random() < kill_switch_rate,
+        "critical_defects": False,
+    }
+    if rng.random() < missing_rate:
+        del passport["battery_model"]
+    if rng.random() < missing_rate:
+        del passport["chemistry"]
+
+    return {
+        "battery_id": battery_id,
+        "passport": passport,
+        "diagnosis": diagnosis,
+        "market": dict(MARKETS[market or rng.choice(list(MARKETS))]),
+    }
+
+
+def generate_fleet(size, seed=42, **kwargs):
+    """`size` twins with IDs BENCH_000000..., reproducible for a given seed."""
+    rng = random.Random(seed)
+    return [generate_twin(rng, f"BENCH_{i:06d}", **kwargs) for i in range(size)]
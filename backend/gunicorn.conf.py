@@ -0,0 +1,28 @@
+# Gunicorn configuration - loaded automatically when running `gunicorn app:app` from backend/
+import os
+import sys
+
+from src.database.connection import close_driver
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", 4))
+# Threaded workers: an open /battery/events stream holds one thread, not the whole worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+
+
+def post_fork(server, worker):
+    # Each worker builds its own pooled Neo4j driver on first request;
+    # nothing inherited from the master process is reused.
+    close_driver()
+
+
+def worker_exit(server, worker):
+    # Clean shutdown: drain buffered measurement updates, persist the embedded store,
+    # then release the worker's Bolt connections
+    api = sys.modules.get("app")
+    if api is not None and getattr(api, "write_buffer", None) is not None:
+        api.write_buffer.close()
+    if api is not None and getattr(api, "save_embedded_store", None) is not None:
+        api.save_embedded_store()
+    close_driver()
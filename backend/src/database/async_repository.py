@@ -0,0 +1,404 @@
+import asyncio
+
+from ..metrics import metrics
+from .repository import (
+    ALL_BATTERY_DATA_QUERY,
+    BATTERY_EXISTS_QUERY,
+    BATTERY_STATUS_QUERY,
+    BATTERY_VERSION_QUERY,
+    CREATE_BATTERIES_BATCH_QUERY,
+    CREATE_BATTERY_QUERY,
+    CREATE_DECISION_QUERY,
+    FETCH_BATTERY_QUERY,
+    FETCH_TWIN_ALL_MARKETS_QUERY,
+    FETCH_TWIN_QUERY,
+    FETCH_TWINS_BATCH_QUERY,
+    SAVE_DECISIONS_BATCH_QUERY,
+    TELEMETRY_BLOCKS_QUERY,
+    UPDATE_MEASUREMENTS_QUERY,
+    UPDATE_STATUS_QUERY,
+    BatteryRepository,
+    CachedTwinMixin,
+)
+from .markets import MarketSnapshot
+from .owner_status import serialize
+from .telemetry import TELEMETRY_BLOCK_SIZE, unique_rounds
+
+# Lecture + évaluation + écriture retentées quand le diagnostic change entre-temps
+DECISION_WRITE_ATTEMPTS = 3
+
+
+class AsyncBatteryRepository(CachedTwinMixin):
+    """
+    Équivalent asynchrone de BatteryRepository (neo4j.AsyncDriver) pour le mode ASGI.
+
+    Mêmes requêtes Cypher, même cache et même MarketRegistry ; le moteur de
+    décision (CPU) tourne dans `executor` pour ne pas bloquer la boucle d'événements.
+    """
+
+    def __init__(self, driver, database_name="neo4j", cache=None, markets=None, executor=None, owner_status=None,
+                 changes=None):
+        # Shared (pooled) async driver, never closed by the repository
+        self.driver = driver
+        self.database = database_name
+        self.cache = cache
+        self.markets = markets
+        self.owner_status = owner_status
+        self.changes = changes
+        # None = the event loop's default ThreadPoolExecutor
+        self.executor = executor
+
+    def _session(self):
+        """Session asynchrone du pool, instrumentée si les métriques sont actives."""
+        return metrics.instrument_async_session(self.driver.session(database=self.database))
+
+    async def _run_engine(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    # ========== RECYCLER ==========
+
+    async def get_digital_twin(self, battery_id, market_config_id="MKT_STD_2024"):
+        """Async counterpart of BatteryRepository.get_digital_twin."""
+        cached = self._cached_twin_record(battery_id, market_config_id)
+        if cached:
+            return cached["digital_twin"]
+
+        async with self._session() as session:
+            record = await session.execute_read(
+                self._read_twin_record, battery_id, market_config_id, self._registry_market(market_config_id)
+            )
+        if not record:
+            print(f"❌ [DB: {self.database}] Aucune batterie trouvée avec l'ID {battery_id}")
+            return None
+
+        self._remember_twin_record(battery_id, market_config_id, record)
+        return record["digital_twin"]
+
+    @staticmethod
+    async def _read_twin_record(tx, battery_id, market_config_id, market_entry=None):
+        """Async counterpart of BatteryRepository._read_twin_record."""
+        if market_entry is None:
+            return await AsyncBatteryRepository._fetch_twin_record(tx, battery_id, market_config_id)
+
+        record = await AsyncBatteryRepository._fetch_battery_record(tx, battery_id)
+        if not record:
+            return None
+        return {
+            "digital_twin": dict(record["digital_twin"], market=market_entry["market"]),
+            "diagnosis_ref": record["diagnosis_ref"],
+            "market_ref": market_entry["market_ref"]
+        }
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_battery')
+    async def _fetch_battery_record(tx, battery_id):
+        result = await tx.run(FETCH_BATTERY_QUERY, bat_id=battery_id)
+        record = await result.single()
+        return dict(record) if record else None
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_twin')
+    async def _fetch_twin_record(tx, battery_id, market_config_id):
+        result = await tx.run(FETCH_TWIN_QUERY, bat_id=battery_id, mkt_id=market_config_id)
+        record = await result.single()
+        return dict(record) if record else None
+
+    async def evaluate_and_save_decision(self, battery_id, engine, market_config_id="MKT_STD_2024"):
+        """
+        Async counterpart of BatteryRepository.evaluate_and_save_decision.
+
+        The engine runs in the executor between the read and the write
+        transactions (a transaction cannot stay open across the executor hop).
+        The write only creates the Decision if the diagnosis that was read is
+        still the battery's latest and the market still exists; otherwise the
+        twin is re-read from Neo4j and scored again.
+        """
+        record = self._cached_twin_record(battery_id, market_config_id)
+        for _ in range(DECISION_WRITE_ATTEMPTS):
+            if not record:
+                async with self._session() as session:
+                    record = await session.execute_read(
+                        self._read_twin_record, battery_id, market_config_id, self._registry_market(market_config_id)
+                    )
+                if not record:
+                    print(f"❌ [DB: {self.database}] Aucune batterie trouvée avec l'ID {battery_id}")
+                    return None
+                self._remember_twin_record(battery_id, market_config_id, record)
+
+            result = await self._run_engine(engine.evaluate_battery, record["digital_twin"])
+
+            async with self._session() as session:
+                decision_id = await session.execute_write(
+                    self._create_decision_query, battery_id, result,
+                    record["diagnosis_ref"], record["market_ref"]
+                )
+            if decision_id:
+                self._publish_decisions({battery_id: result}, market_config_id)
+                return result
+            # Diagnostic remplacé ou marché supprimé depuis la lecture : aucune
+            # décision n'a été créée, on relit depuis Neo4j
+            self._invalidate(battery_id)
+            if self.cache is not None:
+                self.cache.markets.invalidate(market_config_id)
+            record = None
+        raise Exception(f"Database error: the diagnosis or market of {battery_id} changed during every evaluation")
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'create_decision')
+    async def _create_decision_query(tx, battery_id, decision_result, diagnosis_ref, market_ref):
+        """Returns the created decision ID, or None (see BatteryRepository._create_decision_query)."""
+        result = await tx.run(
+            CREATE_DECISION_QUERY,
+            bat_id=battery_id,
+            market_ref=market_ref,
+            diagnosis_ref=diagnosis_ref,
+            **BatteryRepository._decision_params(decision_result)
+        )
+        record = await result.single()
+        return record["decision_id"] if record else None
+
+    async def evaluate_markets(self, battery_id, engine, market_ids=None, save=False):
+        """
+        Async counterpart of BatteryRepository.evaluate_markets (the engine runs
+        in the executor, between the read and the write transactions). With
+        save=True, a Decision that could not be linked (diagnosis replaced or
+        market deleted since the read) makes the twin and the markets be
+        re-read from Neo4j and scored again.
+        """
+        record = self._cached_battery_record(battery_id)
+        snapshot = self._registry_snapshot()
+        for _ in range(DECISION_WRITE_ATTEMPTS):
+            if record and snapshot is not None:
+                record = dict(record, snapshot=snapshot)
+            else:
+                async with self._session() as session:
+                    record = await session.execute_read(self._fetch_markets_record, battery_id, snapshot)
+                if not record:
+                    print(f"❌ [DB: {self.database}] Aucune batterie trouvée avec l'ID {battery_id}")
+                    return None
+                self._remember_battery_record(battery_id, record)
+
+            ids, weights = self._select_markets(record["snapshot"], market_ids)
+            results = await self._run_engine(engine.evaluate_markets, record["digital_twin"], ids, weights)
+            if not (save and results):
+                return results
+            async with self._session() as session:
+                decision_id = await session.execute_write(
+                    self._create_decision_query, battery_id, results[0],
+                    record["diagnosis_ref"], record["snapshot"].refs[results[0]["market_id"]]
+                )
+            if decision_id:
+                self._publish_decisions({battery_id: results[0]})
+                return results
+            # Diagnostic remplacé ou marché supprimé depuis la lecture : on relit
+            # le jumeau et les marchés depuis Neo4j
+            self._invalidate(battery_id)
+            record = snapshot = None
+        raise Exception(f"Database error: the diagnosis or markets of {battery_id} changed during every evaluation")
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_twin_markets')
+    async def _fetch_markets_record(tx, battery_id, snapshot=None):
+        """Async counterpart of BatteryRepository._fetch_markets_record."""
+        if snapshot is not None:
+            result = await tx.run(FETCH_BATTERY_QUERY, bat_id=battery_id)
+            record = await result.single()
+            return dict(record, snapshot=snapshot) if record else None
+
+        result = await tx.run(FETCH_TWIN_ALL_MARKETS_QUERY, bat_id=battery_id)
+        record = await result.single()
+        if not record:
+            return None
+        return {
+            "digital_twin": record["digital_twin"],
+            "diagnosis_ref": record["diagnosis_ref"],
+            "snapshot": MarketSnapshot(record["markets"], None)
+        }
+
+    async def get_digital_twins(self, battery_ids, market_config_id="MKT_STD_2024"):
+        """Async counterpart of BatteryRepository.get_digital_twins."""
+        if not battery_ids:
+            return {}
+        async with self._session() as session:
+            return await session.execute_read(self._fetch_batch_query, list(battery_ids), market_config_id)
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_twins_batch')
+    async def _fetch_batch_query(tx, battery_ids, market_config_id):
+        result = await tx.run(FETCH_TWINS_BATCH_QUERY, bat_ids=battery_ids, mkt_id=market_config_id)
+        twins = {}
+        async for record in result:
+            twin = record["digital_twin"]
+            twins.setdefault(twin["battery_id"], twin)
+        return twins
+
+    async def save_decisions(self, decisions, market_config_id="MKT_STD_2024"):
+        """Async counterpart of BatteryRepository.save_decisions."""
+        rows = [
+            dict(bat_id=battery_id, **BatteryRepository._decision_params(result))
+            for battery_id, result in decisions.items()
+        ]
+        if not rows:
+            return {}
+        async with self._session() as session:
+            decision_ids = await session.execute_write(self._save_batch_query, rows, market_config_id)
+        self._publish_decisions(
+            {battery_id: decisions[battery_id] for battery_id in decision_ids}, market_config_id
+        )
+        return decision_ids
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'save_decisions_batch')
+    async def _save_batch_query(tx, rows, market_config_id):
+        result = await tx.run(SAVE_DECISIONS_BATCH_QUERY, rows=rows, mkt_id=market_config_id)
+        return {record["battery_id"]: record["decision_id"] async for record in result}
+
+    # ========== GARAGIST & PROPRIETAIRE ==========
+
+    @metrics.timed('repository_query_seconds', 'create_battery_record')
+    async def create_battery_record(self, battery_id, voltage, capacity, temperature):
+        """Async counterpart of BatteryRepository.create_battery_record."""
+        parameters = {
+            'battery_id': battery_id,
+            'voltage': voltage,
+            'capacity': capacity,
+            'temperature': temperature,
+            'telemetry_block_size': TELEMETRY_BLOCK_SIZE
+        }
+        try:
+            async with self._session() as session:
+                result = await session.run(CREATE_BATTERY_QUERY, parameters)
+                record = await result.single()
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+        self._invalidate(battery_id)
+        self._remember_owner_status([record["owner_status"]] if record else [])
+        return {
+            'message': 'Battery record created successfully',
+            'battery_id': battery_id
+        }
+
+    async def create_battery_records(self, rows):
+        """Async counterpart of BatteryRepository.create_battery_records."""
+        if not rows:
+            return 0
+        try:
+            async with self._session() as session:
+                written, statuses = await session.execute_write(self._create_batch_query, rows)
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+        for row in rows:
+            self._invalidate(row['battery_id'])
+        self._remember_owner_status(statuses)
+        return written
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'create_battery_records_batch')
+    async def _create_batch_query(tx, rows):
+        """One query per round of distinct battery IDs (see BatteryRepository._create_batch_query)."""
+        written, statuses = 0, []
+        for round_rows in unique_rounds(rows):
+            result = await tx.run(CREATE_BATTERIES_BATCH_QUERY, rows=round_rows,
+                                  telemetry_block_size=TELEMETRY_BLOCK_SIZE)
+            record = await result.single()
+            written += record["written"]
+            statuses.extend(record["owner_statuses"])
+        return written, statuses
+
+    @metrics.timed('repository_query_seconds', 'update_battery_measurements')
+    async def update_battery_measurements(self, battery_id, voltage=None, capacity=None, temperature=None):
+        """Async counterpart of BatteryRepository.update_battery_measurements."""
+        if voltage is None and capacity is None and temperature is None:
+            raise ValueError("At least one field must be provided for update")
+
+        parameters = {
+            'battery_id': battery_id,
+            'voltage': voltage,
+            'capacity': capacity,
+            'temperature': temperature,
+            'telemetry_block_size': TELEMETRY_BLOCK_SIZE,
+        }
+        try:
+            async with self._session() as session:
+                result = await session.run(UPDATE_MEASUREMENTS_QUERY, parameters)
+                record = await result.single()
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+        self._invalidate(battery_id)
+        if record:
+            self._remember_owner_status([record["owner_status"]])
+            return {
+                'message': 'Battery record updated successfully',
+                'battery_id': battery_id,
+            }
+        return None
+
+    async def update_battery_status(self, battery_id, new_status):
+        """Async counterpart of BatteryRepository.update_battery_status."""
+        async with self._session() as session:
+            status = await session.execute_write(self._update_status_query, battery_id, new_status)
+        self._invalidate(battery_id)
+        self._remember_owner_status([status])
+        return status is not None
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'update_status')
+    async def _update_status_query(tx, battery_id, new_status):
+        result = await tx.run(UPDATE_STATUS_QUERY, bat_id=battery_id, status=new_status)
+        record = await result.single()
+        return record["owner_status"] if record else None
+
+    @metrics.timed('repository_query_seconds', 'battery_exists')
+    async def battery_exists(self, battery_id):
+        """Async counterpart of BatteryRepository.battery_exists."""
+        return await self._single_record(BATTERY_EXISTS_QUERY, battery_id=battery_id) is not None
+
+    @metrics.timed('repository_query_seconds', 'get_all_battery_data')
+    async def get_all_battery_data(self, battery_id):
+        """Async counterpart of BatteryRepository.get_all_battery_data."""
+        return await self._single_record(ALL_BATTERY_DATA_QUERY, battery_id=battery_id)
+
+    @metrics.timed('repository_query_seconds', 'get_battery_status')
+    async def get_battery_status(self, battery_id):
+        """Async counterpart of BatteryRepository.get_battery_status."""
+        return await self._single_record(BATTERY_STATUS_QUERY, battery_id=battery_id)
+
+    async def get_battery_status_payload(self, battery_id):
+        """Async counterpart of BatteryRepository.get_battery_status_payload."""
+        payload, version = self._owner_status_payload(battery_id)
+        if payload is not None:
+            return payload, version
+        status = await self.get_battery_status(battery_id)
+        self._fill_owner_status(status)
+        return (serialize(status), status['version']) if status else (None, None)
+
+    @metrics.timed('repository_query_seconds', 'get_battery_version')
+    async def get_battery_version(self, battery_id):
+        """Async counterpart of BatteryRepository.get_battery_version."""
+        record = await self._single_record(BATTERY_VERSION_QUERY, battery_id=battery_id)
+        return record["version"] if record else None
+
+    async def get_owner_status_version(self, battery_id):
+        """Async counterpart of BatteryRepository.get_owner_status_version."""
+        if self.owner_status is None:
+            return await self.get_battery_version(battery_id)
+        version = self.owner_status.get_version(battery_id)
+        if version is None:
+            _, version = await self.get_battery_status_payload(battery_id)
+        return version
+
+    @metrics.timed('repository_query_seconds', 'get_telemetry_blocks')
+    async def get_telemetry_blocks(self, battery_id, start=None, end=None):
+        """Async counterpart of BatteryRepository.get_telemetry_blocks."""
+        record = await self._single_record(TELEMETRY_BLOCKS_QUERY, battery_id=battery_id, start=start, end=end)
+        return list(record["blocks"]) if record else None
+
+    async def _single_record(self, query, **parameters):
+        """Auto-commit read returning the single record as a dict, or None."""
+        try:
+            async with self._session() as session:
+                result = await session.run(query, parameters)
+                record = await result.single()
+        except Exception as e:
+            raise Exception(f"Database error: {str(e)}")
+        return dict(record) if record else None
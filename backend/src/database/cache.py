@@ -0,0 +1,25 @@
+from ..cache import LRUCache
+
+
+class DigitalTwinCache:
+    """
+    Read-through cache in front of BatteryRepository.get_digital_twin.
+
+    Battery data (passport + latest diagnosis) is keyed by battery ID and
+    market configs by market ID, so one battery evaluated against several
+    markets is read once. Repository writes invalidate the battery entry.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=300, market_max_entries=64, market_ttl_seconds=300):
+        self.twins = LRUCache(max_entries, ttl_seconds)
+        self.markets = LRUCache(market_max_entries, market_ttl_seconds)
+
+    def invalidate_battery(self, battery_id):
+        self.twins.invalidate(battery_id)
+
+    def clear(self):
+        self.twins.clear()
+        self.markets.clear()
+
+    def stats(self):
+        return {'twins': self.twins.stats(), 'markets': self.markets.stats()}
@@ -0,0 +1,169 @@
+"""
+In-process change bus feeding GET /battery/events/<id> (server-sent events).
+
+Repository writes publish what they changed, keyed by battery ID: the new
+owner status of every battery write ("status") and the recommendation of
+every saved Decision ("decision"). Each subscriber has a bounded queue; a
+subscriber that falls `max_queue` events behind is evicted (its queue is
+replaced by a single "evicted" event) instead of slowing down writers or
+growing without bound. Publishing costs a dict lookup when nobody listens.
+
+The bus is per process: subscribers only see writes made by the same worker
+(the event stream also re-checks the battery's version at every heartbeat).
+"""
+import asyncio
+import threading
+from collections import deque
+
+EVICTED = "evicted"
+
+
+class Subscription:
+    """Bounded queue of (event, data) for one battery, filled by ChangeBus.publish."""
+
+    def __init__(self, bus, battery_id, max_queue):
+        self.bus = bus
+        self.battery_id = battery_id
+        self.max_queue = max_queue
+        self._events = deque()
+        self._ready = threading.Condition()
+        # (loop, future) of an async consumer waiting in get_async
+        self._waiter = None
+        self.closed = False
+        self.evicted = False
+
+    def _offer(self, event, data):
+        """Queue an event (called by the bus); returns False if the subscriber was evicted."""
+        with self._ready:
+            if self.closed:
+                return False
+            if len(self._events) >= self.max_queue:
+                self._events.clear()
+                self._events.append((EVICTED, None))
+                self.evicted = self.closed = True
+            else:
+                self._events.append((event, data))
+            self._ready.notify()
+            waiter = self._waiter
+        if waiter is not None:
+            loop, future = waiter
+            loop.call_soon_threadsafe(_wake, future)
+        return not self.evicted
+
+    def _pop(self):
+        return self._events.popleft() if self._events else None
+
+    def get(self, timeout=None):
+        """Next (event, data), or None after `timeout` seconds (or once closed and drained)."""
+        with self._ready:
+            if not self._events and not self.closed:
+                self._ready.wait(timeout)
+            return self._pop()
+
+    async def get_async(self, timeout=None):
+        """Async counterpart of get, for consumers running on an event loop."""
+        with self._ready:
+            if self._events or self.closed:
+                return self._pop()
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._waiter = (loop, future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._ready:
+                self._waiter = None
+        with self._ready:
+            return self._pop()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ChangeBus:
+    """Fan-out of repository changes to the subscribers of each battery ID."""
+
+    def __init__(self, max_queue=64, max_subscribers=10000):
+        """
+        Args:
+            max_queue: Pending events per subscriber before it is evicted
+            max_subscribers: Open subscriptions (all batteries) before subscribe() refuses new ones
+        """
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}  # battery_id -> set of Subscription
+        self._count = 0
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.evictions = 0
+
+    def subscribe(self, battery_id):
+        """Open a Subscription for one battery (RuntimeError when max_subscribers are open)."""
+        subscription = Subscription(self, battery_id, self.max_queue)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise RuntimeError(f"Too many open subscriptions ({self.max_subscribers})")
+            self._subscribers.setdefault(battery_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._remove(subscription)
+        with subscription._ready:
+            subscription.closed = True
+            subscription._ready.notify_all()
+
+    def _remove(self, subscription):
+        subscribers = self._subscribers.get(subscription.battery_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.battery_id]
+
+    def publish(self, event, battery_id, data):
+        self.publish_many(event, [(battery_id, data)])
+
+    def publish_many(self, event, changes):
+        """Deliver (battery_id, data) pairs to the subscribers of each battery, evicting full queues."""
+        if not self._subscribers:
+            return
+        with self._lock:
+            for battery_id, data in changes:
+                subscribers = self._subscribers.get(battery_id)
+                if not subscribers:
+                    continue
+                for subscription in list(subscribers):
+                    if subscription._offer(event, data):
+                        self.delivered += 1
+                    else:
+                        self._remove(subscription)
+                        self.evictions += subscription.evicted
+
+    def __len__(self):
+        return self._count
+
+    def stats(self):
+        with self._lock:
+            batteries = len(self._subscribers)
+        return {
+            'subscribers': self._count,
+            'batteries': batteries,
+            'delivered': self.delivered,
+            'evictions': self.evictions,
+        }
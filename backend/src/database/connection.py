@@ -0,0 +1,116 @@
+import atexit
+import os
+import threading
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+
+# Pool settings (overridable through environment variables)
+DEFAULT_MAX_POOL_SIZE = 50
+DEFAULT_ACQUISITION_TIMEOUT = 30.0       # seconds to wait for a free connection
+DEFAULT_MAX_CONNECTION_LIFETIME = 3600.0  # seconds before a connection is recycled
+
+_lock = threading.Lock()
+_driver = None
+_driver_pid = None
+_async_driver = None
+_async_driver_pid = None
+
+
+def _pool_settings():
+    """Read pool configuration from the environment (empty values keep the defaults)."""
+    return {
+        'max_connection_pool_size': int(os.getenv("NEO4J_MAX_POOL_SIZE") or DEFAULT_MAX_POOL_SIZE),
+        'connection_acquisition_timeout': float(
+            os.getenv("NEO4J_ACQUISITION_TIMEOUT") or DEFAULT_ACQUISITION_TIMEOUT
+        ),
+        'max_connection_lifetime': float(
+            os.getenv("NEO4J_MAX_CONNECTION_LIFETIME") or DEFAULT_MAX_CONNECTION_LIFETIME
+        ),
+    }
+
+
+def get_driver(uri=None, user=None, password=None):
+    """
+    Return the process-wide Neo4j driver, creating it on first use.
+
+    The driver owns the Bolt connection pool, so every request borrows sessions
+    from it instead of opening new connections. It is bound to the process that
+    created it: a forked worker (e.g. Gunicorn) lazily builds its own driver.
+    """
+    global _driver, _driver_pid
+
+    pid = os.getpid()
+    if _driver is not None and _driver_pid == pid:
+        return _driver
+
+    with _lock:
+        if _driver is None or _driver_pid != pid:
+            _driver = GraphDatabase.driver(
+                uri or os.getenv("NEO4J_URI"),
+                auth=(user or os.getenv("NEO4J_USER"), password or os.getenv("NEO4J_DB_PASSWORD")),
+                **_pool_settings()
+            )
+            _driver_pid = pid
+        return _driver
+
+
+def close_driver():
+    """Close the shared driver of the current process (shutdown hook)."""
+    global _driver, _driver_pid
+
+    with _lock:
+        if _driver is not None and _driver_pid == os.getpid():
+            _driver.close()
+        _driver = None
+        _driver_pid = None
+
+
+def get_async_driver(uri=None, user=None, password=None):
+    """
+    Return the process-wide neo4j.AsyncDriver (ASGI mode), creating it on first use.
+
+    Same pool settings as get_driver. The async driver belongs to the event loop
+    of the worker that first uses it; call close_async_driver() on shutdown.
+    """
+    global _async_driver, _async_driver_pid
+
+    pid = os.getpid()
+    if _async_driver is None or _async_driver_pid != pid:
+        _async_driver = AsyncGraphDatabase.driver(
+            uri or os.getenv("NEO4J_URI"),
+            auth=(user or os.getenv("NEO4J_USER"), password or os.getenv("NEO4J_DB_PASSWORD")),
+            **_pool_settings()
+        )
+        _async_driver_pid = pid
+    return _async_driver
+
+
+async def close_async_driver():
+    """Close the async driver of the current process (ASGI shutdown hook)."""
+    global _async_driver, _async_driver_pid
+
+    driver = _async_driver
+    _async_driver = None
+    if driver is not None and _async_driver_pid == os.getpid():
+        await driver.close()
+    _async_driver_pid = None
+
+
+def _reset_after_fork():
+    """
+    Drop the inherited driver in a forked child without closing it:
+    its sockets still belong to the parent process.
+    """
+    global _lock, _driver, _driver_pid, _async_driver, _async_driver_pid
+
+    _lock = threading.Lock()
+    _driver = None
+    _driver_pid = None
+    _async_driver = None
+    _async_driver_pid = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+atexit.register(close_driver)
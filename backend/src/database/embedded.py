@@ -0,0 +1,548 @@
+"""
+Embedded storage backend: the BatteryRepository contract on in-process data
+structures, without a Neo4j server (tests, benchmarks, small edge sites).
+
+    REPOSITORY_BACKEND=embedded EMBEDDED_DATA_FILE=edge.json python app.py
+
+Every node type is a dict keyed by battery ID (hash index). The diagnoses of
+a battery are kept sorted by date, so the latest one (what LATEST_DIAGNOSIS
+points to in the graph) is the last element of its list. Writes hold one
+lock; the data lives in the worker process (run a single worker), loaded from
+and saved to a JSON file when EMBEDDED_DATA_FILE is set:
+
+    {"markets": [{"id": "MKT_STD_2024", "weight_reuse": 1.0, ...}],
+     "batteries": [{"id": "BAT_001", "voltage": 3.7, "capacity": 50, "temperature": 25,
+                    "passport": {...}, "diagnoses": [{...}], "decisions": [...], "telemetry": [...]}]}
+"""
+import bisect
+import itertools
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+from .markets import MarketSnapshot
+from .owner_status import serialize
+from .repository import BatteryRepository, CachedTwinMixin
+from .telemetry import SERIES, TELEMETRY_BLOCK_SIZE
+
+# Properties of the digital twin projection (DIGITAL_TWIN_PROJECTION in repository.py)
+PASSPORT_FIELDS = (
+    "soh_percent", "soc_percent", "known_defects", "critical_defects", "battery_model", "model",
+    "chemistry", "date_placing_market", "market_date", "total_energy_throughput_kwh", "energy_throughput",
+    "potentials_repurposing_remanufacturing", "repurpose_potential", "design_for_disassembly",
+    "design_modularity_score", "modularity", "capacity_fade_percent_per_year", "capacity_fade",
+    "accidents", "accident_history", "history_of_abuse", "battery_status", "status",
+)
+DIAGNOSIS_FIELDS = (
+    "soh_percent", "soc_percent", "internal_resistance_mOhm", "known_defects", "critical_defects",
+    "accidents", "history_of_abuse", "battery_status", "date", "total_energy_throughput_kwh",
+)
+MEASUREMENT_FIELDS = ("voltage", "capacity", "temperature")
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _timestamp_string():
+    """Current time as toString(datetime()) renders it in Neo4j."""
+    return _now().isoformat().replace("+00:00", "Z")
+
+
+def _as_datetime(value):
+    """Timezone-aware datetime of a diagnosis date (datetime, date or ISO 8601 string; None = now)."""
+    if value is None:
+        return _now()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _diagnosis_date(diagnosis):
+    return diagnosis["date"]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+class EmbeddedStore:
+    """
+    Process-wide data of the embedded backend, shared by every
+    EmbeddedBatteryRepository of the worker.
+    """
+
+    def __init__(self):
+        self.batteries = {}   # battery_id -> {id, voltage, capacity, temperature, created_at, version, inputs_updated_at}
+        self.passports = {}   # battery_id -> BatteryPassport properties
+        self.diagnoses = {}   # battery_id -> [diagnosis], sorted by date (latest last)
+        self.decisions = {}   # battery_id -> [decision]
+        self.telemetry = {}   # battery_id -> [block], by seq (open block last)
+        self.markets = {}     # market_id -> MarketConfig properties
+        self.lock = threading.RLock()
+        self._refs = itertools.count(1)
+        self._market_snapshot = None
+
+    @classmethod
+    def open(cls, path=None):
+        """New store, loaded from `path` if the file exists."""
+        store = cls()
+        if path and os.path.exists(path):
+            store.load(path)
+        return store
+
+    # ---------- Markets ----------
+
+    def put_market(self, market):
+        with self.lock:
+            self.markets[market["id"]] = dict(market)
+            self._market_snapshot = None
+
+    def market_rows(self):
+        """[{id, market, market_ref}] sorted by id (rows of MARKETS_QUERY)."""
+        with self.lock:
+            return [
+                {"id": market_id, "market": dict(self.markets[market_id]), "market_ref": market_id}
+                for market_id in sorted(self.markets)
+            ]
+
+    def market_snapshot(self):
+        snapshot = self._market_snapshot
+        if snapshot is None:
+            snapshot = self._market_snapshot = MarketSnapshot(self.market_rows(), None)
+        return snapshot
+
+    # ---------- Diagnoses ----------
+
+    def insert_diagnosis(self, battery_id, diagnosis):
+        """
+        Insert at its date in the battery's ordered list (a diagnosis dated
+        before the current latest one does not replace it). Returns its reference.
+        """
+        diagnosis = dict(diagnosis, date=_as_datetime(diagnosis.get("date")))
+        diagnosis["_ref"] = f"diagnosis:{next(self._refs)}"
+        diagnoses = self.diagnoses.setdefault(battery_id, [])
+        bisect.insort_right(diagnoses, diagnosis, key=_diagnosis_date)
+        if diagnoses[-1] is diagnosis:
+            self.batteries[battery_id]["inputs_updated_at"] = _now()
+        return diagnosis["_ref"]
+
+    def latest_diagnosis(self, battery_id):
+        diagnoses = self.diagnoses.get(battery_id)
+        return diagnoses[-1] if diagnoses else None
+
+    # ---------- Persistence ----------
+
+    def load(self, path):
+        """Add the markets and batteries of a JSON file (format in the module docstring)."""
+        with open(path) as f:
+            data = json.load(f)
+        with self.lock:
+            for market in data.get("markets", []):
+                self.put_market(market)
+            for battery in data.get("batteries", []):
+                self._load_battery(dict(battery))
+
+    def _load_battery(self, battery):
+        battery_id = battery["id"]
+        passport = battery.pop("passport", None)
+        diagnoses = battery.pop("diagnoses", [])
+        decisions = battery.pop("decisions", [])
+        telemetry = battery.pop("telemetry", [])
+        updated_at = battery.get("inputs_updated_at")
+        for field in MEASUREMENT_FIELDS:
+            battery.setdefault(field, None)
+        battery.setdefault("created_at", _timestamp_string())
+        battery.setdefault("version", 0)
+        self.batteries[battery_id] = battery
+        if passport is not None:
+            self.passports[battery_id] = dict(passport)
+        for diagnosis in diagnoses:
+            self.insert_diagnosis(battery_id, diagnosis)
+        # Loading is not a change of the engine inputs: keep the saved watermark
+        battery["inputs_updated_at"] = _as_datetime(updated_at) if updated_at else None
+        if decisions:
+            self.decisions[battery_id] = list(decisions)
+        if telemetry:
+            self.telemetry[battery_id] = [dict(block) for block in telemetry]
+
+    def save(self, path):
+        """Write every market and battery to `path` (atomically: temporary file, then rename)."""
+        with self.lock:
+            data = {
+                "markets": [self.markets[market_id] for market_id in sorted(self.markets)],
+                "batteries": [self._dump_battery(battery_id) for battery_id in sorted(self.batteries)],
+            }
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, default=_json_default)
+        os.replace(tmp_path, path)
+
+    def _dump_battery(self, battery_id):
+        battery = dict(self.batteries[battery_id])
+        if battery_id in self.passports:
+            battery["passport"] = self.passports[battery_id]
+        battery["diagnoses"] = [
+            {key: value for key, value in diagnosis.items() if key != "_ref"}
+            for diagnosis in self.diagnoses.get(battery_id, [])
+        ]
+        battery["decisions"] = self.decisions.get(battery_id, [])
+        battery["telemetry"] = self.telemetry.get(battery_id, [])
+        return battery
+
+    def __len__(self):
+        return len(self.batteries)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'batteries': len(self.batteries),
+                'passports': len(self.passports),
+                'diagnoses': sum(len(diagnoses) for diagnoses in self.diagnoses.values()),
+                'decisions': sum(len(decisions) for decisions in self.decisions.values()),
+                'markets': len(self.markets),
+            }
+
+
+class EmbeddedBatteryRepository(CachedTwinMixin):
+    """
+    BatteryRepository semantics (see protocol.py) on an EmbeddedStore: same
+    return values, versions, owner-status read model and change bus events.
+    """
+
+    def __init__(self, store, owner_status=None, changes=None):
+        self.store = store
+        # The store is already in memory: no twin cache, markets read from the store
+        self.cache = None
+        self.markets = None
+        self.owner_status = owner_status
+        self.changes = changes
+
+    def close(self):
+        pass
+
+    # ---------- Digital twins ----------
+
+    def _battery_record(self, battery_id):
+        """{digital_twin (without market), diagnosis_ref}, or None if the battery is unknown."""
+        if battery_id not in self.store.batteries:
+            return None
+        passport = self.store.passports.get(battery_id) or {}
+        diagnosis = self.store.latest_diagnosis(battery_id) or {}
+        return {
+            "digital_twin": {
+                "battery_id": battery_id,
+                "passport": {field: passport.get(field) for field in PASSPORT_FIELDS},
+                "diagnosis": {field: diagnosis.get(field) for field in DIAGNOSIS_FIELDS},
+                "market": None
+            },
+            "diagnosis_ref": diagnosis.get("_ref")
+        }
+
+    def _twin_record(self, battery_id, market_config_id):
+        market = self.store.markets.get(market_config_id)
+        if market is None:
+            return None
+        with self.store.lock:
+            record = self._battery_record(battery_id)
+        if record is None:
+            return None
+        record["digital_twin"]["market"] = dict(market)
+        return record
+
+    def get_digital_twin(self, battery_id, market_config_id="MKT_STD_2024"):
+        record = self._twin_record(battery_id, market_config_id)
+        return record["digital_twin"] if record else None
+
+    def get_digital_twins(self, battery_ids, market_config_id="MKT_STD_2024"):
+        twins = {}
+        for battery_id in battery_ids:
+            record = self._twin_record(battery_id, market_config_id)
+            if record is not None:
+                twins.setdefault(battery_id, record["digital_twin"])
+        return twins
+
+    def _twin_page(self, battery_ids, after_id, limit, market_config_id):
+        if market_config_id not in self.store.markets:
+            return []
+        page = sorted(battery_id for battery_id in battery_ids if battery_id > after_id)[:limit]
+        return list(self.get_digital_twins(page, market_config_id).values())
+
+    def get_digital_twin_page(self, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        with self.store.lock:
+            battery_ids = list(self.store.batteries)
+        return self._twin_page(battery_ids, after_id, limit, market_config_id)
+
+    def get_changed_twin_page(self, since, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        with self.store.lock:
+            battery_ids = [
+                battery_id for battery_id, battery in self.store.batteries.items()
+                if (battery["inputs_updated_at"] is not None and battery["inputs_updated_at"] > since)
+                or (self.store.latest_diagnosis(battery_id) or {}).get("date", since) > since
+            ]
+        return self._twin_page(battery_ids, after_id, limit, market_config_id)
+
+    def get_database_time(self):
+        return _now()
+
+    # ---------- Decisions ----------
+
+    def _create_decision(self, battery_id, decision_result, diagnosis_ref, market_config_id):
+        decision_id = f"DEC_{int(time.time() * 1000)}_{battery_id}_{uuid.uuid4()}"
+        self.store.decisions.setdefault(battery_id, []).append(dict(
+            id=decision_id,
+            market_id=market_config_id,
+            diagnosis_ref=diagnosis_ref,
+            created_at=_timestamp_string(),
+            **BatteryRepository._decision_params(decision_result)
+        ))
+        return decision_id
+
+    def save_decision(self, battery_id, decision_result, market_config_id="MKT_STD_2024"):
+        with self.store.lock:
+            if battery_id not in self.store.batteries or market_config_id not in self.store.markets:
+                return None
+            diagnosis = self.store.latest_diagnosis(battery_id) or {}
+            decision_id = self._create_decision(battery_id, decision_result, diagnosis.get("_ref"), market_config_id)
+        self._publish_decisions({battery_id: decision_result}, market_config_id)
+        return decision_id
+
+    def save_decisions(self, decisions, market_config_id="MKT_STD_2024"):
+        decision_ids = {}
+        with self.store.lock:
+            if market_config_id not in self.store.markets:
+                return {}
+            for battery_id, result in decisions.items():
+                if battery_id not in self.store.batteries:
+                    continue
+                diagnosis = self.store.latest_diagnosis(battery_id) or {}
+                decision_ids[battery_id] = self._create_decision(
+                    battery_id, result, diagnosis.get("_ref"), market_config_id
+                )
+        self._publish_decisions(
+            {battery_id: decisions[battery_id] for battery_id in decision_ids}, market_config_id
+        )
+        return decision_ids
+
+    def _is_latest(self, battery_id, diagnosis_ref):
+        """True if `diagnosis_ref` is still the battery's latest diagnosis (call with the lock held)."""
+        return (self.store.latest_diagnosis(battery_id) or {}).get("_ref") == diagnosis_ref
+
+    def evaluate_and_save_decision(self, battery_id, engine, market_config_id="MKT_STD_2024"):
+        """
+        The engine runs outside the lock; if a newer diagnosis arrived (or the
+        market was deleted) in the meantime, the twin is read and scored again
+        under the lock, so the Decision is never linked to a superseded diagnosis.
+        """
+        record = self._twin_record(battery_id, market_config_id)
+        if record is None:
+            return None
+        result = engine.evaluate_battery(record["digital_twin"])
+        with self.store.lock:
+            if not (market_config_id in self.store.markets and self._is_latest(battery_id, record["diagnosis_ref"])):
+                record = self._twin_record(battery_id, market_config_id)
+                if record is None:
+                    return None
+                result = engine.evaluate_battery(record["digital_twin"])
+            self._create_decision(battery_id, result, record["diagnosis_ref"], market_config_id)
+        self._publish_decisions({battery_id: result}, market_config_id)
+        return result
+
+    def evaluate_markets(self, battery_id, engine, market_ids=None, save=False):
+        with self.store.lock:
+            record = self._battery_record(battery_id)
+        if record is None:
+            return None
+        ids, weights = self._select_markets(self.store.market_snapshot(), market_ids)
+        results = engine.evaluate_markets(record["digital_twin"], ids, weights)
+        if not (save and results):
+            return results
+        with self.store.lock:
+            if not (results[0]["market_id"] in self.store.markets and self._is_latest(battery_id, record["diagnosis_ref"])):
+                # Same re-read as evaluate_and_save_decision, markets included
+                record = self._battery_record(battery_id)
+                ids, weights = self._select_markets(self.store.market_snapshot(), market_ids)
+                results = engine.evaluate_markets(record["digital_twin"], ids, weights)
+                if not results:
+                    return results
+            self._create_decision(battery_id, results[0], record["diagnosis_ref"], results[0]["market_id"])
+        self._publish_decisions({battery_id: results[0]})
+        return results
+
+    # ---------- Diagnoses ----------
+
+    def add_sorting_diagnosis(self, battery_id, diagnosis):
+        with self.store.lock:
+            if battery_id not in self.store.batteries:
+                return None
+            return self.store.insert_diagnosis(battery_id, diagnosis)
+
+    # ---------- Garagist & owner ----------
+
+    def _write_measurements(self, battery_id, fields, create=False):
+        """Apply non-None measurements, bump the version, append telemetry; returns the owner status."""
+        battery = self.store.batteries.get(battery_id)
+        if battery is None:
+            if not create:
+                return None
+            battery = self.store.batteries[battery_id] = {
+                "id": battery_id, "voltage": None, "capacity": None, "temperature": None,
+                "created_at": _timestamp_string(), "version": 0, "inputs_updated_at": None
+            }
+        for field in MEASUREMENT_FIELDS:
+            if create or fields.get(field) is not None:
+                battery[field] = fields.get(field)
+        battery["version"] += 1
+        self._append_telemetry(battery)
+        return self._owner_status(battery_id)
+
+    def _append_telemetry(self, battery):
+        ts = int(time.time() * 1000)
+        blocks = self.store.telemetry.setdefault(battery["id"], [])
+        block = blocks[-1] if blocks else None
+        if block is None or block["count"] >= TELEMETRY_BLOCK_SIZE:
+            block = {
+                "seq": block["seq"] + 1 if block else 0, "start": ts, "end": ts, "count": 0,
+                "timestamps": [], **{name: [] for name in SERIES}
+            }
+            blocks.append(block)
+        block["timestamps"].append(ts)
+        for name in SERIES:
+            value = battery.get(name)
+            block[name].append(float(value) if value is not None else math.nan)
+        block["count"] += 1
+        block["start"] = min(block["start"], ts)
+        block["end"] = max(block["end"], ts)
+
+    def _owner_status(self, battery_id):
+        battery = self.store.batteries[battery_id]
+        passport = self.store.passports.get(battery_id) or {}
+        return {
+            "battery_id": battery_id,
+            "status": passport.get("battery_status"),
+            "voltage": battery["voltage"],
+            "capacity": battery["capacity"],
+            "soh_percent": passport.get("soh_percent"),
+            "version": battery["version"]
+        }
+
+    def create_battery_record(self, battery_id, voltage, capacity, temperature):
+        fields = {"voltage": voltage, "capacity": capacity, "temperature": temperature}
+        with self.store.lock:
+            status = self._write_measurements(battery_id, fields, create=True)
+        self._remember_owner_status([status])
+        return {
+            'message': 'Battery record created successfully',
+            'battery_id': battery_id
+        }
+
+    def create_battery_records(self, rows):
+        if not rows:
+            return 0
+        with self.store.lock:
+            statuses = [self._write_measurements(row['battery_id'], row, create=True) for row in rows]
+        self._remember_owner_status(statuses)
+        return len(statuses)
+
+    def update_battery_measurements(self, battery_id, voltage=None, capacity=None, temperature=None):
+        if voltage is None and capacity is None and temperature is None:
+            raise ValueError("At least one field must be provided for update")
+        fields = {"voltage": voltage, "capacity": capacity, "temperature": temperature}
+        with self.store.lock:
+            status = self._write_measurements(battery_id, fields)
+        if status is None:
+            return None
+        self._remember_owner_status([status])
+        return {
+            'message': 'Battery record updated successfully',
+            'battery_id': battery_id,
+        }
+
+    def update_battery_measurements_batch(self, updates):
+        with self.store.lock:
+            statuses = [self._write_measurements(battery_id, fields) for battery_id, fields in updates.items()]
+        statuses = [status for status in statuses if status is not None]
+        self._remember_owner_status(statuses)
+        return [status['battery_id'] for status in statuses]
+
+    def update_battery_status(self, battery_id, new_status):
+        with self.store.lock:
+            passport = self.store.passports.get(battery_id)
+            if battery_id not in self.store.batteries or passport is None:
+                return False
+            passport["battery_status"] = new_status
+            passport["status"] = new_status
+            battery = self.store.batteries[battery_id]
+            battery["inputs_updated_at"] = _now()
+            battery["version"] += 1
+            status = self._owner_status(battery_id)
+        self._remember_owner_status([status])
+        return True
+
+    def battery_exists(self, battery_id):
+        return battery_id in self.store.batteries
+
+    def get_all_battery_data(self, battery_id):
+        with self.store.lock:
+            battery = self.store.batteries.get(battery_id)
+            if battery is None:
+                return None
+            passport = self.store.passports.get(battery_id) or {}
+            return {
+                'battery_id': battery_id,
+                'voltage': battery['voltage'],
+                'capacity': battery['capacity'],
+                'temperature': battery['temperature'],
+                'created_at': battery['created_at'],
+                'soh_percent': passport.get('soh_percent'),
+                'chemistry': passport.get('chemistry'),
+                'battery_model': passport.get('battery_model'),
+                'battery_status': passport.get('battery_status'),
+                'energy_throughput': passport.get('total_energy_throughput_kwh'),
+                'version': battery['version']
+            }
+
+    def get_battery_status(self, battery_id):
+        with self.store.lock:
+            if battery_id not in self.store.batteries:
+                return None
+            return self._owner_status(battery_id)
+
+    def get_battery_status_payload(self, battery_id):
+        payload, version = self._owner_status_payload(battery_id)
+        if payload is not None:
+            return payload, version
+        status = self.get_battery_status(battery_id)
+        self._fill_owner_status(status)
+        return (serialize(status), status['version']) if status else (None, None)
+
+    def get_battery_version(self, battery_id):
+        battery = self.store.batteries.get(battery_id)
+        return battery["version"] if battery is not None else None
+
+    def get_owner_status_version(self, battery_id):
+        if self.owner_status is None:
+            return self.get_battery_version(battery_id)
+        version = self.owner_status.get_version(battery_id)
+        if version is None:
+            _, version = self.get_battery_status_payload(battery_id)
+        return version
+
+    def get_telemetry_blocks(self, battery_id, start=None, end=None):
+        with self.store.lock:
+            if battery_id not in self.store.batteries:
+                return None
+            return [
+                {"seq": block["seq"], "timestamps": list(block["timestamps"]),
+                 **{name: list(block[name]) for name in SERIES}}
+                for block in self.store.telemetry.get(battery_id, [])
+                if (start is None or block["end"] >= start) and (end is None or block["start"] <= end)
+            ]
@@ -0,0 +1,177 @@
+"""
+One-off maintenance commands for the Neo4j graph.
+
+Usage (from backend/):
+    python -m src.database.maintenance apply-schema
+    python -m src.database.maintenance check-query-plans
+    python -m src.database.maintenance backfill-latest-diagnosis
+    python -m src.database.maintenance check-latest-diagnosis
+    python -m src.database.maintenance publish-rule-set rules/2026-10.json
+    python -m src.database.maintenance rebuild-owner-status [path]
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from .connection import get_driver, close_driver
+from .owner_status import OwnerStatusStore
+from .rulesets import publish_rule_set
+from .schema import apply_schema, check_query_plans
+from ..engine.rulesets import RuleSet
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_latest_diagnosis(driver, database="neo4j", batch_size=BACKFILL_BATCH_SIZE):
+    """
+    (Re)build the (:Battery)-[:LATEST_DIAGNOSIS]->(:SortingDiagnosis) pointer of
+    every battery from its UNDERWENT_DIAGNOSIS history. Idempotent.
+
+    Returns:
+        Number of batteries processed
+    """
+    query = """
+    MATCH (b:Battery)
+    WHERE EXISTS { (b)-[:UNDERWENT_DIAGNOSIS]->(:SortingDiagnosis) }
+    CALL {
+        WITH b
+        MATCH (b)-[:UNDERWENT_DIAGNOSIS]->(d:SortingDiagnosis)
+        WITH b, d
+        ORDER BY d.date DESC LIMIT 1
+        OPTIONAL MATCH (b)-[old:LATEST_DIAGNOSIS]->()
+        WITH b, d, collect(old) AS olds
+        FOREACH (rel IN olds | DELETE rel)
+        CREATE (b)-[:LATEST_DIAGNOSIS]->(d)
+    } IN TRANSACTIONS OF $batch_size ROWS
+    RETURN count(b) AS processed
+    """
+    # CALL { ... } IN TRANSACTIONS needs an auto-commit transaction
+    with driver.session(database=database) as session:
+        record = session.run(query, batch_size=batch_size).single()
+        return record["processed"] if record else 0
+
+
+def check_latest_diagnosis(driver, database="neo4j"):
+    """
+    Compare every LATEST_DIAGNOSIS pointer with the most recent diagnosis.
+
+    Returns:
+        List of dicts describing inconsistent batteries (empty if consistent)
+    """
+    query = """
+    MATCH (b:Battery)
+    OPTIONAL MATCH (b)-[:UNDERWENT_DIAGNOSIS]->(d:SortingDiagnosis)
+    WITH b, d
+    ORDER BY d.date DESC
+    WITH b, collect(d)[0] AS expected
+    OPTIONAL MATCH (b)-[:LATEST_DIAGNOSIS]->(actual:SortingDiagnosis)
+    WITH b, expected, collect(actual) AS actuals
+    WITH b, expected, actuals,
+         CASE
+             WHEN expected IS NULL AND size(actuals) = 0 THEN null
+             WHEN expected IS NULL THEN 'POINTER_WITHOUT_DIAGNOSIS'
+             WHEN size(actuals) = 0 THEN 'MISSING_POINTER'
+             WHEN size(actuals) > 1 THEN 'MULTIPLE_POINTERS'
+             WHEN NOT EXISTS { (b)-[:UNDERWENT_DIAGNOSIS]->(x) WHERE x = actuals[0] } THEN 'FOREIGN_DIAGNOSIS'
+             WHEN actuals[0] <> expected AND COALESCE(actuals[0].date <> expected.date, true) THEN 'STALE_POINTER'
+             ELSE null
+         END AS problem
+    WHERE problem IS NOT NULL
+    RETURN b.id AS battery_id, problem, size(actuals) AS pointers
+    ORDER BY battery_id
+    """
+    with driver.session(database=database) as session:
+        return [dict(record) for record in session.run(query)]
+
+
+COMMANDS = {
+    'apply-schema': 'Create uniqueness constraints and indexes (idempotent)',
+    'check-query-plans': 'EXPLAIN every repository query and fail on label scans',
+    'backfill-latest-diagnosis': 'Rebuild LATEST_DIAGNOSIS pointers from the diagnosis history',
+    'check-latest-diagnosis': 'Report batteries whose LATEST_DIAGNOSIS pointer is missing or stale',
+    'publish-rule-set': 'Store a rule set JSON file as the active RuleSet node',
+    'rebuild-owner-status': 'Reload the owner-status read model (OWNER_STATUS_STORE) from the graph',
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Neo4j maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        if name == 'publish-rule-set':
+            subparser.add_argument("path", help='JSON file {"id": ..., "rules": {CONSTANT: value}}')
+        if name == 'rebuild-owner-status':
+            subparser.add_argument("path", nargs="?", help="SQLite file (default: OWNER_STATUS_STORE)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'publish-rule-set':
+        # Validated before connecting: a bad file never reaches the graph
+        try:
+            with open(args.path) as f:
+                rule_set = RuleSet.from_json(f.read(), default_id=os.path.splitext(os.path.basename(args.path))[0])
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return 2
+
+    load_dotenv()
+    if args.command == 'rebuild-owner-status':
+        args.path = args.path or os.getenv("OWNER_STATUS_STORE")
+        if not args.path:
+            print("❌ No store path: pass one or set OWNER_STATUS_STORE")
+            return 2
+    database = os.getenv("NEO4J_DB_NAME") or "neo4j"
+    driver = get_driver()
+
+    try:
+        if args.command == 'apply-schema':
+            for statement in apply_schema(driver, database):
+                print(f"✅ {statement}")
+            return 0
+
+        if args.command == 'check-query-plans':
+            problems = check_query_plans(driver, database)
+            for problem in problems:
+                print(f"❌ {problem['query_name']}: {problem['operator']}")
+            if problems:
+                print(f"{len(problems)} label scans found - run apply-schema")
+                return 1
+            print("✅ Every repository query uses an index")
+            return 0
+
+        if args.command == 'backfill-latest-diagnosis':
+            processed = backfill_latest_diagnosis(driver, database)
+            print(f"✅ LATEST_DIAGNOSIS rebuilt for {processed} batteries")
+            return 0
+
+        if args.command == 'check-latest-diagnosis':
+            problems = check_latest_diagnosis(driver, database)
+            for problem in problems:
+                print(f"❌ {problem['battery_id']}: {problem['problem']} ({problem['pointers']} pointer(s))")
+            if problems:
+                print(f"{len(problems)} inconsistent batteries - run backfill-latest-diagnosis")
+                return 1
+            print("✅ All LATEST_DIAGNOSIS pointers are consistent")
+            return 0
+
+        if args.command == 'publish-rule-set':
+            try:
+                version = publish_rule_set(driver, rule_set, database)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 2
+            print(f"✅ Rule set {rule_set.id} is active (version {version}); workers pick it up on their next refresh")
+            return 0
+
+        if args.command == 'rebuild-owner-status':
+            written = OwnerStatusStore(args.path).rebuild(driver, database, report=print)
+            print(f"✅ Owner status rebuilt for {written} batteries in {args.path}")
+            return 0
+    finally:
+        close_driver()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import threading
+import time
+
+import numpy as np
+
+# Column order of the weight matrix (same order as DecisionEngine.options)
+WEIGHT_KEYS = ("weight_reuse", "weight_remanufacture", "weight_repurpose", "weight_recycle")
+
+MARKETS_QUERY = """
+MATCH (m:MarketConfig)
+RETURN m.id AS id, properties(m) AS market, elementId(m) AS market_ref
+ORDER BY id
+"""
+
+
+class MarketSnapshot:
+    """Immutable view of every MarketConfig at one point in time."""
+
+    def __init__(self, rows, fingerprint):
+        self.fingerprint = fingerprint
+        self.ids = tuple(row["id"] for row in rows)
+        self.index = {market_id: i for i, market_id in enumerate(self.ids)}
+        self.properties = {row["id"]: row["market"] for row in rows}
+        self.refs = {row["id"]: row["market_ref"] for row in rows}
+        # [n_markets x 4] coefficients, 1.0 when a weight is not set
+        self.weights = np.array(
+            [[row["market"].get(key, 1.0) for key in WEIGHT_KEYS] for row in rows],
+            dtype=float
+        ).reshape(len(rows), len(WEIGHT_KEYS))
+
+
+class MarketRegistry:
+    """
+    In-process registry of all MarketConfig nodes.
+
+    Configs are loaded once per worker, then re-checked at most every
+    `refresh_interval` seconds: the snapshot is only rebuilt (and swapped
+    atomically) when the fingerprint of the stored configs changes.
+    """
+
+    def __init__(self, refresh_interval=60.0):
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def ensure_fresh(self, driver, database="neo4j"):
+        """Load on first use, then refresh when the check interval has elapsed."""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.refresh_interval:
+            self.refresh(driver, database)
+        return self._snapshot
+
+    def refresh(self, driver, database="neo4j"):
+        """
+        Re-read the configs and swap the snapshot if they changed.
+
+        Returns:
+            True if a new snapshot was installed
+        """
+        with self._lock:
+            with driver.session(database=database) as session:
+                rows = session.execute_read(self._fetch_markets_query)
+            return self._install(rows)
+
+    async def ensure_fresh_async(self, driver, database="neo4j"):
+        """ensure_fresh for a neo4j.AsyncDriver."""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.refresh_interval:
+            await self.refresh_async(driver, database)
+        return self._snapshot
+
+    async def refresh_async(self, driver, database="neo4j"):
+        """refresh for a neo4j.AsyncDriver (concurrent refreshes are harmless: same fingerprint)."""
+        async with driver.session(database=database) as session:
+            rows = await session.execute_read(self._fetch_markets_query_async)
+        with self._lock:
+            return self._install(rows)
+
+    def install(self, rows):
+        """Install configs read by the caller (embedded backend); same rows as MARKETS_QUERY."""
+        with self._lock:
+            return self._install(rows)
+
+    def _install(self, rows):
+        fingerprint = self._fingerprint(rows)
+        self._checked_at = time.monotonic()
+        if self._snapshot is not None and self._snapshot.fingerprint == fingerprint:
+            return False
+        self._snapshot = MarketSnapshot(rows, fingerprint)
+        return True
+
+    def has(self, market_config_id):
+        snapshot = self._snapshot
+        return snapshot is not None and market_config_id in snapshot.index
+
+    def get(self, market_config_id):
+        """{market, market_ref} of a config, or None if unknown."""
+        snapshot = self._snapshot
+        if snapshot is None or market_config_id not in snapshot.index:
+            return None
+        return {
+            "market": snapshot.properties[market_config_id],
+            "market_ref": snapshot.refs[market_config_id]
+        }
+
+    @staticmethod
+    def _fetch_markets_query(tx):
+        return [dict(record) for record in tx.run(MARKETS_QUERY)]
+
+    @staticmethod
+    async def _fetch_markets_query_async(tx):
+        result = await tx.run(MARKETS_QUERY)
+        return [dict(record) async for record in result]
+
+    @staticmethod
+    def _fingerprint(rows):
+        payload = json.dumps(rows, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
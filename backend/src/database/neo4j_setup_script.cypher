@@ -125,7 +125,8 @@ CREATE (d1:SortingDiagnosis {
 })
 
 CREATE (b1)-[:HAS_PASSPORT]->(p1)
-CREATE (b1)-[:UNDERWENT_DIAGNOSIS]->(d1);
+CREATE (b1)-[:UNDERWENT_DIAGNOSIS]->(d1)
+CREATE (b1)-[:LATEST_DIAGNOSIS]->(d1);
 
 // ============================================================================
 // BATTERIE 2: Batterie moyenne - NMC - Automobile - Design modulaire
@@ -212,7 +213,8 @@ CREATE (d2:SortingDiagnosis {
 })
 
 CREATE (b2)-[:HAS_PASSPORT]->(p2)
-CREATE (b2)-[:UNDERWENT_DIAGNOSIS]->(d2);
+CREATE (b2)-[:UNDERWENT_DIAGNOSIS]->(d2)
+CREATE (b2)-[:LATEST_DIAGNOSIS]->(d2);
 
 // ============================================================================
 // BATTERIE 3: Batterie en mauvais état - Défauts critiques - NMC
@@ -299,7 +301,8 @@ CREATE (d3:SortingDiagnosis {
 })
 
 CREATE (b3)-[:HAS_PASSPORT]->(p3)
-CREATE (b3)-[:UNDERWENT_DIAGNOSIS]->(d3);
+CREATE (b3)-[:UNDERWENT_DIAGNOSIS]->(d3)
+CREATE (b3)-[:LATEST_DIAGNOSIS]->(d3);
 
 // ============================================================================
 // BATTERIE 4: Batterie repurposée - LFP - E-bike - Seconde vie
@@ -389,7 +392,8 @@ CREATE (d4:SortingDiagnosis {
 })
 
 CREATE (b4)-[:HAS_PASSPORT]->(p4)
-CREATE (b4)-[:UNDERWENT_DIAGNOSIS]->(d4);
+CREATE (b4)-[:UNDERWENT_DIAGNOSIS]->(d4)
+CREATE (b4)-[:LATEST_DIAGNOSIS]->(d4);
 
 // ============================================================================
 // BATTERIE 5 (BONUS): Batterie remanufacturée - NCA - Automobile
@@ -478,7 +482,8 @@ CREATE (d5:SortingDiagnosis {
 })
 
 CREATE (b5)-[:HAS_PASSPORT]->(p5)
-CREATE (b5)-[:UNDERWENT_DIAGNOSIS]->(d5);
+CREATE (b5)-[:UNDERWENT_DIAGNOSIS]->(d5)
+CREATE (b5)-[:LATEST_DIAGNOSIS]->(d5);
 
 // ============================================================================
 // VÉRIFICATION DES DONNÉES CRÉÉES
@@ -506,9 +511,7 @@ ORDER BY b.id;
 // Récupérer le digital twin complet pour BAT_001
 // MATCH (b:Battery {id: 'BAT_001'})
 // OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
-// OPTIONAL MATCH (b)-[:UNDERWENT_DIAGNOSIS]->(d:SortingDiagnosis)
-// WITH b, p, d
-// ORDER BY d.date DESC LIMIT 1
+// OPTIONAL MATCH (b)-[:LATEST_DIAGNOSIS]->(d:SortingDiagnosis)
 // MATCH (m:MarketConfig {id: 'MKT_STD_2024'})
 // RETURN {
 //     battery_id: b.id,
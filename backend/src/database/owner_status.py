@@ -0,0 +1,196 @@
+"""
+Materialized read model of GET /proprietaire/status/<id>.
+
+One pre-serialized JSON payload per battery, kept in a local SQLite file
+(WAL mode, memory-mapped reads) shared by every worker process on the host.
+Repository writes that change an owner-visible field return the new status
+from the same Cypher query and upsert it here before returning; owner reads
+are a primary-key lookup that never reaches Neo4j once the battery is stored.
+A battery missing from the store is read from Neo4j once and stored.
+
+Writes made outside the repository to a battery already in the store (setup
+scripts, direct Cypher) are picked up by a full rebuild:
+
+    python -m src.database.maintenance rebuild-owner-status
+"""
+import json
+import sqlite3
+import threading
+import time
+
+# Fields of the owner payload (same as BATTERY_STATUS_QUERY)
+OWNER_STATUS_FIELDS = ("battery_id", "status", "voltage", "capacity", "soh_percent")
+
+# Owner status of a bound `b` (and its optional passport `p`), returned by repository writes.
+# `version` (Battery.version, the ETag of the battery's read endpoints) is stored beside the payload.
+OWNER_STATUS_PROJECTION = """{
+    battery_id: b.id,
+    status: p.battery_status,
+    voltage: b.voltage,
+    capacity: b.capacity,
+    soh_percent: p.soh_percent,
+    version: coalesce(b.version, 0)
+}"""
+
+OWNER_STATUS_PAGE_QUERY = """
+MATCH (b:Battery)
+WHERE b.id > $after_id
+WITH b
+ORDER BY b.id
+LIMIT $limit
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+WITH b, head(collect(p)) AS p
+RETURN """ + OWNER_STATUS_PROJECTION + """ AS owner_status
+ORDER BY owner_status.battery_id
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS owner_status (
+    battery_id TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+# Keeps the highest Battery.version: a stale write (a rebuild page read before a live
+# write, or two workers committing out of order) never overwrites a newer payload
+UPSERT = """
+INSERT INTO owner_status (battery_id, payload, version, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (battery_id) DO UPDATE SET payload = excluded.payload,
+                                       version = excluded.version,
+                                       updated_at = excluded.updated_at
+WHERE excluded.version >= owner_status.version
+"""
+
+# Marks a battery seen by a rebuild even when its stored payload is newer than the page
+TOUCH = "UPDATE owner_status SET updated_at = ? WHERE battery_id = ? AND updated_at < ?"
+
+# Read-through insert after a miss: never replaces a payload written in the meantime
+INSERT_IF_ABSENT = """
+INSERT INTO owner_status (battery_id, payload, version, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (battery_id) DO NOTHING
+"""
+
+REBUILD_PAGE_SIZE = 5000
+
+
+def serialize(status):
+    """Owner payload as the bytes served by the endpoint (compact, sorted keys)."""
+    payload = {field: status.get(field) for field in OWNER_STATUS_FIELDS}
+    return (json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class OwnerStatusStore:
+    """
+    Pre-serialized owner status payloads keyed by battery ID.
+
+    Each thread has its own SQLite connection; WAL lets readers run while a
+    writer commits, and concurrent writers wait up to `busy_timeout` seconds.
+    """
+
+    def __init__(self, path, mmap_size=256 * 1024 * 1024, busy_timeout=5.0):
+        self.path = path
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(owner_status)")}
+            if "version" not in columns:
+                # Stores created before payloads were versioned: filled by the next write or rebuild
+                connection.execute("ALTER TABLE owner_status ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.connection = connection
+        return connection
+
+    def get(self, battery_id):
+        """(serialized payload, version) of a battery, or (None, None) if unknown."""
+        row = self._connection().execute(
+            "SELECT payload, version FROM owner_status WHERE battery_id = ?", (battery_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def get_version(self, battery_id):
+        """Version of a battery's payload (conditional GET), or None if unknown."""
+        row = self._connection().execute(
+            "SELECT version FROM owner_status WHERE battery_id = ?", (battery_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, status):
+        """Upsert one status dict (OWNER_STATUS_FIELDS) written by the repository."""
+        self.put_many([status])
+
+    def fill(self, status):
+        """
+        Insert a status read from Neo4j after a miss. A payload stored by a
+        repository write since that read is kept (the read may predate it).
+        """
+        with self._connection() as connection:
+            connection.execute(INSERT_IF_ABSENT, (
+                status["battery_id"], serialize(status), status.get("version") or 0, time.time_ns()
+            ))
+
+    def put_many(self, statuses, updated_at=None):
+        """
+        Upsert several status dicts in one transaction. A payload only replaces
+        one of the same or a lower `version`; `updated_at` (default now) records
+        when it was written.
+        """
+        updated_at = time.time_ns() if updated_at is None else updated_at
+        rows = [
+            (status["battery_id"], serialize(status), status.get("version") or 0, updated_at)
+            for status in statuses if status
+        ]
+        if not rows:
+            return
+        with self._connection() as connection:
+            connection.executemany(UPSERT, rows)
+
+    def rebuild(self, driver, database="neo4j", page_size=REBUILD_PAGE_SIZE, report=None):
+        """
+        Reload every battery from Neo4j, page by page (keyset on Battery.id),
+        then delete payloads of batteries that no longer exist. Readers keep
+        being served from the current payloads during the rebuild.
+
+        Returns:
+            Number of batteries written
+        """
+        started_at = time.time_ns()
+        written = 0
+        after_id = ""
+        while True:
+            read_at = time.time_ns()
+            with driver.session(database=database) as session:
+                statuses = session.execute_read(self._fetch_page_query, after_id, page_size)
+            if not statuses:
+                break
+            # Live writes with a higher version win; their rows still count as seen
+            self.put_many(statuses, updated_at=read_at)
+            with self._connection() as connection:
+                connection.executemany(TOUCH, [(read_at, status["battery_id"], started_at) for status in statuses])
+            written += len(statuses)
+            after_id = statuses[-1]["battery_id"]
+            if report is not None:
+                report(f"  {written} batteries (last {after_id})")
+        with self._connection() as connection:
+            connection.execute("DELETE FROM owner_status WHERE updated_at < ?", (started_at,))
+        return written
+
+    def __len__(self):
+        return self._connection().execute("SELECT count(*) FROM owner_status").fetchone()[0]
+
+    def stats(self):
+        return {'path': self.path, 'size': len(self)}
+
+    @staticmethod
+    def _fetch_page_query(tx, after_id, limit):
+        return [record["owner_status"] for record in tx.run(OWNER_STATUS_PAGE_QUERY, after_id=after_id, limit=limit)]
@@ -0,0 +1,93 @@
+"""
+Storage-independent contract of the battery repository.
+
+app.py only talks to its repository through these methods, so any backend
+implementing them can serve the API (selected by REPOSITORY_BACKEND):
+
+- BatteryRepository (repository.py): Neo4j
+- EmbeddedBatteryRepository (embedded.py): in-process data structures
+
+Return values are plain dicts and lists, with the contracts documented on
+BatteryRepository. AsyncBatteryRepository exposes the methods asgi.py uses
+as coroutines.
+"""
+from typing import Protocol, runtime_checkable
+
+
+@runtime_checkable
+class BatteryRepositoryProtocol(Protocol):
+
+    # ---------- Core contract ----------
+
+    def get_digital_twin(self, battery_id, market_config_id="MKT_STD_2024"):
+        """{battery_id, passport, diagnosis (latest), market}, or None if the battery or market is unknown."""
+
+    def save_decision(self, battery_id, decision_result, market_config_id="MKT_STD_2024"):
+        """Decision ID, or None if the battery or market is unknown."""
+
+    def create_battery_record(self, battery_id, voltage, capacity, temperature):
+        """Create or update a battery's measurements: {message, battery_id}."""
+
+    def update_battery_measurements(self, battery_id, voltage=None, capacity=None, temperature=None):
+        """{message, battery_id}, or None if the battery is unknown (ValueError if every field is None)."""
+
+    def update_battery_status(self, battery_id, new_status):
+        """True if the battery (with a passport) was updated."""
+
+    def battery_exists(self, battery_id):
+        """True if the battery exists."""
+
+    def get_all_battery_data(self, battery_id):
+        """Garagist view (~10 fields and `version`), or None."""
+
+    def get_battery_status(self, battery_id):
+        """Owner view {battery_id, status, voltage, capacity, soh_percent, version}, or None."""
+
+    # ---------- Recycler ----------
+
+    def evaluate_and_save_decision(self, battery_id, engine, market_config_id="MKT_STD_2024"):
+        """engine.evaluate_battery result, saved as a Decision; None if the battery is unknown."""
+
+    def evaluate_markets(self, battery_id, engine, market_ids=None, save=False):
+        """Results ranked by best score, one per known market; None if the battery is unknown."""
+
+    def get_digital_twins(self, battery_ids, market_config_id="MKT_STD_2024"):
+        """{battery_id: digital_twin}; unknown IDs are absent."""
+
+    def get_digital_twin_page(self, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        """Up to `limit` twins with battery_id > after_id, sorted by battery_id."""
+
+    def get_changed_twin_page(self, since, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        """get_digital_twin_page restricted to batteries whose engine inputs changed after `since`."""
+
+    def get_database_time(self):
+        """Store clock (timezone-aware datetime), reference of incremental watermarks."""
+
+    def save_decisions(self, decisions, market_config_id="MKT_STD_2024"):
+        """{battery_id: decision_id} for the decisions saved ({battery_id: decision_result} in)."""
+
+    def add_sorting_diagnosis(self, battery_id, diagnosis):
+        """Reference of the new diagnosis, or None if the battery is unknown."""
+
+    # ---------- Garagist & owner ----------
+
+    def create_battery_records(self, rows):
+        """Number of rows written ({battery_id, voltage, capacity, temperature} each)."""
+
+    def update_battery_measurements_batch(self, updates):
+        """IDs of the batteries updated ({battery_id: {field: value}} in; unknown IDs skipped)."""
+
+    def get_battery_status_payload(self, battery_id):
+        """(owner status as serialized JSON bytes, version), or (None, None)."""
+
+    def get_battery_version(self, battery_id):
+        """Battery version (ETag), or None."""
+
+    def get_owner_status_version(self, battery_id):
+        """Version for a conditional owner-status GET, or None."""
+
+    def get_telemetry_blocks(self, battery_id, start=None, end=None):
+        """Telemetry blocks overlapping [start, end] (epoch ms), or None if the battery is unknown."""
+
+    def close(self):
+        """Release resources owned by the repository (never a shared driver or store)."""
@@ -1,26 +1,477 @@
 from neo4j import GraphDatabase
 
-class BatteryRepository:
-    def __init__(self, uri, user, password, database_name="neo4j"):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+from ..metrics import metrics
+from .markets import MarketSnapshot
+from .owner_status import OWNER_STATUS_PROJECTION, serialize
+from .telemetry import TELEMETRY_APPEND, TELEMETRY_APPEND_ROW, TELEMETRY_BLOCK_SIZE, unique_rounds
+
+# Projection du jumeau numérique (b, p, d, m liés), partagée par les requêtes unitaires et par lot
+DIGITAL_TWIN_PROJECTION = """{
+    battery_id: b.id,
+    passport: {
+        soh_percent: p.soh_percent,
+        soc_percent: p.soc_percent,
+        known_defects: p.known_defects,
+        critical_defects: p.critical_defects,
+        battery_model: p.battery_model,
+        model: p.model,
+        chemistry: p.chemistry,
+        date_placing_market: p.date_placing_market,
+        market_date: p.market_date,
+        total_energy_throughput_kwh: p.total_energy_throughput_kwh,
+        energy_throughput: p.energy_throughput,
+        potentials_repurposing_remanufacturing: p.potentials_repurposing_remanufacturing,
+        repurpose_potential: p.repurpose_potential,
+        design_for_disassembly: p.design_for_disassembly,
+        design_modularity_score: p.design_modularity_score,
+        modularity: p.modularity,
+        capacity_fade_percent_per_year: p.capacity_fade_percent_per_year,
+        capacity_fade: p.capacity_fade,
+        accidents: p.accidents,
+        accident_history: p.accident_history,
+        history_of_abuse: p.history_of_abuse,
+        battery_status: p.battery_status,
+        status: p.status
+    },
+    diagnosis: {
+        soh_percent: d.soh_percent,
+        soc_percent: d.soc_percent,
+        internal_resistance_mOhm: d.internal_resistance_mOhm,
+        known_defects: d.known_defects,
+        critical_defects: d.critical_defects,
+        accidents: d.accidents,
+        history_of_abuse: d.history_of_abuse,
+        battery_status: d.battery_status,
+        date: d.date,
+        total_energy_throughput_kwh: d.total_energy_throughput_kwh
+    },
+    market: properties(m)
+}"""
+
+# Diagnostic le plus récent d'une batterie `b`, via le pointeur maintenu LATEST_DIAGNOSIS
+# (évite de trier tout l'historique UNDERWENT_DIAGNOSIS à chaque lecture)
+LATEST_DIAGNOSIS_MATCH = """
+OPTIONAL MATCH (b)-[:LATEST_DIAGNOSIS]->(d:SortingDiagnosis)
+"""
+
+# Statut propriétaire d'un `b` après écriture, renvoyé par les requêtes d'écriture
+# pour tenir à jour le read model OwnerStatusStore (owner_status.py)
+OWNER_STATUS_RETURN = """
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+WITH b, head(collect(p)) AS p
+"""
+
+# ========== REQUÊTES CYPHER ==========
+# Partagées par BatteryRepository et AsyncBatteryRepository (async_repository.py)
+
+FETCH_BATTERY_QUERY = """
+MATCH (b:Battery {id: $bat_id})
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+""" + LATEST_DIAGNOSIS_MATCH + """
+WITH b, p, d LIMIT 1
+WITH b, p, d, null AS m
+
+RETURN """ + DIGITAL_TWIN_PROJECTION + """ AS digital_twin,
+       elementId(d) AS diagnosis_ref
+"""
+
+FETCH_TWIN_QUERY = """
+MATCH (b:Battery {id: $bat_id})
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+""" + LATEST_DIAGNOSIS_MATCH + """
+WITH b, p, d LIMIT 1
+MATCH (m:MarketConfig {id: $mkt_id})
+
+RETURN """ + DIGITAL_TWIN_PROJECTION + """ AS digital_twin,
+       elementId(d) AS diagnosis_ref,
+       elementId(m) AS market_ref
+"""
+
+# Jumeau sans marché + tous les MarketConfig (triés par id, via l'index d'unicité), pour l'évaluation multi-marchés
+FETCH_TWIN_ALL_MARKETS_QUERY = """
+MATCH (b:Battery {id: $bat_id})
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+""" + LATEST_DIAGNOSIS_MATCH + """
+WITH b, p, d LIMIT 1
+CALL {
+    MATCH (mc:MarketConfig)
+    WHERE mc.id IS NOT NULL
+    WITH mc ORDER BY mc.id
+    RETURN collect({id: mc.id, market: properties(mc), market_ref: elementId(mc)}) AS markets
+}
+WITH b, p, d, markets, null AS m
+
+RETURN """ + DIGITAL_TWIN_PROJECTION + """ AS digital_twin,
+       elementId(d) AS diagnosis_ref,
+       markets
+"""
+
+CREATE_DECISION_QUERY = """
+MATCH (m:MarketConfig) WHERE elementId(m) = $market_ref
+MATCH (b:Battery {id: $bat_id})
+""" + LATEST_DIAGNOSIS_MATCH + """
+WITH m, d
+WHERE COALESCE(elementId(d), '') = COALESCE($diagnosis_ref, '')
+
+CREATE (dec:Decision {
+    id: 'DEC_' + toString(timestamp()) + '_' + $bat_id + '_' + randomUUID(),
+    recommendation: $recommendation,
+    reason: $reason,
+    score_reuse: $score_reuse,
+    score_remanufacture: $score_remanufacture,
+    score_repurpose: $score_repurpose,
+    score_recycle: $score_recycle,
+    rules_version: $rules_version,
+    rule_set: $rule_set,
+    created_at: datetime()
+})
+
+FOREACH (x IN CASE WHEN d IS NOT NULL THEN [1] ELSE [] END |
+    CREATE (d)-[:GENERATED_DECISION]->(dec)
+)
+
+CREATE (dec)-[:CONTEXTUALIZED_BY]->(m)
+
+RETURN dec.id AS decision_id
+"""
+
+FETCH_TWINS_BATCH_QUERY = """
+MATCH (m:MarketConfig {id: $mkt_id})
+UNWIND $bat_ids AS bat_id
+MATCH (b:Battery {id: bat_id})
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+""" + LATEST_DIAGNOSIS_MATCH + """
+RETURN """ + DIGITAL_TWIN_PROJECTION + """ AS digital_twin
+"""
+
+# Page suivante de jumeaux numériques, triée par id (pagination keyset via la contrainte d'unicité)
+FETCH_TWINS_PAGE_QUERY = """
+MATCH (m:MarketConfig {id: $mkt_id})
+MATCH (b:Battery)
+WHERE b.id > $after_id
+WITH m, b
+ORDER BY b.id
+LIMIT $limit
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+""" + LATEST_DIAGNOSIS_MATCH + """
+RETURN """ + DIGITAL_TWIN_PROJECTION + """ AS digital_twin
+ORDER BY digital_twin.battery_id
+"""
+
+# Même page, restreinte aux batteries dont les entrées du moteur ont changé depuis $since :
+# écriture passeport / diagnostic via le repository (b.inputs_updated_at) ou diagnostic
+# courant daté après $since (imports hors repository). Deux recherches par index range.
+FETCH_CHANGED_TWINS_PAGE_QUERY = """
+MATCH (m:MarketConfig {id: $mkt_id})
+CALL {
+    MATCH (b:Battery)
+    WHERE b.inputs_updated_at > $since
+    RETURN b
+    UNION
+    MATCH (d:SortingDiagnosis)
+    WHERE d.date > $since
+    MATCH (b:Battery)-[:LATEST_DIAGNOSIS]->(d)
+    RETURN b
+}
+WITH m, b
+WHERE b.id > $after_id
+ORDER BY b.id
+LIMIT $limit
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+""" + LATEST_DIAGNOSIS_MATCH + """
+RETURN """ + DIGITAL_TWIN_PROJECTION + """ AS digital_twin
+ORDER BY digital_twin.battery_id
+"""
+
+SAVE_DECISIONS_BATCH_QUERY = """
+MATCH (m:MarketConfig {id: $mkt_id})
+UNWIND $rows AS row
+MATCH (b:Battery {id: row.bat_id})
+""" + LATEST_DIAGNOSIS_MATCH + """
+CREATE (dec:Decision {
+    id: 'DEC_' + toString(timestamp()) + '_' + row.bat_id + '_' + randomUUID(),
+    recommendation: row.recommendation,
+    reason: row.reason,
+    score_reuse: row.score_reuse,
+    score_remanufacture: row.score_remanufacture,
+    score_repurpose: row.score_repurpose,
+    score_recycle: row.score_recycle,
+    rules_version: row.rules_version,
+    rule_set: row.rule_set,
+    created_at: datetime()
+})
+
+FOREACH (x IN CASE WHEN d IS NOT NULL THEN [1] ELSE [] END |
+    CREATE (d)-[:GENERATED_DECISION]->(dec)
+)
+
+CREATE (dec)-[:CONTEXTUALIZED_BY]->(m)
+
+RETURN row.bat_id AS battery_id, dec.id AS decision_id
+"""
+
+CREATE_BATTERY_QUERY = """
+MERGE (b:Battery { id: $battery_id })
+ON CREATE SET b.created_at = datetime()
+SET b.voltage = $voltage,
+    b.capacity = $capacity,
+    b.temperature = $temperature,
+    b.version = coalesce(b.version, 0) + 1
+""" + TELEMETRY_APPEND + OWNER_STATUS_RETURN + """
+RETURN b, """ + OWNER_STATUS_PROJECTION + """ AS owner_status
+"""
+
+CREATE_BATTERIES_BATCH_QUERY = """
+UNWIND $rows AS row
+MERGE (b:Battery { id: row.battery_id })
+ON CREATE SET b.created_at = datetime()
+SET b.voltage = row.voltage,
+    b.capacity = row.capacity,
+    b.temperature = row.temperature,
+    b.version = coalesce(b.version, 0) + 1
+""" + TELEMETRY_APPEND_ROW + OWNER_STATUS_RETURN + """
+RETURN count(b) AS written, collect(""" + OWNER_STATUS_PROJECTION + """) AS owner_statuses
+"""
+
+UPDATE_MEASUREMENTS_QUERY = """
+MATCH (b:Battery {id: $battery_id})
+SET b.voltage = COALESCE($voltage, b.voltage),
+    b.capacity = COALESCE($capacity, b.capacity),
+    b.temperature = COALESCE($temperature, b.temperature),
+    b.version = coalesce(b.version, 0) + 1
+""" + TELEMETRY_APPEND + OWNER_STATUS_RETURN + """
+RETURN b, """ + OWNER_STATUS_PROJECTION + """ AS owner_status
+"""
+
+UPDATE_MEASUREMENTS_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (b:Battery {id: row.battery_id})
+SET b.voltage = COALESCE(row.voltage, b.voltage),
+    b.capacity = COALESCE(row.capacity, b.capacity),
+    b.temperature = COALESCE(row.temperature, b.temperature),
+    b.version = coalesce(b.version, 0) + 1
+""" + TELEMETRY_APPEND + OWNER_STATUS_RETURN + """
+RETURN b.id AS battery_id, """ + OWNER_STATUS_PROJECTION + """ AS owner_status
+"""
+
+UPDATE_STATUS_QUERY = """
+MATCH (b:Battery {id: $bat_id})-[:HAS_PASSPORT]->(p:BatteryPassport)
+SET p.battery_status = $status, 
+    p.status = $status,
+    b.inputs_updated_at = datetime(),
+    b.version = coalesce(b.version, 0) + 1
+RETURN p.battery_status AS updated_status, """ + OWNER_STATUS_PROJECTION + """ AS owner_status
+"""
+
+BATTERY_EXISTS_QUERY = """
+MATCH (b:Battery {id: $battery_id})
+RETURN b.id AS battery_id
+"""
+
+ALL_BATTERY_DATA_QUERY = """
+MATCH (b:Battery {id: $battery_id})
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+RETURN b.id as battery_id,
+       b.voltage as voltage,
+       b.capacity as capacity,
+       b.temperature as temperature,
+       toString(b.created_at) as created_at,
+       p.soh_percent as soh_percent,
+       p.chemistry as chemistry,
+       p.battery_model as battery_model,
+       p.battery_status as battery_status,
+       p.total_energy_throughput_kwh as energy_throughput,
+       coalesce(b.version, 0) as version
+"""
+
+BATTERY_STATUS_QUERY = """
+MATCH (b:Battery {id: $battery_id})
+OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
+RETURN b.id as battery_id,
+       p.battery_status as status,
+       b.voltage as voltage,
+       b.capacity as capacity,
+       p.soh_percent as soh_percent,
+       coalesce(b.version, 0) as version
+"""
+
+# Version de la batterie seule (ETag), sans traverser le passeport
+BATTERY_VERSION_QUERY = """
+MATCH (b:Battery {id: $battery_id})
+RETURN coalesce(b.version, 0) AS version
+"""
+
+TELEMETRY_BLOCKS_QUERY = """
+MATCH (b:Battery {id: $battery_id})
+OPTIONAL MATCH (b)-[:HAS_TELEMETRY]->(blk:TelemetryBlock)
+WHERE ($start IS NULL OR blk.end >= $start)
+  AND ($end IS NULL OR blk.start <= $end)
+WITH b, blk ORDER BY blk.seq
+RETURN b.id AS battery_id,
+       collect(blk { .seq, .timestamps, .voltage, .capacity, .temperature }) AS blocks
+"""
+
+
+class CachedTwinMixin:
+    """
+    Accès mémoire partagés par BatteryRepository et AsyncBatteryRepository
+    (attend self.cache, self.markets, self.owner_status et self.changes).
+    """
+
+    def _cached_twin_record(self, battery_id, market_config_id):
+        """
+        Reconstitue {digital_twin, diagnosis_ref, market_ref} depuis le cache,
+        ou None si la batterie ou le marché n'y sont pas.
+        """
+        if self.cache is None:
+            return None
+        twin = self.cache.twins.get(battery_id)
+        if twin is None:
+            return None
+        market = self._registry_market(market_config_id) or self.cache.markets.get(market_config_id)
+        if market is None:
+            return None
+        return {
+            "digital_twin": dict(twin["digital_twin"], market=market["market"]),
+            "diagnosis_ref": twin["diagnosis_ref"],
+            "market_ref": market["market_ref"]
+        }
+
+    def _remember_twin_record(self, battery_id, market_config_id, record):
+        """Met en cache séparément la partie batterie et la partie marché d'un record."""
+        if self.cache is None:
+            return
+        digital_twin = dict(record["digital_twin"])
+        market = digital_twin.pop("market", None)
+        self.cache.twins.put(battery_id, {
+            "digital_twin": digital_twin,
+            "diagnosis_ref": record["diagnosis_ref"]
+        })
+        self.cache.markets.put(market_config_id, {
+            "market": market,
+            "market_ref": record["market_ref"]
+        })
+
+    def _registry_market(self, market_config_id):
+        """{market, market_ref} depuis le MarketRegistry, ou None s'il n'est pas utilisé."""
+        if self.markets is None:
+            return None
+        return self.markets.get(market_config_id)
+
+    def _cached_battery_record(self, battery_id):
+        """{digital_twin (sans marché), diagnosis_ref} depuis le cache, ou None."""
+        if self.cache is None:
+            return None
+        return self.cache.twins.get(battery_id)
+
+    def _remember_battery_record(self, battery_id, record):
+        if self.cache is None:
+            return
+        digital_twin = dict(record["digital_twin"])
+        digital_twin.pop("market", None)
+        self.cache.twins.put(battery_id, {
+            "digital_twin": digital_twin,
+            "diagnosis_ref": record["diagnosis_ref"]
+        })
+
+    def _registry_snapshot(self):
+        """MarketSnapshot courant du MarketRegistry, ou None s'il n'est pas utilisé (ou pas encore chargé)."""
+        return self.markets.snapshot if self.markets is not None else None
+
+    @staticmethod
+    def _select_markets(snapshot, market_ids=None):
+        """(ids, weights [M x 4]) des marchés demandés connus du snapshot (tous si market_ids est None)."""
+        if market_ids is None:
+            return list(snapshot.ids), snapshot.weights
+        ids = [market_id for market_id in dict.fromkeys(market_ids) if market_id in snapshot.index]
+        return ids, snapshot.weights[[snapshot.index[market_id] for market_id in ids]]
+
+    def _invalidate(self, battery_id):
+        """Invalide le jumeau numérique en cache après une écriture sur la batterie."""
+        if self.cache is not None:
+            self.cache.invalidate_battery(battery_id)
+
+    def _remember_owner_status(self, statuses):
+        """
+        Reporte dans le read model propriétaire les statuts renvoyés par une
+        écriture, et les publie sur le bus de changements.
+        """
+        if self.owner_status is not None:
+            self.owner_status.put_many(statuses)
+        if self.changes is not None:
+            self.changes.publish_many("status", [(status["battery_id"], status) for status in statuses if status])
+
+    def _publish_decisions(self, decisions, market_config_id=None):
+        """Publie les recommandations sauvegardées ({battery_id: résultat du moteur}) sur le bus de changements."""
+        if self.changes is None:
+            return
+        self.changes.publish_many("decision", [
+            (battery_id, {
+                "battery_id": battery_id,
+                "market_id": result.get("market_id", market_config_id),
+                "recommendation": result.get("recommendation"),
+                "scores": result.get("scores"),
+                "rules_version": result.get("rules_version")
+            })
+            for battery_id, result in decisions.items()
+        ])
+
+    def _owner_status_payload(self, battery_id):
+        """(payload sérialisé, version) depuis le read model, (None, None) si absente ou sans read model."""
+        if self.owner_status is None:
+            return None, None
+        return self.owner_status.get(battery_id)
+
+    def _fill_owner_status(self, status):
+        """Lecture traversante : statut lu dans Neo4j après un miss, sans écraser une écriture concurrente."""
+        if self.owner_status is not None and status:
+            self.owner_status.fill(status)
+
+
+class BatteryRepository(CachedTwinMixin):
+    def __init__(self, uri=None, user=None, password=None, database_name="neo4j", driver=None,
+                 cache=None, markets=None, owner_status=None, changes=None):
+        # A shared (pooled) driver is borrowed, never closed by the repository
+        self._owns_driver = driver is None
+        self.driver = driver if driver is not None else GraphDatabase.driver(uri, auth=(user, password))
         self.database = database_name
+        # Optional process-wide DigitalTwinCache (see cache.py)
+        self.cache = cache
+        # Optional process-wide MarketRegistry (see markets.py): market configs served from memory
+        self.markets = markets
+        # Optional OwnerStatusStore (see owner_status.py): owner reads served without Neo4j
+        self.owner_status = owner_status
+        # Optional ChangeBus (see changes.py): writes pushed to /battery/events subscribers
+        self.changes = changes
 
     def close(self):
-        self.driver.close()
+        if self._owns_driver:
+            self.driver.close()
+
+    def _session(self):
+        """Session du pool, instrumentée (temps d'attente du pool) si les métriques sont actives."""
+        return metrics.instrument_session(self.driver.session(database=self.database))
 
     def get_digital_twin(self, battery_id, market_config_id="MKT_STD_2024"):
         """
         Récupère les données depuis la base spécifique définie dans __init__
         Inclut tous les 12 attributs du Battery Passport.
         """
-        with self.driver.session(database=self.database) as session:
-            result = session.execute_read(self._fetch_data_query, battery_id, market_config_id)
+        cached = self._cached_twin_record(battery_id, market_config_id)
+        if cached:
+            return cached["digital_twin"]
+        
+        with self._session() as session:
+            record = session.execute_read(
+                self._read_twin_record, battery_id, market_config_id, self._registry_market(market_config_id)
+            )
             
-            if not result:
+            if not record:
                 print(f"❌ [DB: {self.database}] Aucune batterie trouvée avec l'ID {battery_id}")
                 return None
             
-            return result
+            self._remember_twin_record(battery_id, market_config_id, record)
+            return record["digital_twin"]
 
     @staticmethod
     def _fetch_data_query(tx, battery_id, market_config_id):
@@ -28,93 +479,82 @@ class BatteryRepository:
         Récupère toutes les données nécessaires pour l'algorithme de décision.
         Inclut les 12 attributs du Battery Passport.
         """
-        query = """
-        MATCH (b:Battery {id: $bat_id})
-        OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
-        OPTIONAL MATCH (b)-[:UNDERWENT_DIAGNOSIS]->(d:SortingDiagnosis)
-        WITH b, p, d
-        ORDER BY d.date DESC LIMIT 1
-        MATCH (m:MarketConfig {id: $mkt_id})
-        
-        RETURN {
-            battery_id: b.id,
-            passport: {
-                soh_percent: p.soh_percent,
-                soc_percent: p.soc_percent,
-                known_defects: p.known_defects,
-                critical_defects: p.critical_defects,
-                battery_model: p.battery_model,
-                model: p.model,
-                chemistry: p.chemistry,
-                date_placing_market: p.date_placing_market,
-                market_date: p.market_date,
-                total_energy_throughput_kwh: p.total_energy_throughput_kwh,
-                energy_throughput: p.energy_throughput,
-                potentials_repurposing_remanufacturing: p.potentials_repurposing_remanufacturing,
-                repurpose_potential: p.repurpose_potential,
-                design_for_disassembly: p.design_for_disassembly,
-                design_modularity_score: p.design_modularity_score,
-                modularity: p.modularity,
-                capacity_fade_percent_per_year: p.capacity_fade_percent_per_year,
-                capacity_fade: p.capacity_fade,
-                accidents: p.accidents,
-                accident_history: p.accident_history,
-                history_of_abuse: p.history_of_abuse,
-                battery_status: p.battery_status,
-                status: p.status
-            },
-            diagnosis: {
-                soh_percent: d.soh_percent,
-                soc_percent: d.soc_percent,
-                internal_resistance_mOhm: d.internal_resistance_mOhm,
-                known_defects: d.known_defects,
-                critical_defects: d.critical_defects,
-                accidents: d.accidents,
-                history_of_abuse: d.history_of_abuse,
-                battery_status: d.battery_status,
-                date: d.date,
-                total_energy_throughput_kwh: d.total_energy_throughput_kwh
-            },
-            market: properties(m)
-        } AS digital_twin
-        """
-        result = tx.run(query, bat_id=battery_id, mkt_id=market_config_id)
-        record = result.single()
+        record = BatteryRepository._fetch_twin_record(tx, battery_id, market_config_id)
         return record["digital_twin"] if record else None
 
+    @staticmethod
+    def _read_twin_record(tx, battery_id, market_config_id, market_entry=None):
+        """
+        Record {digital_twin, diagnosis_ref, market_ref}. Si le marché est déjà
+        connu en mémoire (market_entry), seul le côté batterie est lu en base.
+        """
+        if market_entry is None:
+            return BatteryRepository._fetch_twin_record(tx, battery_id, market_config_id)
+        
+        record = BatteryRepository._fetch_battery_record(tx, battery_id)
+        if not record:
+            return None
+        return {
+            "digital_twin": dict(record["digital_twin"], market=market_entry["market"]),
+            "diagnosis_ref": record["diagnosis_ref"],
+            "market_ref": market_entry["market_ref"]
+        }
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_battery')
+    def _fetch_battery_record(tx, battery_id):
+        """
+        Variante de _fetch_twin_record sans le MarketConfig (servi par le MarketRegistry).
+        """
+        record = tx.run(FETCH_BATTERY_QUERY, bat_id=battery_id).single()
+        return dict(record) if record else None
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_twin')
+    def _fetch_twin_record(tx, battery_id, market_config_id):
+        """
+        Renvoie le jumeau numérique ainsi que les elementId du diagnostic
+        le plus récent et du marché, pour les réutiliser lors de l'écriture.
+        """
+        record = tx.run(FETCH_TWIN_QUERY, bat_id=battery_id, mkt_id=market_config_id).single()
+        return dict(record) if record else None
+
     def save_decision(self, battery_id, decision_result, market_config_id="MKT_STD_2024"):
         """
         Sauvegarde la décision dans Neo4j avec tous les détails.
         """
-        with self.driver.session(database=self.database) as session:
+        with self._session() as session:
             decision_id = session.execute_write(
                 self._save_decision_query,
                 battery_id,
                 decision_result,
                 market_config_id
             )
-            return decision_id
+        if decision_id:
+            self._publish_decisions({battery_id: decision_result}, market_config_id)
+        return decision_id
 
     @staticmethod
+    @metrics.timed('repository_query_seconds', 'save_decision')
     def _save_decision_query(tx, battery_id, decision_result, market_config_id):
         """
         Crée un nœud Decision et le connecte au diagnostic et au marché.
         """
         query = """
         MATCH (b:Battery {id: $bat_id})
-        OPTIONAL MATCH (b)-[:UNDERWENT_DIAGNOSIS]->(d:SortingDiagnosis)
-        WITH b, d
-        ORDER BY d.date DESC LIMIT 1
+        """ + LATEST_DIAGNOSIS_MATCH + """
         MATCH (m:MarketConfig {id: $mkt_id})
         
         CREATE (dec:Decision {
-            id: 'DEC_' + toString(timestamp()) + '_' + $bat_id,
+            id: 'DEC_' + toString(timestamp()) + '_' + $bat_id + '_' + randomUUID(),
             recommendation: $recommendation,
             reason: $reason,
             score_reuse: $score_reuse,
             score_remanufacture: $score_remanufacture,
             score_repurpose: $score_repurpose,
             score_recycle: $score_recycle,
+            rules_version: $rules_version,
+            rule_set: $rule_set,
             created_at: datetime()
         })
         
@@ -127,46 +567,372 @@ class BatteryRepository:
         RETURN dec.id AS decision_id
         """
         
-        scores = decision_result.get('scores', {})
         result = tx.run(
             query,
             bat_id=battery_id,
             mkt_id=market_config_id,
-            recommendation=decision_result.get('recommendation', ''),
-            reason=decision_result.get('reason', ''),
-            score_reuse=scores.get('Reuse', 0),
-            score_remanufacture=scores.get('Remanufacture', 0),
-            score_repurpose=scores.get('Repurpose', 0),
-            score_recycle=scores.get('Recycle', 0)
+            **BatteryRepository._decision_params(decision_result)
         )
         record = result.single()
         return record["decision_id"] if record else None
 
+    def evaluate_and_save_decision(self, battery_id, engine, market_config_id="MKT_STD_2024"):
+        """
+        Lit le jumeau numérique, exécute le moteur de décision et sauvegarde la
+        décision dans une seule transaction d'écriture.
+        
+        Le diagnostic et le marché lus sont réutilisés par elementId : une
+        nouvelle SortingDiagnosis arrivée entre-temps ne peut pas être liée
+        à une décision calculée sur l'ancienne.
+        
+        Returns:
+            Résultat de engine.evaluate_battery, ou None si la batterie est introuvable
+        """
+        cached = self._cached_twin_record(battery_id, market_config_id)
+        
+        with self._session() as session:
+            if cached:
+                # Jumeau en cache : seule l'écriture fait un aller-retour
+                result = engine.evaluate_battery(cached["digital_twin"])
+                decision_id = session.execute_write(
+                    self._create_decision_query, battery_id, result,
+                    cached["diagnosis_ref"], cached["market_ref"]
+                )
+                if decision_id:
+                    self._publish_decisions({battery_id: result}, market_config_id)
+                    return result
+                # Cache périmé (nouveau diagnostic, marché supprimé) : aucune décision
+                # n'a été créée, on relit et réévalue dans une seule transaction
+                self._invalidate(battery_id)
+                self.cache.markets.invalidate(market_config_id)
+            
+            result, record = session.execute_write(
+                self._evaluate_tx, battery_id, engine, market_config_id, self._registry_market(market_config_id)
+            )
+            
+            if not result:
+                print(f"❌ [DB: {self.database}] Aucune batterie trouvée avec l'ID {battery_id}")
+                return None
+            
+            self._remember_twin_record(battery_id, market_config_id, record)
+            self._publish_decisions({battery_id: result}, market_config_id)
+            return result
+
+    @staticmethod
+    def _evaluate_tx(tx, battery_id, engine, market_config_id, market_entry=None):
+        """Fonction transactionnelle : lecture, évaluation en mémoire, écriture."""
+        record = BatteryRepository._read_twin_record(tx, battery_id, market_config_id, market_entry)
+        if not record:
+            return None, None
+        
+        decision_result = engine.evaluate_battery(record["digital_twin"])
+        BatteryRepository._create_decision_query(
+            tx, battery_id, decision_result, record["diagnosis_ref"], record["market_ref"]
+        )
+        return decision_result, record
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'create_decision')
+    def _create_decision_query(tx, battery_id, decision_result, diagnosis_ref, market_ref):
+        """
+        Crée un nœud Decision lié au diagnostic et au marché désignés par elementId.
+        
+        Rien n'est créé si le marché n'existe plus ou si le diagnostic n'est plus
+        le LATEST_DIAGNOSIS de la batterie (référence lue dans un cache périmé).
+        
+        Returns:
+            ID de la décision créée, ou None
+        """
+        record = tx.run(
+            CREATE_DECISION_QUERY,
+            bat_id=battery_id,
+            market_ref=market_ref,
+            diagnosis_ref=diagnosis_ref,
+            **BatteryRepository._decision_params(decision_result)
+        ).single()
+        return record["decision_id"] if record else None
+
+    # ========== ÉVALUATION MULTI-MARCHÉS (RECYCLER) ==========
+
+    def evaluate_markets(self, battery_id, engine, market_ids=None, save=False):
+        """
+        Évalue une batterie pour tous les MarketConfig (ou ceux de `market_ids`)
+        en une seule lecture : le jumeau et tous les marchés viennent de la même
+        requête (ou du cache et du MarketRegistry), les scores de base sont
+        calculés une fois (engine.evaluate_markets).
+        
+        Avec save=True, seule la décision du meilleur marché est sauvegardée,
+        dans la même transaction d'écriture que la lecture. Si la décision
+        calculée sur le cache n'a pas pu être liée (nouveau diagnostic, marché
+        supprimé), le jumeau et les marchés sont relus dans la transaction.
+        
+        Returns:
+            Liste classée de résultats {market_id, recommendation, scores, ...}
+            (vide si aucun marché demandé n'existe), ou None si la batterie est introuvable
+        """
+        cached = self._cached_battery_record(battery_id)
+        snapshot = self._registry_snapshot()
+        
+        if cached and snapshot is not None:
+            ids, weights = self._select_markets(snapshot, market_ids)
+            results = engine.evaluate_markets(cached["digital_twin"], ids, weights)
+            if not (save and results):
+                return results
+            with self._session() as session:
+                decision_id = session.execute_write(
+                    self._create_decision_query, battery_id, results[0],
+                    cached["diagnosis_ref"], snapshot.refs[results[0]["market_id"]]
+                )
+            if decision_id:
+                self._publish_decisions({battery_id: results[0]})
+                return results
+            # Cache périmé : aucune décision n'a été créée, on relit le jumeau
+            # et les marchés depuis Neo4j dans une seule transaction
+            self._invalidate(battery_id)
+            snapshot = None
+        
+        with self._session() as session:
+            run = session.execute_write if save else session.execute_read
+            results, record = run(self._evaluate_markets_tx, battery_id, engine, market_ids, snapshot, save)
+        
+        if results is None:
+            print(f"❌ [DB: {self.database}] Aucune batterie trouvée avec l'ID {battery_id}")
+            return None
+        
+        self._remember_battery_record(battery_id, record)
+        if save and results:
+            self._publish_decisions({battery_id: results[0]})
+        return results
+
+    @staticmethod
+    def _evaluate_markets_tx(tx, battery_id, engine, market_ids, snapshot=None, save=False):
+        """Fonction transactionnelle : lecture (jumeau + marchés), évaluation, écriture du meilleur marché."""
+        record = BatteryRepository._fetch_markets_record(tx, battery_id, snapshot)
+        if not record:
+            return None, None
+        
+        snapshot = record["snapshot"]
+        ids, weights = BatteryRepository._select_markets(snapshot, market_ids)
+        results = engine.evaluate_markets(record["digital_twin"], ids, weights)
+        if save and results:
+            BatteryRepository._create_decision_query(
+                tx, battery_id, results[0], record["diagnosis_ref"], snapshot.refs[results[0]["market_id"]]
+            )
+        return results, record
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_twin_markets')
+    def _fetch_markets_record(tx, battery_id, snapshot=None):
+        """
+        {digital_twin, diagnosis_ref, snapshot} : les marchés du MarketRegistry
+        s'il est chargé, sinon lus dans la même requête que le jumeau.
+        """
+        if snapshot is not None:
+            record = tx.run(FETCH_BATTERY_QUERY, bat_id=battery_id).single()
+            return dict(record, snapshot=snapshot) if record else None
+        
+        record = tx.run(FETCH_TWIN_ALL_MARKETS_QUERY, bat_id=battery_id).single()
+        if not record:
+            return None
+        return {
+            "digital_twin": record["digital_twin"],
+            "diagnosis_ref": record["diagnosis_ref"],
+            "snapshot": MarketSnapshot(record["markets"], None)
+        }
+
+    # ========== TRAITEMENT PAR LOT (RECYCLER) ==========
+
+    def get_digital_twins(self, battery_ids, market_config_id="MKT_STD_2024"):
+        """
+        Récupère les jumeaux numériques de plusieurs batteries en un seul aller-retour (UNWIND).
+        
+        Returns:
+            Dict {battery_id: digital_twin} ; les IDs inconnus sont absents du dict
+        """
+        with self._session() as session:
+            return session.execute_read(self._fetch_batch_query, list(battery_ids), market_config_id)
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_twins_batch')
+    def _fetch_batch_query(tx, battery_ids, market_config_id):
+        """
+        Version UNWIND de _fetch_data_query : un seul MATCH du marché,
+        puis le diagnostic le plus récent par batterie.
+        """
+        result = tx.run(FETCH_TWINS_BATCH_QUERY, bat_ids=battery_ids, mkt_id=market_config_id)
+        twins = {}
+        for record in result:
+            twin = record["digital_twin"]
+            twins.setdefault(twin["battery_id"], twin)
+        return twins
+
+    def get_digital_twin_page(self, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        """
+        Page de jumeaux numériques triés par id, après `after_id` (pagination keyset).
+        
+        Returns:
+            Liste de jumeaux (vide en fin de parcours ou si le marché est inconnu)
+        """
+        with self._session() as session:
+            return session.execute_read(self._fetch_page_query, after_id, limit, market_config_id)
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_twins_page')
+    def _fetch_page_query(tx, after_id, limit, market_config_id):
+        result = tx.run(FETCH_TWINS_PAGE_QUERY, after_id=after_id, limit=limit, mkt_id=market_config_id)
+        twins = {}
+        for record in result:
+            twin = record["digital_twin"]
+            twins.setdefault(twin["battery_id"], twin)
+        return list(twins.values())
+
+    def get_changed_twin_page(self, since, after_id="", limit=1000, market_config_id="MKT_STD_2024"):
+        """
+        Comme get_digital_twin_page, limitée aux batteries dont le passeport ou le
+        diagnostic courant a changé après `since` (datetime avec fuseau horaire).
+        """
+        with self._session() as session:
+            return session.execute_read(self._fetch_changed_page_query, since, after_id, limit, market_config_id)
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'fetch_changed_twins_page')
+    def _fetch_changed_page_query(tx, since, after_id, limit, market_config_id):
+        result = tx.run(
+            FETCH_CHANGED_TWINS_PAGE_QUERY, since=since, after_id=after_id, limit=limit, mkt_id=market_config_id
+        )
+        twins = {}
+        for record in result:
+            twin = record["digital_twin"]
+            twins.setdefault(twin["battery_id"], twin)
+        return list(twins.values())
+
+    def get_database_time(self):
+        """Horloge du serveur Neo4j (datetime avec fuseau), référence des filigranes incrémentaux."""
+        with self._session() as session:
+            return session.execute_read(self._database_time_query)
+
+    @staticmethod
+    def _database_time_query(tx):
+        return tx.run("RETURN datetime() AS now").single()["now"].to_native()
+
+    def save_decisions(self, decisions, market_config_id="MKT_STD_2024"):
+        """
+        Sauvegarde plusieurs décisions dans une seule transaction d'écriture.
+        
+        Args:
+            decisions: Dict {battery_id: decision_result}
+        
+        Returns:
+            Dict {battery_id: decision_id}
+        """
+        rows = [
+            dict(bat_id=battery_id, **self._decision_params(result))
+            for battery_id, result in decisions.items()
+        ]
+        if not rows:
+            return {}
+        with self._session() as session:
+            decision_ids = session.execute_write(self._save_batch_query, rows, market_config_id)
+        self._publish_decisions(
+            {battery_id: decisions[battery_id] for battery_id in decision_ids}, market_config_id
+        )
+        return decision_ids
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'save_decisions_batch')
+    def _save_batch_query(tx, rows, market_config_id):
+        """
+        Version UNWIND de _save_decision_query : un nœud Decision par ligne.
+        """
+        result = tx.run(SAVE_DECISIONS_BATCH_QUERY, rows=rows, mkt_id=market_config_id)
+        return {record["battery_id"]: record["decision_id"] for record in result}
+
+    @staticmethod
+    def _decision_params(decision_result):
+        """Paramètres Cypher d'un nœud Decision à partir du résultat du moteur."""
+        scores = decision_result.get('scores', {})
+        return {
+            'recommendation': decision_result.get('recommendation', ''),
+            'reason': decision_result.get('reason', ''),
+            'score_reuse': scores.get('Reuse', 0),
+            'score_remanufacture': scores.get('Remanufacture', 0),
+            'score_repurpose': scores.get('Repurpose', 0),
+            'score_recycle': scores.get('Recycle', 0),
+            # Version (empreinte) et identifiant du jeu de règles qui a produit la décision
+            'rules_version': decision_result.get('rules_version'),
+            'rule_set': decision_result.get('rule_set')
+        }
+
+    # ========== DIAGNOSTICS (CENTRE DE TRI) ==========
+
+    def add_sorting_diagnosis(self, battery_id, diagnosis):
+        """
+        Enregistre un nouveau SortingDiagnosis et met à jour le pointeur
+        (:Battery)-[:LATEST_DIAGNOSIS]->(:SortingDiagnosis) dans la même transaction.
+        
+        Args:
+            battery_id: ID de la batterie
+            diagnosis: Dict des propriétés du diagnostic ('date' par défaut : maintenant)
+        
+        Returns:
+            elementId du diagnostic créé, ou None si la batterie est introuvable
+        """
+        with self._session() as session:
+            diagnosis_ref = session.execute_write(self._add_diagnosis_query, battery_id, dict(diagnosis))
+            self._invalidate(battery_id)
+            return diagnosis_ref
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'add_diagnosis')
+    def _add_diagnosis_query(tx, battery_id, diagnosis):
+        """
+        Le pointeur n'est déplacé que si le nouveau diagnostic est au moins aussi
+        récent que l'actuel (un diagnostic saisi a posteriori ne le remplace pas).
+        """
+        query = """
+        MATCH (b:Battery {id: $bat_id})
+        CREATE (d:SortingDiagnosis)
+        SET d = $props,
+            d.date = COALESCE(d.date, datetime())
+        CREATE (b)-[:UNDERWENT_DIAGNOSIS]->(d)
+        
+        WITH b, d
+        CALL {
+            WITH b, d
+            OPTIONAL MATCH (b)-[old:LATEST_DIAGNOSIS]->(prev:SortingDiagnosis)
+            WITH b, d, collect(old) AS olds, max(prev.date) AS prev_date
+            WHERE prev_date IS NULL OR COALESCE(d.date >= prev_date, true)
+            FOREACH (rel IN olds | DELETE rel)
+            CREATE (b)-[:LATEST_DIAGNOSIS]->(d)
+            SET b.inputs_updated_at = datetime()
+        }
+        
+        RETURN elementId(d) AS diagnosis_ref
+        """
+        result = tx.run(query, bat_id=battery_id, props=diagnosis)
+        record = result.single()
+        return record["diagnosis_ref"] if record else None
+
     # ========== NEW METHODS FOR GARAGIST & PROPRIETAIRE ==========
     
+    @metrics.timed('repository_query_seconds', 'create_battery_record')
     def create_battery_record(self, battery_id, voltage, capacity, temperature):
         """
         Create or update a battery record in Neo4j database.
         """
-        query = """
-        MERGE (b:Battery { id: $battery_id })
-        ON CREATE SET b.created_at = datetime()
-        SET b.voltage = $voltage,
-            b.capacity = $capacity,
-            b.temperature = $temperature
-        RETURN b
-        """
-        
         parameters = {
             'battery_id': battery_id,
             'voltage': voltage,
             'capacity': capacity,
-            'temperature': temperature
+            'temperature': temperature,
+            'telemetry_block_size': TELEMETRY_BLOCK_SIZE
         }
         
-        with self.driver.session(database=self.database) as session:
+        with self._session() as session:
             try:
-                session.run(query, parameters)
+                record = session.run(CREATE_BATTERY_QUERY, parameters).single()
+                self._invalidate(battery_id)
+                self._remember_owner_status([record["owner_status"]] if record else [])
                 return {
                     'message': 'Battery record created successfully',
                     'battery_id': battery_id
@@ -174,31 +940,65 @@ class BatteryRepository:
             except Exception as e:
                 raise Exception(f"Database error: {str(e)}")
 
+    def create_battery_records(self, rows):
+        """
+        Create or update several battery records in one write transaction.
+        
+        Args:
+            rows: List of dicts {battery_id, voltage, capacity, temperature}
+        
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+        with self._session() as session:
+            try:
+                written, statuses = session.execute_write(self._create_batch_query, rows)
+            except Exception as e:
+                raise Exception(f"Database error: {str(e)}")
+        for row in rows:
+            self._invalidate(row['battery_id'])
+        self._remember_owner_status(statuses)
+        return written
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'create_battery_records_batch')
+    def _create_batch_query(tx, rows):
+        """
+        UNWIND version of create_battery_record: one MERGE per row, one query
+        per round of distinct battery IDs (a repeated ID appends in a later round).
+        Returns (rows written, owner statuses in write order).
+        """
+        written, statuses = 0, []
+        for round_rows in unique_rounds(rows):
+            record = tx.run(CREATE_BATTERIES_BATCH_QUERY, rows=round_rows,
+                            telemetry_block_size=TELEMETRY_BLOCK_SIZE).single()
+            written += record["written"]
+            statuses.extend(record["owner_statuses"])
+        return written, statuses
+
+    @metrics.timed('repository_query_seconds', 'update_battery_measurements')
     def update_battery_measurements(self, battery_id, voltage=None, capacity=None, temperature=None):
         """Update numeric measurements for an existing battery."""
         if voltage is None and capacity is None and temperature is None:
             raise ValueError("At least one field must be provided for update")
 
-        query = """
-        MATCH (b:Battery {id: $battery_id})
-        SET b.voltage = COALESCE($voltage, b.voltage),
-            b.capacity = COALESCE($capacity, b.capacity),
-            b.temperature = COALESCE($temperature, b.temperature)
-        RETURN b
-        """
-
         parameters = {
             'battery_id': battery_id,
             'voltage': voltage,
             'capacity': capacity,
             'temperature': temperature,
+            'telemetry_block_size': TELEMETRY_BLOCK_SIZE,
         }
 
-        with self.driver.session(database=self.database) as session:
+        with self._session() as session:
             try:
-                result = session.run(query, parameters)
+                result = session.run(UPDATE_MEASUREMENTS_QUERY, parameters)
                 record = result.single()
+                self._invalidate(battery_id)
                 if record:
+                    self._remember_owner_status([record["owner_status"]])
                     return {
                         'message': 'Battery record updated successfully',
                         'battery_id': battery_id,
@@ -207,6 +1007,47 @@ class BatteryRepository:
             except Exception as e:
                 raise Exception(f"Database error: {str(e)}")
             
+    def update_battery_measurements_batch(self, updates):
+        """
+        Apply several measurement updates in one write transaction.
+        
+        Args:
+            updates: Dict {battery_id: {voltage?, capacity?, temperature?}}
+        
+        Returns:
+            List of battery IDs that exist and were updated
+        """
+        rows = [
+            {
+                'battery_id': battery_id,
+                'voltage': fields.get('voltage'),
+                'capacity': fields.get('capacity'),
+                'temperature': fields.get('temperature'),
+            }
+            for battery_id, fields in updates.items()
+        ]
+        if not rows:
+            return []
+        with self._session() as session:
+            try:
+                statuses = session.execute_write(self._update_measurements_batch_query, rows)
+            except Exception as e:
+                raise Exception(f"Database error: {str(e)}")
+        for row in rows:
+            self._invalidate(row['battery_id'])
+        self._remember_owner_status(statuses)
+        return [status['battery_id'] for status in statuses]
+
+    @staticmethod
+    @metrics.timed('repository_query_seconds', 'update_measurements_batch')
+    def _update_measurements_batch_query(tx, rows):
+        """
+        UNWIND version of update_battery_measurements (unknown IDs are skipped).
+        Returns the owner status of every updated battery.
+        """
+        result = tx.run(UPDATE_MEASUREMENTS_BATCH_QUERY, rows=rows, telemetry_block_size=TELEMETRY_BLOCK_SIZE)
+        return [record["owner_status"] for record in result]
+
     # create method to update battery status from battery id
     def update_battery_status(self, battery_id, new_status):
         """
@@ -219,45 +1060,40 @@ class BatteryRepository:
         Returns:
             Booléen indiquant si la mise à jour a réussi
         """
-        with self.driver.session(database=self.database) as session:
-            success = session.execute_write(self._update_status_query, battery_id, new_status)
-            return success
+        with self._session() as session:
+            status = session.execute_write(self._update_status_query, battery_id, new_status)
+            self._invalidate(battery_id)
+            self._remember_owner_status([status])
+            return status is not None
         
     @staticmethod
+    @metrics.timed('repository_query_seconds', 'update_status')
     def _update_status_query(tx, battery_id, new_status):
-        #updates the BatteryPassport node and battery_status property
-        query = """
-        MATCH (b:Battery {id: $bat_id})-[:HAS_PASSPORT]->(p:BatteryPassport)
-        SET p.battery_status = $status, 
-            p.status = $status
-        RETURN p.battery_status AS updated_status
-        """
-        result = tx.run(query, bat_id=battery_id, status=new_status) 
+        #updates the BatteryPassport node and battery_status property, returns the owner status (None if not found)
+        result = tx.run(UPDATE_STATUS_QUERY, bat_id=battery_id, status=new_status) 
         record = result.single()
-        return record is not None
+        return record["owner_status"] if record else None
     
+    @metrics.timed('repository_query_seconds', 'battery_exists')
+    def battery_exists(self, battery_id):
+        """
+        Check that a battery node exists (one index lookup).
+        """
+        with self._session() as session:
+            try:
+                result = session.run(BATTERY_EXISTS_QUERY, battery_id=battery_id)
+                return result.single() is not None
+            except Exception as e:
+                raise Exception(f"Database error: {str(e)}")
+
+    @metrics.timed('repository_query_seconds', 'get_all_battery_data')
     def get_all_battery_data(self, battery_id):
         """
         Get all battery information from Neo4j database (~10 fields).
         """
-        query = """
-        MATCH (b:Battery {id: $battery_id})
-        OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
-        RETURN b.id as battery_id,
-               b.voltage as voltage,
-               b.capacity as capacity,
-               b.temperature as temperature,
-               toString(b.created_at) as created_at,
-               p.soh_percent as soh_percent,
-               p.chemistry as chemistry,
-               p.battery_model as battery_model,
-               p.battery_status as battery_status,
-               p.total_energy_throughput_kwh as energy_throughput
-        """
-        
-        with self.driver.session(database=self.database) as session:
+        with self._session() as session:
             try:
-                result = session.run(query, battery_id=battery_id)
+                result = session.run(ALL_BATTERY_DATA_QUERY, battery_id=battery_id)
                 record = result.single()
                 if record:
                     return dict(record)
@@ -265,26 +1101,77 @@ class BatteryRepository:
             except Exception as e:
                 raise Exception(f"Database error: {str(e)}")
 
+    @metrics.timed('repository_query_seconds', 'get_battery_status')
     def get_battery_status(self, battery_id):
         """
         Get battery status for proprietaire.
         """
-        query = """
-        MATCH (b:Battery {id: $battery_id})
-        OPTIONAL MATCH (b)-[:HAS_PASSPORT]->(p:BatteryPassport)
-        RETURN b.id as battery_id,
-               p.battery_status as status,
-               b.voltage as voltage,
-               b.capacity as capacity,
-               p.soh_percent as soh_percent
+        with self._session() as session:
+            try:
+                result = session.run(BATTERY_STATUS_QUERY, battery_id=battery_id)
+                record = result.single()
+                if record:
+                    return dict(record)
+                return None
+            except Exception as e:
+                raise Exception(f"Database error: {str(e)}")
+
+    def get_battery_status_payload(self, battery_id):
+        """
+        Owner status as (serialized JSON bytes, version), (None, None) if the battery is unknown.
+        With an OwnerStatusStore, served from it without querying Neo4j; a
+        battery missing from the store is read from Neo4j and stored.
         """
+        payload, version = self._owner_status_payload(battery_id)
+        if payload is not None:
+            return payload, version
+        status = self.get_battery_status(battery_id)
+        self._fill_owner_status(status)
+        return (serialize(status), status['version']) if status else (None, None)
+
+    @metrics.timed('repository_query_seconds', 'get_battery_version')
+    def get_battery_version(self, battery_id):
+        """
+        Battery.version (bumped by every repository write to the battery or its
+        passport), or None if the battery is unknown. Used for conditional GETs.
+        """
+        with self._session() as session:
+            record = session.run(BATTERY_VERSION_QUERY, battery_id=battery_id).single()
+            return record["version"] if record else None
+
+    def get_owner_status_version(self, battery_id):
+        """
+        Version for a conditional owner-status GET: from the OwnerStatusStore if
+        used (a battery missing from it is read through and stored), else Neo4j.
+        """
+        if self.owner_status is None:
+            return self.get_battery_version(battery_id)
+        version = self.owner_status.get_version(battery_id)
+        if version is None:
+            _, version = self.get_battery_status_payload(battery_id)
+        return version
+
+    # ========== TÉLÉMÉTRIE ==========
+
+    @metrics.timed('repository_query_seconds', 'get_telemetry_blocks')
+    def get_telemetry_blocks(self, battery_id, start=None, end=None):
+        """
+        Récupère les blocs de télémétrie d'une batterie qui recouvrent [start, end].
+        
+        Args:
+            battery_id: ID de la batterie
+            start, end: Bornes en millisecondes epoch (None = non bornée)
         
-        with self.driver.session(database=self.database) as session:
+        Returns:
+            Liste de blocs {seq, timestamps, voltage, capacity, temperature},
+            ou None si la batterie n'existe pas
+        """
+        with self._session() as session:
             try:
-                result = session.run(query, battery_id=battery_id)
+                result = session.run(TELEMETRY_BLOCKS_QUERY, battery_id=battery_id, start=start, end=end)
                 record = result.single()
                 if record:
-                    return dict(record)
+                    return list(record["blocks"])
                 return None
             except Exception as e:
-                raise Exception(f"Database error: {str(e)}")
\ No newline at end of file
+                raise Exception(f"Database error: {str(e)}")
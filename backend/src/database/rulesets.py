@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from ..engine.compiled import CompiledRules
+from ..engine.memo import rules_version
+from ..engine.rulesets import RuleSet
+
+# Active rule set: the most recent RuleSet node flagged active (rules stored as a JSON string)
+ACTIVE_RULE_SET_QUERY = """
+MATCH (r:RuleSet)
+WHERE r.active = true
+RETURN r.id AS id, r.rules AS rules
+ORDER BY coalesce(r.activated_at, r.created_at) DESC
+LIMIT 1
+"""
+
+DEACTIVATE_RULE_SETS_QUERY = """
+MATCH (r:RuleSet)
+WHERE r.active = true AND r.id <> $id
+SET r.active = false
+"""
+
+PUBLISH_RULE_SET_QUERY = """
+MERGE (r:RuleSet {id: $id})
+ON CREATE SET r.rules = $rules,
+              r.rules_version = $rules_version,
+              r.created_at = datetime()
+SET r.active = true,
+    r.activated_at = datetime()
+RETURN r.rules_version AS rules_version
+"""
+
+
+def publish_rule_set(driver, rule_set, database="neo4j"):
+    """
+    Store `rule_set` as a (:RuleSet) node and make it the only active one.
+    Rule set IDs are immutable: re-publishing an ID re-activates it, and fails
+    if its rules differ from the stored ones.
+
+    Returns:
+        rules_version of the published rule set (as recorded on Decision nodes)
+    """
+    version = rules_version(rule_set.build())
+
+    def publish(tx):
+        record = tx.run(
+            PUBLISH_RULE_SET_QUERY,
+            id=rule_set.id,
+            rules=json.dumps(rule_set.overrides, sort_keys=True),
+            rules_version=version
+        ).single()
+        if record["rules_version"] != version:
+            raise ValueError(f"Rule set {rule_set.id} is already published with other rules; use a new id")
+        tx.run(DEACTIVATE_RULE_SETS_QUERY, id=rule_set.id).consume()
+        return version
+
+    with driver.session(database=database) as session:
+        return session.execute_write(publish)
+
+
+class RuleSetRegistry:
+    """
+    Business rules of this worker, loaded from a JSON file or from the graph
+    and installed into a DecisionEngine without a restart.
+
+    The source is re-checked at most every `refresh_interval` seconds. Nothing
+    happens while it is unchanged; a new rule set is compiled once per version
+    (compiled tables are kept for the last `max_versions` versions) and swapped
+    into the engine in one assignment, so requests in flight finish on the
+    rules they started with. An invalid rule set is reported and skipped: the
+    engine keeps its current rules.
+
+    Source: `path` (a file {"id": ..., "rules": {CONSTANT: value}}) when set,
+    otherwise the active (:RuleSet {id, active: true, rules: '<json>'}) node
+    (see publish_rule_set); without either, the BusinessRules defaults.
+    """
+
+    def __init__(self, engine, path=None, refresh_interval=60.0, max_versions=8):
+        self.engine = engine
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.max_versions = max_versions
+        self._fingerprint = None
+        self._checked_at = None
+        self._compiled = OrderedDict()  # (rule set id, rules_version) -> CompiledRules
+        self._lock = threading.Lock()
+        self.last_error = None
+
+    def ensure_fresh(self, driver=None, database="neo4j"):
+        """Load on first use, then refresh when the check interval has elapsed."""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.refresh_interval:
+            self.refresh(driver, database)
+
+    def refresh(self, driver=None, database="neo4j"):
+        """
+        Re-read the source and install its rule set if it changed.
+
+        Returns:
+            True if new rules were installed
+        """
+        with self._lock:
+            if self.path is not None:
+                return self._install(*self._read_file())
+            with driver.session(database=database) as session:
+                row = session.execute_read(self._fetch_rule_set_query)
+            return self._install(row)
+
+    async def ensure_fresh_async(self, driver=None, database="neo4j"):
+        """ensure_fresh for a neo4j.AsyncDriver."""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.refresh_interval:
+            await self.refresh_async(driver, database)
+
+    async def refresh_async(self, driver=None, database="neo4j"):
+        """refresh for a neo4j.AsyncDriver (concurrent refreshes are harmless: same fingerprint)."""
+        if self.path is not None:
+            row, error = self._read_file()
+        else:
+            async with driver.session(database=database) as session:
+                row = await session.execute_read(self._fetch_rule_set_query_async)
+            error = None
+        with self._lock:
+            return self._install(row, error)
+
+    def load(self, driver=None, database="neo4j"):
+        """The current RuleSet of the source, without installing it (raises ValueError if invalid)."""
+        if self.path is not None:
+            row, error = self._read_file()
+            if error is not None:
+                raise ValueError(f"Cannot read rule set {self.path}: {error}")
+        else:
+            with driver.session(database=database) as session:
+                row = session.execute_read(self._fetch_rule_set_query)
+        return self._rule_set(row)
+
+    def current(self):
+        """{rule_set, rules_version} of the installed rules."""
+        compiled = self.engine.compiled
+        return {
+            "rule_set": compiled.rule_set,
+            "rules_version": compiled.version,
+            "last_error": self.last_error
+        }
+
+    def _install(self, row, error=None):
+        fingerprint = self._fingerprint_of(row if error is None else {"error": error})
+        self._checked_at = time.monotonic()
+        if fingerprint == self._fingerprint:
+            return False
+        self._fingerprint = fingerprint
+        try:
+            if error is not None:
+                raise ValueError(f"Cannot read {self.path}: {error}")
+            rule_set = self._rule_set(row)
+            rules = rule_set.build()
+        except ValueError as e:
+            self.last_error = str(e)
+            print(f"⚠️  Rule set rejected, keeping {self.engine.compiled.rule_set}: {self.last_error}")
+            return False
+        self.last_error = None
+        key = (rule_set.id, rules_version(rules))
+        compiled = self._compiled.get(key) or CompiledRules(rules, rule_set=rule_set.id)
+        self._remember(key, compiled)
+        if compiled is self.engine.compiled:
+            return False
+        self.engine.install(compiled)
+        print(f"📐 Rule set {compiled.rule_set} installed (version {compiled.version})")
+        return True
+
+    def _remember(self, key, compiled):
+        self._compiled[key] = compiled
+        self._compiled.move_to_end(key)
+        while len(self._compiled) > self.max_versions:
+            self._compiled.popitem(last=False)
+
+    def _read_file(self):
+        """({id, document}, None) read from `path` (id defaults to the file name), or (None, error)."""
+        try:
+            with open(self.path) as f:
+                text = f.read()
+        except OSError as e:
+            return None, e.strerror or str(e)
+        return {"id": os.path.splitext(os.path.basename(self.path))[0], "document": text}, None
+
+    @staticmethod
+    def _rule_set(row):
+        if row is None:
+            return RuleSet()
+        if "document" in row:
+            return RuleSet.from_json(row["document"], default_id=row["id"])
+        return RuleSet.from_rules_json(row["id"], row["rules"])
+
+    @staticmethod
+    def _fetch_rule_set_query(tx):
+        record = tx.run(ACTIVE_RULE_SET_QUERY).single()
+        return dict(record) if record else None
+
+    @staticmethod
+    async def _fetch_rule_set_query_async(tx):
+        result = await tx.run(ACTIVE_RULE_SET_QUERY)
+        record = await result.single()
+        return dict(record) if record else None
+
+    @staticmethod
+    def _fingerprint_of(row):
+        payload = json.dumps(row, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
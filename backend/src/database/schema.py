@@ -0,0 +1,187 @@
+"""
+Idempotent schema bootstrap: constraints and indexes for every lookup key used
+by BatteryRepository, plus an EXPLAIN-based check of the repository queries.
+
+Run at startup (NEO4J_APPLY_SCHEMA=true) or from the maintenance CLI:
+    python -m src.database.maintenance apply-schema
+    python -m src.database.maintenance check-query-plans
+"""
+from .repository import BatteryRepository
+
+# Each statement is safe to re-run (IF NOT EXISTS)
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT battery_id_unique IF NOT EXISTS "
+    "FOR (b:Battery) REQUIRE b.id IS UNIQUE",
+    "CREATE CONSTRAINT market_config_id_unique IF NOT EXISTS "
+    "FOR (m:MarketConfig) REQUIRE m.id IS UNIQUE",
+    "CREATE CONSTRAINT decision_id_unique IF NOT EXISTS "
+    "FOR (dec:Decision) REQUIRE dec.id IS UNIQUE",
+    "CREATE RANGE INDEX sorting_diagnosis_date IF NOT EXISTS "
+    "FOR (d:SortingDiagnosis) ON (d.date)",
+    "CREATE RANGE INDEX battery_inputs_updated_at IF NOT EXISTS "
+    "FOR (b:Battery) ON (b.inputs_updated_at)",
+    "CREATE CONSTRAINT rule_set_id_unique IF NOT EXISTS "
+    "FOR (r:RuleSet) REQUIRE r.id IS UNIQUE",
+    "CREATE RANGE INDEX decision_rules_version IF NOT EXISTS "
+    "FOR (dec:Decision) ON (dec.rules_version)",
+]
+
+# Plan operators that mean "read every node with this label / every node"
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+
+# Representative call of every repository method, used to capture its Cypher
+REPOSITORY_CALLS = {
+    'get_digital_twin': lambda repo: repo.get_digital_twin('BAT_PLAN', 'MKT_PLAN'),
+    'save_decision': lambda repo: repo.save_decision('BAT_PLAN', {}, 'MKT_PLAN'),
+    'evaluate_and_save_decision': lambda repo: repo.evaluate_and_save_decision(
+        'BAT_PLAN', _NullEngine(), 'MKT_PLAN'
+    ),
+    'get_digital_twin (market registry)': lambda repo: BatteryRepository(
+        driver=repo.driver, markets=_PlanMarkets()
+    ).get_digital_twin('BAT_PLAN', 'MKT_PLAN'),
+    'evaluate_markets': lambda repo: repo.evaluate_markets('BAT_PLAN', _NullEngine()),
+    'get_digital_twins': lambda repo: repo.get_digital_twins(['BAT_PLAN'], 'MKT_PLAN'),
+    'get_digital_twin_page': lambda repo: repo.get_digital_twin_page('BAT_PLAN', 1000, 'MKT_PLAN'),
+    'get_changed_twin_page': lambda repo: repo.get_changed_twin_page('PLAN', 'BAT_PLAN', 1000, 'MKT_PLAN'),
+    'save_decisions': lambda repo: repo.save_decisions({'BAT_PLAN': {}}, 'MKT_PLAN'),
+    'add_sorting_diagnosis': lambda repo: repo.add_sorting_diagnosis('BAT_PLAN', {}),
+    'create_battery_record': lambda repo: repo.create_battery_record('BAT_PLAN', 0, 0, 0),
+    'create_battery_records': lambda repo: repo.create_battery_records(
+        [{'battery_id': 'BAT_PLAN', 'voltage': 0, 'capacity': 0, 'temperature': 0}]
+    ),
+    'update_battery_measurements': lambda repo: repo.update_battery_measurements('BAT_PLAN', voltage=0),
+    'update_battery_measurements_batch': lambda repo: repo.update_battery_measurements_batch(
+        {'BAT_PLAN': {'voltage': 0}}
+    ),
+    'update_battery_status': lambda repo: repo.update_battery_status('BAT_PLAN', 'original'),
+    'battery_exists': lambda repo: repo.battery_exists('BAT_PLAN'),
+    'get_all_battery_data': lambda repo: repo.get_all_battery_data('BAT_PLAN'),
+    'get_telemetry_blocks': lambda repo: repo.get_telemetry_blocks('BAT_PLAN', 0, 1),
+    'get_battery_status': lambda repo: repo.get_battery_status('BAT_PLAN'),
+    'get_battery_version': lambda repo: repo.get_battery_version('BAT_PLAN'),
+}
+
+
+def apply_schema(driver, database="neo4j"):
+    """Create the constraints and indexes (idempotent). Returns the statements run."""
+    with driver.session(database=database) as session:
+        for statement in SCHEMA_STATEMENTS:
+            session.run(statement).consume()
+    return list(SCHEMA_STATEMENTS)
+
+
+def capture_repository_queries():
+    """
+    Run every repository method against a recording driver and return
+    {name: [(query, parameters), ...]} without touching the database.
+    """
+    captured = {}
+    for name, call in REPOSITORY_CALLS.items():
+        driver = _RecordingDriver()
+        call(BatteryRepository(driver=driver))
+        captured[name] = driver.queries
+    return captured
+
+
+def check_query_plans(driver, database="neo4j"):
+    """
+    EXPLAIN every repository query and report label / all-nodes scans.
+
+    Returns:
+        List of dicts {'query_name', 'operator'} (empty if every lookup is indexed)
+    """
+    problems = []
+    with driver.session(database=database) as session:
+        for name, queries in capture_repository_queries().items():
+            for query, parameters in queries:
+                summary = session.run("EXPLAIN " + query, parameters).consume()
+                for operator in _plan_operators(summary.plan):
+                    if operator.split("@")[0] in SCAN_OPERATORS:
+                        problems.append({'query_name': name, 'operator': operator})
+    return problems
+
+
+def _plan_operators(plan):
+    """Flatten the operator types of an EXPLAIN plan tree."""
+    if not plan:
+        return []
+    operators = [plan.get('operatorType', '')]
+    for child in plan.get('children', []):
+        operators.extend(_plan_operators(child))
+    return operators
+
+
+class _NullEngine:
+    """Engine stand-in so evaluate_and_save_decision reaches its write query."""
+
+    def evaluate_battery(self, digital_twin):
+        return {'scores': {}}
+
+    def evaluate_markets(self, digital_twin, market_ids, weights):
+        return []
+
+
+class _PlanMarkets:
+    """MarketRegistry stand-in so the battery-only twin query is captured."""
+
+    def get(self, market_config_id):
+        return {'market': {}, 'market_ref': 'PLAN'}
+
+
+# Placeholder values of record fields that callers use as more than an identifier
+_RECORDED_FIELDS = {
+    'digital_twin': {},
+    'written': 0,
+    'blocks': [],
+    'markets': [],
+}
+
+
+class _RecordedRecord:
+    """Truthy placeholder record: each field reads as an empty value of its type, else a dummy identifier."""
+
+    def __getitem__(self, key):
+        value = _RECORDED_FIELDS.get(key, 'PLAN')
+        return value.copy() if isinstance(value, (dict, list)) else value
+
+    def keys(self):
+        return ['digital_twin', 'diagnosis_ref', 'market_ref']
+
+
+class _RecordedResult:
+    def single(self):
+        return _RecordedRecord()
+
+    def consume(self):
+        return None
+
+    def __iter__(self):
+        return iter([])
+
+
+class _RecordingDriver:
+    """Minimal driver/session/transaction that records queries instead of running them."""
+
+    def __init__(self):
+        self.queries = []
+
+    def session(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        self.queries.append((query, dict(parameters or {}, **kwargs)))
+        return _RecordedResult()
+
+    def execute_read(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+    execute_write = execute_read
+
+    def close(self):
+        pass
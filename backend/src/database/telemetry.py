@@ -0,0 +1,173 @@
+"""
+Battery telemetry history: append-only, array-backed blocks plus bucketed downsampling.
+
+Each measurement write appends one (timestamp, voltage, capacity, temperature)
+sample to the battery's open TelemetryBlock. A block holds up to
+TELEMETRY_BLOCK_SIZE samples as parallel list properties; once full, the next
+sample opens a new block and the LATEST_TELEMETRY pointer moves to it:
+
+    (:Battery)-[:HAS_TELEMETRY]->(:TelemetryBlock {seq, start, end, count,
+                                                   timestamps, voltage, capacity, temperature})
+    (:Battery)-[:LATEST_TELEMETRY]->(:TelemetryBlock)   // open block
+
+Timestamps are epoch milliseconds. Missing values are stored as NaN so the
+parallel lists stay aligned and homogeneous.
+"""
+
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+
+TELEMETRY_BLOCK_SIZE = 256
+SERIES = ('voltage', 'capacity', 'temperature')
+
+def _telemetry_append(source):
+    """
+    Cypher fragment appending the measurements of `source` (a bound variable or
+    map carrying voltage/capacity/temperature) to the open block of a bound `b`,
+    or opening a new one. Expects $telemetry_block_size; leaves only `b` in scope.
+    """
+    carried = '' if source == 'b' else ', ' + source
+
+    def value(name):
+        return f"coalesce(toFloat({source}.{name}), toFloat('NaN'))"
+
+    return f"""
+WITH b{carried}, timestamp() AS ts
+OPTIONAL MATCH (b)-[latest:LATEST_TELEMETRY]->(blk:TelemetryBlock)
+WITH b{carried}, ts, latest, blk, (blk IS NOT NULL AND blk.count < $telemetry_block_size) AS fits
+FOREACH (_ IN CASE WHEN fits THEN [1] ELSE [] END |
+    SET blk.timestamps = blk.timestamps + ts,
+        blk.voltage = blk.voltage + {value('voltage')},
+        blk.capacity = blk.capacity + {value('capacity')},
+        blk.temperature = blk.temperature + {value('temperature')},
+        blk.count = blk.count + 1,
+        blk.start = CASE WHEN ts < blk.start THEN ts ELSE blk.start END,
+        blk.end = CASE WHEN ts > blk.end THEN ts ELSE blk.end END
+)
+FOREACH (_ IN CASE WHEN fits THEN [] ELSE [1] END |
+    DELETE latest
+    CREATE (b)-[:HAS_TELEMETRY]->(nb:TelemetryBlock {{
+        battery_id: b.id,
+        seq: coalesce(blk.seq + 1, 0),
+        start: ts,
+        end: ts,
+        count: 1,
+        timestamps: [ts],
+        voltage: [{value('voltage')}],
+        capacity: [{value('capacity')}],
+        temperature: [{value('temperature')}]
+    }})
+    CREATE (b)-[:LATEST_TELEMETRY]->(nb)
+)
+WITH b
+"""
+
+
+# Appends the current measurements of a bound `b` (after its SET)
+TELEMETRY_APPEND = _telemetry_append('b')
+
+# UNWIND variant: appends the values of the bound `row` itself. Rows of one
+# query must have distinct battery IDs (see unique_rounds): the open-block
+# lookup of every row runs before any row appends.
+TELEMETRY_APPEND_ROW = _telemetry_append('row')
+
+
+def unique_rounds(rows, key='battery_id'):
+    """
+    Split rows into consecutive rounds in which each `key` appears at most once.
+
+    The n-th row of a given battery goes to round n, so applying the rounds in
+    order keeps each battery's samples in input order.
+    """
+    rounds = []
+    seen = {}
+    for row in rows:
+        n = seen.get(row[key], 0)
+        seen[row[key]] = n + 1
+        if n == len(rounds):
+            rounds.append([])
+        rounds[n].append(row)
+    return rounds
+
+
+def downsample(blocks, start=None, end=None, buckets=100):
+    """
+    Merge telemetry blocks and reduce them to at most `buckets` time buckets.
+
+    Args:
+        blocks: Iterable of dicts with 'timestamps' and one list per SERIES entry
+        start, end: Inclusive epoch-ms bounds (default: first / last sample)
+        buckets: Maximum number of buckets returned
+
+    Returns:
+        Dict {start, end, bucket_ms, points, buckets: [{start, count, <series>: {min, max, mean}}]}
+    """
+    blocks = list(blocks)
+    if blocks:
+        timestamps = np.concatenate([np.asarray(b['timestamps'], dtype=np.int64) for b in blocks])
+        values = {
+            name: np.concatenate([np.asarray(b[name], dtype=np.float64) for b in blocks])
+            for name in SERIES
+        }
+    else:
+        timestamps = np.empty(0, dtype=np.int64)
+        values = {name: np.empty(0, dtype=np.float64) for name in SERIES}
+
+    mask = np.ones(len(timestamps), dtype=bool)
+    if start is not None:
+        mask &= timestamps >= start
+    if end is not None:
+        mask &= timestamps <= end
+    order = np.argsort(timestamps[mask], kind='stable')
+    timestamps = timestamps[mask][order]
+    values = {name: series[mask][order] for name, series in values.items()}
+
+    if len(timestamps) == 0:
+        return {'start': start, 'end': end, 'bucket_ms': None, 'points': 0, 'buckets': []}
+
+    lo = int(timestamps[0]) if start is None else int(start)
+    hi = int(timestamps[-1]) if end is None else int(end)
+    bucket_ms = max(1, math.ceil((hi - lo + 1) / max(1, buckets)))
+    index = (timestamps - lo) // bucket_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(index)) + 1))
+    counts = np.diff(np.append(starts, len(timestamps)))
+
+    stats = {}
+    for name, series in values.items():
+        present = ~np.isnan(series)
+        n = np.add.reduceat(present.astype(np.int64), starts)
+        total = np.add.reduceat(np.where(present, series, 0.0), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats[name] = (
+                np.fmin.reduceat(series, starts),
+                np.fmax.reduceat(series, starts),
+                total / n,
+                n > 0
+            )
+
+    result = []
+    for i, first in enumerate(starts):
+        bucket = {'start': lo + int(index[first]) * bucket_ms, 'count': int(counts[i])}
+        for name, (mins, maxs, means, has) in stats.items():
+            bucket[name] = {
+                'min': float(mins[i]), 'max': float(maxs[i]), 'mean': float(means[i])
+            } if has[i] else None
+        result.append(bucket)
+
+    return {'start': lo, 'end': hi, 'bucket_ms': bucket_ms, 'points': int(len(timestamps)), 'buckets': result}
+
+
+def parse_timestamp(value):
+    """Parse an epoch-ms integer or ISO 8601 string into epoch ms (None passes through)."""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
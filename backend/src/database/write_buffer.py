@@ -0,0 +1,145 @@
+"""
+Write-behind buffer for high-frequency battery measurement updates.
+
+Pending PATCHes are merged per battery ID (last writer wins per field) and
+written by a background thread in one batched transaction, either every
+`flush_interval` seconds or as soon as `max_pending` batteries are waiting.
+Readers call `barrier(battery_id)` to get read-your-writes for one battery;
+`close()` drains everything on shutdown.
+
+The buffer is per process: a barrier only covers updates accepted by the
+same worker.
+"""
+
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+MEASUREMENT_FIELDS = ('voltage', 'capacity', 'temperature')
+
+
+class MeasurementWriteBuffer:
+    """Coalesces measurement updates and flushes them through `flush_fn(updates)`."""
+
+    def __init__(self, flush_fn, flush_interval=0.2, max_pending=500):
+        """
+        Args:
+            flush_fn: Callable receiving {battery_id: {field: value}}; must write them atomically
+            flush_interval: Seconds between background flushes
+            max_pending: Number of buffered batteries that triggers an early flush
+        """
+        self.flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        # Held for the whole swap + write so a barrier also waits for an in-flight flush
+        self._flush_lock = threading.RLock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._thread_pid = None
+        self.flushes = 0
+        self.flushed_updates = 0
+        self.coalesced_updates = 0
+        self.failed_flushes = 0
+
+    def submit(self, battery_id, **fields):
+        """Queue an update; only non-None fields are applied."""
+        fields = {name: value for name, value in fields.items() if value is not None}
+        if not fields:
+            raise ValueError("At least one field must be provided for update")
+        unknown = set(fields) - set(MEASUREMENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown measurement fields: {', '.join(sorted(unknown))}")
+        if self._closed:
+            raise RuntimeError("Write buffer is closed")
+
+        self._ensure_thread()
+        with self._lock:
+            pending = self._pending.get(battery_id)
+            if pending is None:
+                self._pending[battery_id] = fields
+            else:
+                pending.update(fields)
+                self.coalesced_updates += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def barrier(self, battery_id):
+        """Make every accepted update of `battery_id` durable before returning."""
+        with self._flush_lock:
+            with self._lock:
+                pending = battery_id in self._pending
+            if pending:
+                self._flush_locked()
+
+    def flush(self):
+        """Write every pending update now. Returns the number of batteries written."""
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def close(self):
+        """Stop the background thread and drain the remaining updates."""
+        self._closed = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._thread_pid == os.getpid():
+            thread.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'flushes': self.flushes,
+            'flushed_updates': self.flushed_updates,
+            'coalesced_updates': self.coalesced_updates,
+            'failed_flushes': self.failed_flushes,
+        }
+
+    def _flush_locked(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            self.flush_fn(batch)
+        except Exception:
+            # Put the batch back without overwriting newer values queued meanwhile
+            with self._lock:
+                for battery_id, fields in batch.items():
+                    self._pending[battery_id] = dict(fields, **self._pending.get(battery_id, {}))
+                self.failed_flushes += 1
+            raise
+        self.flushes += 1
+        self.flushed_updates += len(batch)
+        return len(batch)
+
+    def _ensure_thread(self):
+        # Threads do not survive fork: a worker starts its own flusher on first use
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != pid:
+                self._thread = threading.Thread(
+                    target=self._run, name='measurement-write-buffer', daemon=True
+                )
+                self._thread_pid = pid
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._closed:
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Measurement write buffer flush failed; retrying next interval")
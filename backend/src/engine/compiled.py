@@ -0,0 +1,259 @@
+# src/engine/compiled.py
+import re
+
+import numpy as np
+
+from .memo import rules_version
+
+OPTIONS = ("Reuse", "Remanufacture", "Repurpose", "Recycle")
+ZERO_ROW = (0, 0, 0, 0)
+
+# Bandes SOH : (seuil minimal, coefficients appliqués au SOH, constantes).
+# Une colonne avec un coefficient None prend la constante. Compilées en
+# (seuil, colonnes pondérées, coefficients, constantes).
+SOH_BANDS = (
+    ("MIN_SOH_FOR_REUSE", (0.6, 0.3, 0.1, None), (0, 0, 0, 0)),
+    ("MIN_SOH_FOR_REMANUFACTURE", (0.2, 0.5, 0.2, None), (0, 0, 0, 10)),
+    ("MIN_SOH_FOR_REPURPOSE", (None, 0.2, 0.4, None), (0, 0, 0, 20)),
+)
+SOH_FLOOR_ROW = (0, 0, 0, 50)
+
+AGE_ROWS = ((10, 5, 0, 0), (0, 10, 5, 0), (0, 0, 0, 10))
+FADE_ROWS = ((-20, -10, 10, 15), (0, -15, 10, 10))
+UNSAFE_SOC_ROW = (0, 0, 0, 10)
+HIGH_THROUGHPUT_ROW = (-5, 5, 5, 5)
+LOW_RESISTANCE_ROW = (30, 10, 0, 0)
+
+MODULARITY_SCORES = {"high": 10, "medium": 5, "low": 0}
+
+# Mots-clés de l'intention fabricant : (mot-clé, colonne, constante de poids)
+INTENT_KEYWORDS = (
+    ("repurpose", 2, "WEIGHT_MANUFACTURER_INTENT_REPURPOSE"),
+    ("remanufacture", 1, "WEIGHT_MANUFACTURER_INTENT_REMANUFACTURE"),
+    ("remanufacturing", 1, "WEIGHT_MANUFACTURER_INTENT_REMANUFACTURE"),
+)
+
+
+def _option_row(weights):
+    """Dict {option: poids} → tuple dans l'ordre de OPTIONS (0 si absent)."""
+    return tuple(weights.get(option, 0) for option in OPTIONS)
+
+
+def _mask_rows(rows):
+    """Table des sous-ensembles : row[mask] = première ligne dont le bit est levé."""
+    table = [None] * (1 << len(rows))
+    for mask in range(len(table)):
+        table[mask] = rows[(mask & -mask).bit_length() - 1] if mask else ZERO_ROW
+    return table
+
+
+class KeywordMatcher:
+    """
+    Recherche de plusieurs sous-chaînes en une seule passe (une regex).
+
+    match() renvoie un masque de bits : le bit i est levé si le motif i
+    apparaît dans le texte, comme `patterns[i] in text`. Les alternatives
+    sont triées de la plus longue à la plus courte et examinées à chaque
+    position ; un motif contenu dans un autre est ajouté par fermeture.
+    Les masques sont mémorisés par texte (les modèles d'une flotte se répètent),
+    la mémoire est vidée au-delà de `max_entries` textes distincts.
+    """
+
+    def __init__(self, patterns, max_entries=4096):
+        self.patterns = tuple(patterns)
+        self.max_entries = max_entries
+        self._masks = {}
+        bits = {}
+        for i, pattern in enumerate(self.patterns):
+            bits[pattern] = bits.get(pattern, 0) | (1 << i)
+        self._implied = {
+            pattern: sum(bit for other, bit in bits.items() if other in pattern)
+            for pattern in bits
+        }
+        alternatives = sorted(bits, key=len, reverse=True)
+        self._regex = re.compile(
+            "(?=(" + "|".join(re.escape(p) for p in alternatives) + "))"
+        ) if alternatives else None
+
+    def match(self, text):
+        mask = self._masks.get(text)
+        if mask is not None:
+            return mask
+        mask = 0
+        if self._regex is not None:
+            implied = self._implied
+            for found in self._regex.finditer(text):
+                mask |= implied[found.group(1)]
+        if len(self._masks) >= self.max_entries:
+            self._masks.clear()
+        self._masks[text] = mask
+        return mask
+
+
+class CompiledRules:
+    """
+    BusinessRules précompilées en tables de poids [option] pour DecisionEngine.
+
+    Chimie et statut : index d'énumération vers une table de lignes (la dernière
+    ligne, nulle, pour les valeurs inconnues). Catégories de modèle et intention
+    fabricant : un KeywordMatcher, puis une table indexée par le masque obtenu.
+    SOH, âge et capacity fade : tableaux de seuils parcourus dans l'ordre.
+    Les lignes ont exactement les valeurs (et les types) des anciennes fonctions
+    de pondération, la matrice produite est donc identique bit à bit.
+    Les tables sont figées : modifier les règles, c'est compiler une nouvelle
+    instance et l'installer dans le moteur (DecisionEngine.install).
+    `version` est l'empreinte du contenu des règles, `rule_set` l'identifiant
+    du jeu de règles dont elles viennent (voir rulesets.py).
+    """
+
+    def __init__(self, rules, rule_set="default"):
+        self.rules = rules
+        self.rule_set = rule_set
+        self.version = rules_version(rules)
+
+        # Critère 1 : SOH
+        self.soh_bands = tuple(
+            (
+                getattr(rules, name),
+                tuple(i for i, c in enumerate(coefs) if c is not None),
+                tuple(c for c in coefs if c is not None),
+                consts
+            )
+            for name, coefs, consts in SOH_BANDS
+        )
+
+        # Critère 2 : SOC
+        self.soc_range = (rules.MIN_SOC_FOR_SAFE_HANDLING, rules.MAX_SOC_FOR_SAFE_HANDLING)
+
+        # Critères 3 et 10 : tables indexées par énumération
+        self.chemistry_index = {key: i for i, key in enumerate(rules.CHEMISTRY_WEIGHTS)}
+        self.chemistry_rows = [_option_row(w) for w in rules.CHEMISTRY_WEIGHTS.values()] + [ZERO_ROW]
+        self.chemistry_table = np.array(self.chemistry_rows, dtype=float)
+        self._chemistry_rows = dict(zip(self.chemistry_index, self.chemistry_rows))
+        self.status_index = {key: i for i, key in enumerate(rules.STATUS_WEIGHTS)}
+        self.status_rows = [_option_row(w) for w in rules.STATUS_WEIGHTS.values()] + [ZERO_ROW]
+        self.status_table = np.array(self.status_rows, dtype=float)
+        self._status_rows = dict(zip(self.status_index, self.status_rows))
+
+        # Critère 4 : âge
+        self.age_thresholds = (rules.MAX_AGE_FOR_REUSE_YEARS, rules.MAX_AGE_FOR_REMANUFACTURE_YEARS)
+
+        # Critère 5 : energy throughput
+        self.throughput_threshold = rules.HIGH_THROUGHPUT_THRESHOLD
+
+        # Critère 6 : capacity fade
+        self.fade_thresholds = (rules.MAX_CAPACITY_FADE_FOR_REUSE, rules.MAX_CAPACITY_FADE_FOR_REMANUFACTURE)
+
+        # Critère 7 : design for disassembly, une ligne par score de modularité
+        remanufacture = rules.WEIGHT_DESIGN_DISASSEMBLY_REMANUFACTURE / 10
+        recycle = rules.WEIGHT_DESIGN_DISASSEMBLY_RECYCLE / 10
+        self.design_coefficients = (remanufacture, recycle)
+        self.design_rows = {
+            score: (0, score * remanufacture, 0, score * recycle)
+            for score in set(MODULARITY_SCORES.values()) | {10, 0}
+        }
+
+        # Critère 8 : intention fabricant, une ligne par combinaison de mots-clés
+        self.intent_matcher = KeywordMatcher(keyword for keyword, _, _ in INTENT_KEYWORDS)
+        self.intent_rows = []
+        for mask in range(1 << len(INTENT_KEYWORDS)):
+            row = [0, 0, 0, 0]
+            for i, (_, column, name) in enumerate(INTENT_KEYWORDS):
+                if mask & (1 << i):
+                    row[column] = getattr(rules, name)
+            self.intent_rows.append(tuple(row))
+        self.intent_table = np.array(self.intent_rows, dtype=float)
+
+        # Critère 9 : catégorie de modèle (la première des règles qui correspond)
+        self.model_categories = tuple(rules.MODEL_CATEGORIES)
+        self.model_matcher = KeywordMatcher(self.model_categories)
+        model_rows = [_option_row(w) for w in rules.MODEL_CATEGORIES.values()]
+        self.model_rows = _mask_rows(model_rows)
+        self.model_table = np.array(model_rows + [ZERO_ROW], dtype=float)
+
+        # Critère 11 : résistance interne
+        self.resistance_threshold = rules.MAX_RESISTANCE_FOR_REUSE
+
+    # ========== LIGNES PAR CRITÈRE ==========
+
+    def soh_row(self, soh):
+        for threshold, columns, coefs, consts in self.soh_bands:
+            if soh >= threshold:
+                row = list(consts)
+                for column, coef in zip(columns, coefs):
+                    row[column] = soh * coef
+                return row
+        return SOH_FLOOR_ROW
+
+    def soc_row(self, soc):
+        if soc is None:
+            return ZERO_ROW
+        low, high = self.soc_range
+        return UNSAFE_SOC_ROW if soc < low or soc > high else ZERO_ROW
+
+    def age_row(self, age_years):
+        if age_years is None:
+            return ZERO_ROW
+        for threshold, row in zip(self.age_thresholds, AGE_ROWS):
+            if age_years <= threshold:
+                return row
+        return AGE_ROWS[-1]
+
+    def fade_row(self, fade):
+        if fade is None:
+            return ZERO_ROW
+        for threshold, row in zip(self.fade_thresholds, FADE_ROWS):
+            if fade > threshold:
+                return row
+        return ZERO_ROW
+
+    def design_row(self, design):
+        if design is None:
+            return ZERO_ROW
+        return self.design_rows[self.modularity(design)]
+
+    def intent_row(self, intent):
+        if not isinstance(intent, str):
+            return ZERO_ROW
+        return self.intent_rows[self.intent_mask(intent)]
+
+    def intent_mask(self, intent):
+        return self.intent_matcher.match(intent.lower())
+
+    def model_row(self, model):
+        return self.model_rows[self.model_matcher.match(model)]
+
+    def model_index(self, model):
+        """Index dans MODEL_CATEGORIES de la catégorie retenue, len(categories) si aucune."""
+        mask = self.model_matcher.match(model)
+        return (mask & -mask).bit_length() - 1 if mask else len(self.model_categories)
+
+    def model_category(self, model):
+        index = self.model_index(model)
+        return self.model_categories[index] if index < len(self.model_categories) else None
+
+    def modularity(self, design):
+        """Score de modularité (0-10) de l'attribut design for disassembly."""
+        if isinstance(design, bool) and design:
+            return 10
+        elif isinstance(design, str):
+            return MODULARITY_SCORES.get(design.lower(), 0)
+        return 0
+
+    def matrix(self, attributes):
+        """Matrice de pondération [11 x 4], identique à l'ancienne construction critère par critère."""
+        return np.array([
+            self.soh_row(attributes['soh']),
+            self.soc_row(attributes['soc']),
+            self._chemistry_rows.get(attributes['chemistry'], ZERO_ROW),
+            self.age_row(attributes['age_years']),
+            HIGH_THROUGHPUT_ROW if attributes['energy_throughput'] > self.throughput_threshold else ZERO_ROW,
+            self.fade_row(attributes['capacity_fade']),
+            self.design_row(attributes['design_disassembly']),
+            self.intent_row(attributes['repurpose_potential']),
+            self.model_row(attributes['battery_model']),
+            self._status_rows.get(attributes['battery_status'], ZERO_ROW),
+            LOW_RESISTANCE_ROW if attributes['internal_resistance'] is not None and
+            attributes['internal_resistance'] < self.resistance_threshold else ZERO_ROW
+        ])
+
@@ -2,11 +2,34 @@
 from datetime import datetime
 import numpy as np
 from .rules import BusinessRules
+from ..metrics import metrics
+from .compiled import (
+    AGE_ROWS, FADE_ROWS, HIGH_THROUGHPUT_ROW, LOW_RESISTANCE_ROW, SOH_FLOOR_ROW, UNSAFE_SOC_ROW,
+    CompiledRules
+)
 
 class DecisionEngine:
-    def __init__(self):
-        self.rules = BusinessRules()
+    def __init__(self, memo=None, compiled=None):
         self.options = ["Reuse", "Remanufacture", "Repurpose", "Recycle"]
+        # Mémoïsation optionnelle des scores (DecisionMemo)
+        self.memo = memo
+        # Tables de poids précompilées (BusinessRules par défaut), remplacées par install()
+        self.compiled = compiled or CompiledRules(BusinessRules())
+    
+    @property
+    def rules(self):
+        return self.compiled.rules
+    
+    @property
+    def rules_version(self):
+        return self.compiled.version
+    
+    def install(self, compiled):
+        """
+        Remplace les règles en une affectation. Chaque évaluation lit self.compiled
+        une seule fois : celles en cours terminent avec les tables de départ.
+        """
+        self.compiled = compiled
         
     def evaluate_battery(self, digital_twin):
         """
@@ -21,60 +44,204 @@ class DecisionEngine:
         diag = digital_twin.get('diagnosis', {})
         passport = digital_twin.get('passport', {})
         market = digital_twin.get('market', {})
+        compiled = self.compiled
 
         # ========== ÉTAPE 1: KILL SWITCH (Sécurité) ==========
-        critical_defects = (diag.get('critical_defects', False) is True) or \
-                          (passport.get('critical_defects', False) is True)
-        history_of_abuse = (diag.get('history_of_abuse', False) is True) or \
-                          (passport.get('history_of_abuse', False) is True)
-        
-        if critical_defects or history_of_abuse:
-            return self._build_result("Recycle", "CRITICAL_SAFETY_FAIL", 
-                                      {"Reuse": 0, "Remanufacture": 0, "Repurpose": 0, "Recycle": 100})
+        with metrics.timer('engine_stage_seconds', 'kill_switch'):
+            kill_switch = self._is_kill_switch(diag, passport)
+        if kill_switch:
+            return self._build_kill_switch_result(compiled)
 
         # ========== ÉTAPE 2: EXTRACTION DES ATTRIBUTS ==========
+        with metrics.timer('engine_stage_seconds', 'extract_attributes'):
+            attributes = self._extract_attributes(diag, passport)
+        
+        # Mémoïsation : un hit saute la construction de la matrice
+        memo_key = None
+        scores = None
+        if self.memo is not None:
+            memo_key = self.memo.fingerprint(compiled, attributes, market)
+            scores = self.memo.get(memo_key)
+        
+        if scores is None:
+            # ========== ÉTAPE 3: CONSTRUCTION DE LA MATRICE DE PONDÉRATION ==========
+            ponderation_matrix = self._build_ponderation_matrix(attributes, compiled)
+            
+            # ========== ÉTAPE 4: CALCUL DES SCORES ==========
+            scores = self._calculate_scores(ponderation_matrix, attributes)
+            
+            # ========== ÉTAPE 5: AJUSTEMENT MARCHÉ ==========
+            scores = self._apply_market_weights(scores, market)
+            
+            if memo_key is not None:
+                self.memo.put(memo_key, scores)
+        
+        # ========== ÉTAPE 6: DÉCISION FINALE ==========
+        best_option = max(scores, key=scores.get)
+        reason = self._build_reason(attributes, scores, best_option)
+        
+        return self._build_result(best_option, reason, scores, compiled)
+
+    @metrics.timed('engine_stage_seconds', 'evaluate_markets')
+    def evaluate_markets(self, digital_twin, market_ids, weights):
+        """
+        Évalue une batterie pour plusieurs marchés en une seule passe.
+
+        Les scores de base (indépendants du marché) sont calculés une fois,
+        puis multipliés par la matrice [M x 4] des coefficients marché. Pour
+        chaque marché, le résultat est identique à evaluate_battery.
+
+        Args:
+            digital_twin: Dict contenant 'diagnosis' et 'passport' ('market' ignoré)
+            market_ids: Identifiants des M marchés
+            weights: Matrice [M x 4] des coefficients (MarketSnapshot.weights)
+
+        Returns:
+            Liste de dicts {'market_id', 'recommendation', 'reason', 'scores', ...}
+            classée du meilleur score retenu au moins bon (ordre des marchés en cas d'égalité)
+        """
+        diag = digital_twin.get('diagnosis', {})
+        passport = digital_twin.get('passport', {})
+        compiled = self.compiled
+
+        # ========== ÉTAPE 1: KILL SWITCH (Sécurité) ==========
+        if self._is_kill_switch(diag, passport):
+            return [
+                dict(self._build_kill_switch_result(compiled), market_id=market_id)
+                for market_id in market_ids
+            ]
+
+        # ========== ÉTAPES 2 À 4: SCORES DE BASE (une fois pour tous les marchés) ==========
         attributes = self._extract_attributes(diag, passport)
+        memo_key = None
+        scores = None
+        if self.memo is not None:
+            memo_key = self.memo.fingerprint(compiled, attributes, {})
+            scores = self.memo.get(memo_key)
+        if scores is None:
+            scores = self._calculate_scores(self._build_ponderation_matrix(attributes, compiled), attributes)
+            if memo_key is not None:
+                self.memo.put(memo_key, scores)
+
+        # ========== ÉTAPE 5: AJUSTEMENT MARCHÉ [M x 4] ==========
+        market_scores = np.array([scores[option] for option in self.options], dtype=float) * weights
+
+        # ========== ÉTAPE 6: DÉCISION PAR MARCHÉ ET CLASSEMENT ==========
+        best = np.argmax(market_scores, axis=1)
+        ranked = sorted(range(len(market_ids)), key=lambda i: -market_scores[i, best[i]])
+        results = []
+        for i in ranked:
+            row_scores = dict(zip(self.options, market_scores[i]))
+            best_option = self.options[best[i]]
+            reason = self._build_reason(attributes, row_scores, best_option)
+            results.append(dict(self._build_result(best_option, reason, row_scores, compiled),
+                                market_id=market_ids[i]))
+        return results
+
+    @metrics.timed('engine_stage_seconds', 'evaluate_batch')
+    def evaluate_batch(self, digital_twins):
+        """
+        Évalue un lot de batteries en une seule passe vectorisée.
         
-        # ========== ÉTAPE 3: CONSTRUCTION DE LA MATRICE DE PONDÉRATION ==========
-        ponderation_matrix = self._build_ponderation_matrix(attributes)
+        Les attributs de tous les jumeaux sont extraits une seule fois en colonnes,
+        puis les 11 critères sont calculés par masques sur un tenseur [N x 11 x 4].
+        Les résultats sont identiques à ceux de evaluate_battery.
+        
+        Args:
+            digital_twins: Liste de dicts contenant 'diagnosis', 'passport', et 'market'
+        
+        Returns:
+            Liste de dicts avec 'recommendation', 'reason', et 'scores' (même ordre)
+        """
+        twins = list(digital_twins)
+        results = [None] * len(twins)
+        compiled = self.compiled
+        
+        # ========== ÉTAPE 1: KILL SWITCH (Sécurité) ==========
+        # Étapes chronométrées une fois pour tout le lot, pas par jumeau
+        safe_idx = []
+        with metrics.timer('engine_stage_seconds', 'kill_switch'):
+            for i, twin in enumerate(twins):
+                diag = twin.get('diagnosis', {})
+                passport = twin.get('passport', {})
+                if self._is_kill_switch(diag, passport):
+                    results[i] = self._build_kill_switch_result(compiled)
+                else:
+                    safe_idx.append(i)
+        
+        if not safe_idx:
+            return results
+        
+        # ========== ÉTAPE 2: EXTRACTION DES ATTRIBUTS (en colonnes) ==========
+        with metrics.timer('engine_stage_seconds', 'extract_attributes'):
+            attributes = [
+                self._extract_attributes(twins[i].get('diagnosis', {}), twins[i].get('passport', {}))
+                for i in safe_idx
+            ]
+            columns = self._attributes_to_columns(attributes, compiled)
+        
+        # ========== ÉTAPE 3: TENSEUR DE PONDÉRATION [N x 11 x 4] ==========
+        tensor = self._build_ponderation_tensor(columns, compiled)
         
         # ========== ÉTAPE 4: CALCUL DES SCORES ==========
-        scores = self._calculate_scores(ponderation_matrix, attributes)
+        scores = self._calculate_scores_batch(tensor)
         
         # ========== ÉTAPE 5: AJUSTEMENT MARCHÉ ==========
-        scores = self._apply_market_weights(scores, market)
+        markets = [twins[i].get('market', {}) for i in safe_idx]
+        scores = scores * self._market_weight_matrix(markets)
         
         # ========== ÉTAPE 6: DÉCISION FINALE ==========
-        best_option = max(scores, key=scores.get)
-        reason = self._build_reason(attributes, scores, best_option)
-        
-        return self._build_result(best_option, reason, scores)
+        best = np.argmax(scores, axis=1)
+        for row, i in enumerate(safe_idx):
+            row_scores = dict(zip(self.options, scores[row]))
+            best_option = self.options[best[row]]
+            reason = self._build_reason(attributes[row], row_scores, best_option)
+            results[i] = self._build_result(best_option, reason, row_scores, compiled)
+        
+        return results
+
+    def _is_kill_switch(self, diag, passport):
+        """Vérifie les facteurs bloquants (défauts critiques, historique d'abus)."""
+        critical_defects = (diag.get('critical_defects', False) is True) or \
+                          (passport.get('critical_defects', False) is True)
+        history_of_abuse = (diag.get('history_of_abuse', False) is True) or \
+                          (passport.get('history_of_abuse', False) is True)
+        return critical_defects or history_of_abuse
+
+    def _build_kill_switch_result(self, compiled):
+        """Résultat imposé par le kill switch : recyclage direct."""
+        return self._build_result("Recycle", "CRITICAL_SAFETY_FAIL", 
+                                  {"Reuse": 0, "Remanufacture": 0, "Repurpose": 0, "Recycle": 100},
+                                  compiled)
 
     def _extract_attributes(self, diag, passport):
         """Extrait et normalise les 12 attributs du Battery Passport."""
         
+        # Les propriétés absentes du graphe arrivent à None : `or` ramène chaque
+        # attribut à sa valeur par défaut (0 ou chaîne vide)
+        
         # Attribute #1: State of Health (SOH)
-        soh = diag.get('soh_percent', 0) or passport.get('soh_percent', 0)
+        soh = diag.get('soh_percent') or passport.get('soh_percent') or 0
         
         # Attribute #2: State of Charge (SOC)
         soc = diag.get('soc_percent', None)
         
         # Attribute #3: Known defects (déjà géré par kill switch)
-        known_defects = diag.get('known_defects', '') or passport.get('known_defects', '')
+        known_defects = diag.get('known_defects') or passport.get('known_defects') or ''
         
         # Attribute #4: Battery model
-        battery_model = passport.get('battery_model', '').lower()
+        battery_model = (passport.get('battery_model') or '').lower()
         
         # Attribute #5: Battery chemistry
-        chemistry = passport.get('chemistry', '').upper()
+        chemistry = (passport.get('chemistry') or '').upper()
         
         # Attribute #6: Date of placing on market
         market_date_str = passport.get('date_placing_market', None)
         age_years = self._calculate_age(market_date_str)
         
         # Attribute #7: Total energy throughput
-        energy_throughput = passport.get('total_energy_throughput_kwh', 0) or \
-                           diag.get('total_energy_throughput_kwh', 0)
+        energy_throughput = passport.get('total_energy_throughput_kwh') or \
+                           diag.get('total_energy_throughput_kwh') or 0
         
         # Attribute #8: Potentials for repurposing/remanufacturing
         repurpose_potential = passport.get('potentials_repurposing_remanufacturing', None)
@@ -86,11 +253,11 @@ class DecisionEngine:
         capacity_fade = passport.get('capacity_fade_percent_per_year', None)
         
         # Attribute #11: Informations on accidents (déjà géré par kill switch)
-        accidents = diag.get('accidents', '') or passport.get('accidents', '')
+        accidents = diag.get('accidents') or passport.get('accidents') or ''
         
         # Attribute #12: Battery Status
-        battery_status = passport.get('battery_status', '').lower() or \
-                        diag.get('battery_status', '').lower()
+        battery_status = (passport.get('battery_status') or '').lower() or \
+                        (diag.get('battery_status') or '').lower()
         
         # Autres attributs techniques
         internal_resistance = diag.get('internal_resistance_mOhm', None)
@@ -111,178 +278,20 @@ class DecisionEngine:
             'internal_resistance': internal_resistance
         }
 
-    def _build_ponderation_matrix(self, attributes):
+    @metrics.timed('engine_stage_seconds', 'build_ponderation_matrix')
+    def _build_ponderation_matrix(self, attributes, compiled=None):
         """
         Construit une matrice de pondération [n_criteria x 4_options].
         Chaque ligne représente un critère, chaque colonne une option de fin de vie.
+        Les lignes sont lues dans les tables précompilées (voir compiled.py) :
+        SOH, SOC, Chemistry, Age, Throughput, Capacity Fade, Design, Intent,
+        Model, Status, Resistance.
         """
-        matrix = []
-        
-        # Critère 1: SOH (State of Health) - POIDS CRITIQUE
-        soh_weights = self._get_soh_weights(attributes['soh'])
-        matrix.append(soh_weights)
-        
-        # Critère 2: SOC (State of Charge) - Sécurité manipulation
-        soc_weights = self._get_soc_weights(attributes['soc'])
-        matrix.append(soc_weights)
-        
-        # Critère 3: Chemistry - Valeur des matériaux
-        chemistry_weights = self._get_chemistry_weights(attributes['chemistry'])
-        matrix.append(chemistry_weights)
-        
-        # Critère 4: Age - Obsolescence technologique
-        age_weights = self._get_age_weights(attributes['age_years'])
-        matrix.append(age_weights)
-        
-        # Critère 5: Energy Throughput - Stress cumulé
-        throughput_weights = self._get_throughput_weights(attributes['energy_throughput'])
-        matrix.append(throughput_weights)
-        
-        # Critère 6: Capacity Fade - Dégradation rapide
-        fade_weights = self._get_capacity_fade_weights(attributes['capacity_fade'])
-        matrix.append(fade_weights)
-        
-        # Critère 7: Design for Disassembly - Circularité
-        design_weights = self._get_design_weights(attributes['design_disassembly'])
-        matrix.append(design_weights)
-        
-        # Critère 8: Manufacturer Intent - Repurpose/Remanufacture potential
-        intent_weights = self._get_intent_weights(attributes['repurpose_potential'])
-        matrix.append(intent_weights)
-        
-        # Critère 9: Battery Model - Marché cible
-        model_weights = self._get_model_weights(attributes['battery_model'])
-        matrix.append(model_weights)
-        
-        # Critère 10: Battery Status
-        status_weights = self._get_status_weights(attributes['battery_status'])
-        matrix.append(status_weights)
-        
-        # Critère 11: Internal Resistance
-        resistance_weights = self._get_resistance_weights(attributes['internal_resistance'])
-        matrix.append(resistance_weights)
-        
-        return np.array(matrix)
-
-    # ========== FONCTIONS DE PONDÉRATION PAR CRITÈRE ==========
-    
-    def _get_soh_weights(self, soh):
-        """Pondération basée sur le State of Health."""
-        if soh >= self.rules.MIN_SOH_FOR_REUSE:
-            return [soh * 0.6, soh * 0.3, soh * 0.1, 0]
-        elif soh >= self.rules.MIN_SOH_FOR_REMANUFACTURE:
-            return [soh * 0.2, soh * 0.5, soh * 0.2, 10]
-        elif soh >= self.rules.MIN_SOH_FOR_REPURPOSE:
-            return [0, soh * 0.2, soh * 0.4, 20]
-        else:
-            return [0, 0, 0, 50]
-    
-    def _get_soc_weights(self, soc):
-        """Pondération basée sur le State of Charge."""
-        if soc is None:
-            return [0, 0, 0, 0]
-        if soc < self.rules.MIN_SOC_FOR_SAFE_HANDLING or soc > self.rules.MAX_SOC_FOR_SAFE_HANDLING:
-            return [0, 0, 0, 10]  # Manipulation dangereuse → recycle
-        return [0, 0, 0, 0]
-    
-    def _get_chemistry_weights(self, chemistry):
-        """Pondération basée sur la chimie de la batterie."""
-        weights = self.rules.CHEMISTRY_WEIGHTS.get(chemistry, {})
-        return [
-            weights.get('Reuse', 0),
-            weights.get('Remanufacture', 0),
-            weights.get('Repurpose', 0),
-            weights.get('Recycle', 0)
-        ]
-    
-    def _get_age_weights(self, age_years):
-        """Pondération basée sur l'âge de la batterie."""
-        if age_years is None:
-            return [0, 0, 0, 0]
-        if age_years <= self.rules.MAX_AGE_FOR_REUSE_YEARS:
-            return [10, 5, 0, 0]
-        elif age_years <= self.rules.MAX_AGE_FOR_REMANUFACTURE_YEARS:
-            return [0, 10, 5, 0]
-        else:
-            return [0, 0, 0, 10]
-    
-    def _get_throughput_weights(self, throughput):
-        """Pondération basée sur l'énergie totale délivrée."""
-        if throughput > self.rules.HIGH_THROUGHPUT_THRESHOLD:
-            return [-5, 5, 5, 5]  # Usage intensif
-        return [0, 0, 0, 0]
-    
-    def _get_capacity_fade_weights(self, fade):
-        """Pondération basée sur la dégradation de capacité."""
-        if fade is None:
-            return [0, 0, 0, 0]
-        if fade > self.rules.MAX_CAPACITY_FADE_FOR_REUSE:
-            return [-20, -10, 10, 15]
-        elif fade > self.rules.MAX_CAPACITY_FADE_FOR_REMANUFACTURE:
-            return [0, -15, 10, 10]
-        return [0, 0, 0, 0]
-    
-    def _get_design_weights(self, design):
-        """Pondération basée sur le design modulaire."""
-        if design is None:
-            return [0, 0, 0, 0]
-        
-        if isinstance(design, bool) and design:
-            modularity_score = 10
-        elif isinstance(design, str):
-            modularity_score = {"high": 10, "medium": 5, "low": 0}.get(design.lower(), 0)
-        else:
-            modularity_score = 0
-        
-        remanuf_weight = modularity_score * (self.rules.WEIGHT_DESIGN_DISASSEMBLY_REMANUFACTURE / 10)
-        recycle_weight = modularity_score * (self.rules.WEIGHT_DESIGN_DISASSEMBLY_RECYCLE / 10)
-        return [0, remanuf_weight, 0, recycle_weight]
-    
-    def _get_intent_weights(self, intent):
-        """Pondération basée sur l'intention du fabricant."""
-        if intent is None:
-            return [0, 0, 0, 0]
-        
-        weights = [0, 0, 0, 0]
-        if isinstance(intent, str):
-            if 'repurpose' in intent.lower():
-                weights[2] = self.rules.WEIGHT_MANUFACTURER_INTENT_REPURPOSE
-            if 'remanufacture' in intent.lower() or 'remanufacturing' in intent.lower():
-                weights[1] = self.rules.WEIGHT_MANUFACTURER_INTENT_REMANUFACTURE
-        return weights
-    
-    def _get_model_weights(self, model):
-        """Pondération basée sur le modèle de batterie."""
-        for category, weights in self.rules.MODEL_CATEGORIES.items():
-            if category in model:
-                return [
-                    weights.get('Reuse', 0),
-                    weights.get('Remanufacture', 0),
-                    weights.get('Repurpose', 0),
-                    weights.get('Recycle', 0)
-                ]
-        return [0, 0, 0, 0]
-    
-    def _get_status_weights(self, status):
-        """Pondération basée sur le statut de la batterie."""
-        weights = self.rules.STATUS_WEIGHTS.get(status, {})
-        return [
-            weights.get('Reuse', 0),
-            weights.get('Remanufacture', 0),
-            weights.get('Repurpose', 0),
-            weights.get('Recycle', 0)
-        ]
-    
-    def _get_resistance_weights(self, resistance):
-        """Pondération basée sur la résistance interne."""
-        if resistance is None:
-            return [0, 0, 0, 0]
-        if resistance < self.rules.MAX_RESISTANCE_FOR_REUSE:
-            return [30, 10, 0, 0]
-        return [0, 0, 0, 0]
+        return (compiled or self.compiled).matrix(attributes)
 
     # ========== CALCUL ET AJUSTEMENTS ==========
     
+    @metrics.timed('engine_stage_seconds', 'calculate_scores')
     def _calculate_scores(self, matrix, attributes):
         """Calcule les scores finaux en sommant les pondérations."""
         # Score de base pour le recyclage
@@ -301,6 +310,7 @@ class DecisionEngine:
             "Recycle": max(0, final_scores[3])
         }
     
+    @metrics.timed('engine_stage_seconds', 'market_weights')
     def _apply_market_weights(self, scores, market):
         """Applique les pondérations du marché."""
         return {
@@ -310,6 +320,146 @@ class DecisionEngine:
             "Recycle": scores["Recycle"] * market.get('weight_recycle', 1.0)
         }
 
+    # ========== VERSION VECTORISÉE (evaluate_batch) ==========
+    
+    def _attributes_to_columns(self, attributes, compiled):
+        """
+        Convertit une liste de dicts d'attributs en colonnes NumPy.
+        Les valeurs optionnelles (None) sont remplacées par 0 et accompagnées d'un masque.
+        Chimie, statut, modèle et intention sont convertis en index des tables compilées.
+        """
+        def numeric(key):
+            return np.array([a[key] for a in attributes], dtype=float)
+        
+        def optional(key):
+            known = np.array([a[key] is not None for a in attributes], dtype=bool)
+            values = np.array([a[key] if a[key] is not None else 0 for a in attributes], dtype=float)
+            return values, known
+        
+        def index(values):
+            return np.fromiter(values, dtype=np.intp, count=len(attributes))
+        
+        soc, soc_known = optional('soc')
+        age, age_known = optional('age_years')
+        fade, fade_known = optional('capacity_fade')
+        resistance, resistance_known = optional('internal_resistance')
+        
+        return {
+            'soh': numeric('soh'),
+            'soc': soc,
+            'soc_known': soc_known,
+            'chemistry': index(compiled.chemistry_index.get(a['chemistry'], -1) for a in attributes),
+            'age_years': age,
+            'age_known': age_known,
+            'energy_throughput': numeric('energy_throughput'),
+            'capacity_fade': fade,
+            'fade_known': fade_known,
+            'modularity': np.array([
+                compiled.modularity(a['design_disassembly']) if a['design_disassembly'] is not None else 0
+                for a in attributes
+            ], dtype=float),
+            'intent': index(
+                compiled.intent_mask(a['repurpose_potential']) if isinstance(a['repurpose_potential'], str) else 0
+                for a in attributes
+            ),
+            'battery_model': index(compiled.model_index(a['battery_model']) for a in attributes),
+            'battery_status': index(compiled.status_index.get(a['battery_status'], -1) for a in attributes),
+            'internal_resistance': resistance,
+            'resistance_known': resistance_known
+        }
+    
+    def _build_ponderation_tensor(self, columns, compiled):
+        """
+        Construit le tenseur de pondération [N x 11 x 4], équivalent à
+        _build_ponderation_matrix appliqué à chaque batterie.
+        """
+        n = len(columns['soh'])
+        tensor = np.zeros((n, 11, 4))
+        
+        # Critère 1: SOH (bandes parcourues dans l'ordre, plancher = recyclage)
+        soh = columns['soh']
+        unbanded = np.ones(n, dtype=bool)
+        for threshold, weighted, coefs, consts in compiled.soh_bands:
+            band = unbanded & (soh >= threshold)
+            tensor[band, 0] = consts
+            for column, coef in zip(weighted, coefs):
+                tensor[band, 0, column] = soh[band] * coef
+            unbanded &= ~band
+        tensor[unbanded, 0] = SOH_FLOOR_ROW
+        
+        # Critère 2: SOC
+        soc = columns['soc']
+        low, high = compiled.soc_range
+        unsafe = columns['soc_known'] & ((soc < low) | (soc > high))
+        tensor[unsafe, 1] = UNSAFE_SOC_ROW
+        
+        # Critère 3: Chemistry
+        tensor[:, 2] = compiled.chemistry_table[columns['chemistry']]
+        
+        # Critère 4: Age
+        age = columns['age_years']
+        known = columns['age_known']
+        reuse_age, remanufacture_age = compiled.age_thresholds
+        recent = known & (age <= reuse_age)
+        mid = known & ~recent & (age <= remanufacture_age)
+        old = known & ~recent & ~mid
+        tensor[recent, 3] = AGE_ROWS[0]
+        tensor[mid, 3] = AGE_ROWS[1]
+        tensor[old, 3] = AGE_ROWS[2]
+        
+        # Critère 5: Energy Throughput
+        intensive = columns['energy_throughput'] > compiled.throughput_threshold
+        tensor[intensive, 4] = HIGH_THROUGHPUT_ROW
+        
+        # Critère 6: Capacity Fade
+        fade = columns['capacity_fade']
+        known = columns['fade_known']
+        reuse_fade, remanufacture_fade = compiled.fade_thresholds
+        fast = known & (fade > reuse_fade)
+        moderate = known & ~fast & (fade > remanufacture_fade)
+        tensor[fast, 5] = FADE_ROWS[0]
+        tensor[moderate, 5] = FADE_ROWS[1]
+        
+        # Critère 7: Design for Disassembly
+        modularity = columns['modularity']
+        remanufacture, recycle = compiled.design_coefficients
+        tensor[:, 6, 1] = modularity * remanufacture
+        tensor[:, 6, 3] = modularity * recycle
+        
+        # Critère 8: Manufacturer Intent (table indexée par masque de mots-clés)
+        tensor[:, 7] = compiled.intent_table[columns['intent']]
+        
+        # Critère 9: Battery Model (première catégorie trouvée, dans l'ordre des règles)
+        tensor[:, 8] = compiled.model_table[columns['battery_model']]
+        
+        # Critère 10: Battery Status
+        tensor[:, 9] = compiled.status_table[columns['battery_status']]
+        
+        # Critère 11: Internal Resistance
+        low_resistance = columns['resistance_known'] & \
+                         (columns['internal_resistance'] < compiled.resistance_threshold)
+        tensor[low_resistance, 10] = LOW_RESISTANCE_ROW
+        
+        return tensor
+    
+    def _calculate_scores_batch(self, tensor):
+        """Équivalent vectorisé de _calculate_scores : somme par option puis plancher à 0."""
+        base_scores = np.array([0, 0, 0, 20])
+        final_scores = base_scores + np.sum(tensor, axis=1)
+        return np.where(final_scores > 0, final_scores, 0.0)
+    
+    def _market_weight_matrix(self, markets):
+        """Matrice [N x 4] des coefficients marché (1.0 par défaut)."""
+        return np.array([
+            [
+                market.get('weight_reuse', 1.0),
+                market.get('weight_remanufacture', 1.0),
+                market.get('weight_repurpose', 1.0),
+                market.get('weight_recycle', 1.0)
+            ]
+            for market in markets
+        ], dtype=float)
+
     # ========== UTILITAIRES ==========
     
     def _calculate_age(self, market_date_str):
@@ -335,12 +485,14 @@ class DecisionEngine:
         ]
         return " | ".join([p for p in reason_parts if p])
     
-    def _build_result(self, rec, reason, scores):
-        """Construit le résultat final."""
+    def _build_result(self, rec, reason, scores, compiled):
+        """Construit le résultat final (avec la version des règles qui l'ont produit)."""
         return {
             "recommendation": rec,
             "reason": reason,
-            "scores": {k: float(round(v, 1)) for k, v in scores.items()}
+            "scores": {k: float(round(v, 1)) for k, v in scores.items()},
+            "rules_version": compiled.version,
+            "rule_set": compiled.rule_set
         }
     
     def export_matrix(self, digital_twin):
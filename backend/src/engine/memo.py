@@ -0,0 +1,99 @@
+# src/engine/memo.py
+import hashlib
+
+from ..cache import LRUCache
+
+
+def rules_version(rules):
+    """Empreinte du contenu de BusinessRules (change dès qu'un seuil ou un poids change)."""
+    constants = sorted(
+        (name, repr(getattr(rules, name)))
+        for name in dir(rules) if name.isupper()
+    )
+    return hashlib.sha256(repr(constants).encode("utf-8")).hexdigest()[:12]
+
+
+class DecisionMemo:
+    """
+    Mémoïsation des scores de DecisionEngine par empreinte canonique des attributs.
+    
+    L'empreinte ne garde de chaque attribut que ce qui influence les scores :
+    valeur brute pour le SOH (pondération continue), catégorie de seuil pour
+    l'âge, le SOC, la résistance et le capacity fade. L'âge calculé avec
+    datetime.now() ne rend donc pas chaque clé unique, et un hit donne
+    exactement les scores qu'aurait produits la matrice.
+    """
+
+    def __init__(self, max_entries=4096):
+        self._cache = LRUCache(max_entries=max_entries)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def put(self, key, scores):
+        self._cache.put(key, scores)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+    @staticmethod
+    def fingerprint(compiled, attributes, market):
+        """Clé canonique (tuple hashable) d'une évaluation avec les règles compilées `compiled`."""
+        soc = attributes['soc']
+        if soc is None:
+            soc_bucket = None
+        else:
+            low, high = compiled.soc_range
+            soc_bucket = soc < low or soc > high
+        
+        age = attributes['age_years']
+        reuse_age, remanufacture_age = compiled.age_thresholds
+        if age is None:
+            age_bucket = None
+        elif age <= reuse_age:
+            age_bucket = 0
+        elif age <= remanufacture_age:
+            age_bucket = 1
+        else:
+            age_bucket = 2
+        
+        fade = attributes['capacity_fade']
+        reuse_fade, remanufacture_fade = compiled.fade_thresholds
+        if fade is None:
+            fade_bucket = None
+        elif fade > reuse_fade:
+            fade_bucket = 2
+        elif fade > remanufacture_fade:
+            fade_bucket = 1
+        else:
+            fade_bucket = 0
+        
+        design = attributes['design_disassembly']
+        intent = attributes['repurpose_potential']
+        # Même masque de mots-clés que la matrice : deux intentions ne partagent une
+        # clé que si elles sélectionnent la même ligne de poids
+        intent_bucket = compiled.intent_mask(intent) if isinstance(intent, str) else None
+        
+        resistance = attributes['internal_resistance']
+        
+        return (
+            compiled.version,
+            attributes['soh'],
+            soc_bucket,
+            attributes['chemistry'],
+            age_bucket,
+            attributes['energy_throughput'] > compiled.throughput_threshold,
+            fade_bucket,
+            None if design is None else compiled.modularity(design),
+            intent_bucket,
+            compiled.model_category(attributes['battery_model']),
+            attributes['battery_status'],
+            None if resistance is None else resistance < compiled.resistance_threshold,
+            market.get('weight_reuse', 1.0),
+            market.get('weight_remanufacture', 1.0),
+            market.get('weight_repurpose', 1.0),
+            market.get('weight_recycle', 1.0)
+        )
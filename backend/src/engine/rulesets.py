@@ -0,0 +1,75 @@
+# src/engine/rulesets.py
+import copy
+import json
+import numbers
+
+from .compiled import CompiledRules
+from .rules import BusinessRules
+
+DEFAULT_RULE_SET_ID = "default"
+
+
+def _parse_object(text):
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid rule set JSON: {e}") from e
+    if not isinstance(payload, dict):
+        raise ValueError("A rule set must be a JSON object")
+    return payload
+
+
+class RuleSet:
+    """
+    Jeu de règles versionné : un identifiant et des surcharges de constantes de BusinessRules.
+
+    Une surcharge remplace la constante entière (un dict comme CHEMISTRY_WEIGHTS
+    est remplacé, pas fusionné). Les constantes absentes gardent la valeur de
+    BusinessRules. Sans surcharge, c'est le jeu de règles par défaut du code.
+    Un RuleSet ne contient que des données JSON : il se transmet tel quel aux
+    processus de re-scoring.
+    """
+
+    def __init__(self, rule_set_id=DEFAULT_RULE_SET_ID, overrides=None):
+        self.id = rule_set_id
+        self.overrides = copy.deepcopy(dict(overrides or {}))
+        self._validate()
+
+    @classmethod
+    def from_json(cls, text, default_id=DEFAULT_RULE_SET_ID):
+        """RuleSet depuis un document JSON {"id": ..., "rules": {CONSTANTE: valeur}}."""
+        payload = _parse_object(text)
+        rules = payload.get("rules", {})
+        if not isinstance(rules, dict):
+            raise ValueError('A rule set must be a JSON object {"id": ..., "rules": {...}}')
+        return cls(payload.get("id") or default_id, rules)
+
+    @classmethod
+    def from_rules_json(cls, rule_set_id, text):
+        """RuleSet depuis les seules surcharges {CONSTANTE: valeur} en JSON (nœud :RuleSet)."""
+        return cls(rule_set_id, _parse_object(text or "{}"))
+
+    def _validate(self):
+        """Refuse les constantes inconnues et les valeurs d'un autre type que celle par défaut."""
+        for name, value in self.overrides.items():
+            if not name.isupper() or not hasattr(BusinessRules, name):
+                raise ValueError(f"Unknown business rule: {name}")
+            default = getattr(BusinessRules, name)
+            if isinstance(default, bool):
+                valid = isinstance(value, bool)
+            elif isinstance(default, numbers.Real):
+                valid = isinstance(value, numbers.Real) and not isinstance(value, bool)
+            else:
+                valid = isinstance(value, type(default))
+            if not valid:
+                raise ValueError(f"{name} must be a {type(default).__name__}, got {type(value).__name__}")
+
+    def build(self):
+        """Instance de règles : sous-classe de BusinessRules portant les surcharges."""
+        if not self.overrides:
+            return BusinessRules()
+        rules_class = type("BusinessRules", (BusinessRules,), copy.deepcopy(self.overrides))
+        return rules_class()
+
+    def compile(self):
+        return CompiledRules(self.build(), rule_set=self.id)
@@ -0,0 +1,220 @@
+# src/engine/sweep.py
+import itertools
+import numbers
+
+import numpy as np
+
+from .compiled import (
+    AGE_ROWS, FADE_ROWS, HIGH_THROUGHPUT_ROW, INTENT_KEYWORDS, LOW_RESISTANCE_ROW, OPTIONS,
+    SOH_BANDS, SOH_FLOOR_ROW, UNSAFE_SOC_ROW
+)
+from .decision import DecisionEngine
+
+# Constantes scalaires qu'une variante peut faire varier
+SWEEPABLE = (
+    "MIN_SOH_FOR_REUSE", "MIN_SOH_FOR_REMANUFACTURE", "MIN_SOH_FOR_REPURPOSE",
+    "MIN_SOC_FOR_SAFE_HANDLING", "MAX_SOC_FOR_SAFE_HANDLING",
+    "MAX_AGE_FOR_REUSE_YEARS", "MAX_AGE_FOR_REMANUFACTURE_YEARS",
+    "HIGH_THROUGHPUT_THRESHOLD",
+    "MAX_CAPACITY_FADE_FOR_REUSE", "MAX_CAPACITY_FADE_FOR_REMANUFACTURE",
+    "WEIGHT_DESIGN_DISASSEMBLY_REMANUFACTURE", "WEIGHT_DESIGN_DISASSEMBLY_RECYCLE",
+    "WEIGHT_MANUFACTURER_INTENT_REPURPOSE", "WEIGHT_MANUFACTURER_INTENT_REMANUFACTURE",
+    "MAX_RESISTANCE_FOR_REUSE",
+)
+
+KILL_SWITCH_SCORES = (0, 0, 0, 100)
+
+
+class RuleSweep:
+    """
+    Scénarios « what-if » : distribution des recommandations de la flotte pour
+    chaque point d'une grille de constantes de BusinessRules, en une passe.
+
+    La grille {CONSTANTE: [valeurs]} est développée en produit cartésien de V
+    variantes. Les attributs de chaque lot de jumeaux sont extraits une seule
+    fois (comme evaluate_batch), puis le tenseur de pondération [V x N x 11 x 4]
+    est calculé par diffusion : les seuils variables sont des colonnes [V x 1]
+    comparées aux attributs [N]. Les critères qui ne dépendent d'aucune
+    constante de la grille sont calculés une fois et diffusés.
+
+    Pour chaque variante, les scores sont identiques à ceux de evaluate_batch
+    avec les règles de base surchargées par la variante. Seules les compteurs
+    et sommes sont conservés : add() peut être appelé page par page.
+    """
+
+    def __init__(self, grid, compiled=None, max_cells=2_000_000):
+        self.engine = DecisionEngine(compiled=compiled)
+        self.compiled = self.engine.compiled
+        self.names = tuple(grid)
+        for name in self.names:
+            if name not in SWEEPABLE:
+                raise ValueError(f"{name} cannot be swept (scalar thresholds and weights only)")
+            values = list(grid[name])
+            if not values or not all(isinstance(v, numbers.Real) and not isinstance(v, bool) for v in values):
+                raise ValueError(f"{name} needs a non-empty list of numbers")
+        self.variants = [dict(zip(self.names, point)) for point in itertools.product(*grid.values())]
+        self.max_cells = max_cells
+        # Paramètre -> colonne [V x 1] des valeurs de chaque variante
+        self._params = {
+            name: np.array([[variant[name]] for variant in self.variants], dtype=float)
+            for name in self.names
+        }
+        v = len(self.variants)
+        self.total = 0
+        self.counts = np.zeros((v, 4), dtype=np.int64)
+        self.score_sums = np.zeros((v, 4))
+        self.best_sums = np.zeros(v)
+        self.changed = np.zeros(v, dtype=np.int64)
+        self.transitions = np.zeros((v, 4, 4), dtype=np.int64)
+
+    def _param(self, name):
+        """Valeur de la constante : colonne [V x 1] si elle varie, scalaire des règles de base sinon."""
+        if name in self._params:
+            return self._params[name]
+        return getattr(self.compiled.rules, name)
+
+    def add(self, digital_twins):
+        """Ajoute un lot de jumeaux numériques (diagnosis, passport, market) aux statistiques."""
+        engine = self.engine
+        twins = list(digital_twins)
+        safe = [
+            twin for twin in twins
+            if not engine._is_kill_switch(twin.get('diagnosis', {}), twin.get('passport', {}))
+        ]
+        # Kill switch : recyclage direct quelle que soit la variante
+        killed = len(twins) - len(safe)
+        self.counts[:, 3] += killed
+        self.transitions[:, 3, 3] += killed
+        self.score_sums += killed * np.array(KILL_SWITCH_SCORES, dtype=float)
+        self.best_sums += killed * KILL_SWITCH_SCORES[3]
+
+        chunk = max(1, self.max_cells // (len(self.variants) * 44))
+        for start in range(0, len(safe), chunk):
+            part = safe[start:start + chunk]
+            attributes = [
+                engine._extract_attributes(twin.get('diagnosis', {}), twin.get('passport', {}))
+                for twin in part
+            ]
+            columns = engine._attributes_to_columns(attributes, self.compiled)
+            market = engine._market_weight_matrix([twin.get('market', {}) for twin in part])
+            baseline = engine._calculate_scores_batch(engine._build_ponderation_tensor(columns, self.compiled))
+            scores = self._calculate_scores(self._build_tensor(columns)) * market
+            self._accumulate(scores, np.argmax(baseline * market, axis=1))
+        self.total += len(twins)
+        return self
+
+    def _accumulate(self, scores, baseline_best):
+        """scores [V x N x 4], baseline_best [N] : recommandation avec les règles de base."""
+        best = np.argmax(scores, axis=2)
+        v = np.arange(len(self.variants))[:, None]
+        np.add.at(self.counts, (v, best), 1)
+        np.add.at(self.transitions, (v, baseline_best[None, :], best), 1)
+        self.score_sums += scores.sum(axis=1)
+        self.best_sums += np.take_along_axis(scores, best[:, :, None], axis=2)[:, :, 0].sum(axis=1)
+        self.changed += (best != baseline_best[None, :]).sum(axis=1)
+
+    def _calculate_scores(self, tensor):
+        """_calculate_scores_batch sur [V x N x 11 x 4] : même somme, même plancher."""
+        final_scores = np.array([0, 0, 0, 20]) + np.sum(tensor, axis=2)
+        return np.where(final_scores > 0, final_scores, 0.0)
+
+    def _build_tensor(self, columns):
+        """
+        Tenseur [V x N x 11 x 4], équivalent de _build_ponderation_tensor pour
+        chaque variante. Les masques sont [V x N] dès qu'un seuil varie.
+        """
+        compiled = self.compiled
+        v = len(self.variants)
+        n = len(columns['soh'])
+        tensor = np.zeros((v, n, 11, 4))
+        shape = (v, n)
+
+        def fill(mask, criterion, row):
+            tensor[np.broadcast_to(mask, shape), criterion] = row
+
+        # Critère 1: SOH (la première bande atteinte, plancher = recyclage)
+        soh = columns['soh']
+        unbanded = np.ones(shape, dtype=bool)
+        for name, coefs, consts in SOH_BANDS:
+            band = unbanded & (soh >= self._param(name))
+            row = np.broadcast_to(np.array(consts, dtype=float), (n, 4)).copy()
+            for column, coef in enumerate(coefs):
+                if coef is not None:
+                    row[:, column] = soh * coef
+            tensor[:, :, 0] = np.where(band[:, :, None], row, tensor[:, :, 0])
+            unbanded &= ~band
+        fill(unbanded, 0, SOH_FLOOR_ROW)
+
+        # Critère 2: SOC
+        soc = columns['soc']
+        low = self._param("MIN_SOC_FOR_SAFE_HANDLING")
+        high = self._param("MAX_SOC_FOR_SAFE_HANDLING")
+        fill(columns['soc_known'] & ((soc < low) | (soc > high)), 1, UNSAFE_SOC_ROW)
+
+        # Critères 3, 9, 10: tables des règles de base, communes à toutes les variantes
+        tensor[:, :, 2] = compiled.chemistry_table[columns['chemistry']]
+        tensor[:, :, 8] = compiled.model_table[columns['battery_model']]
+        tensor[:, :, 9] = compiled.status_table[columns['battery_status']]
+
+        # Critère 4: Age
+        age = columns['age_years']
+        known = columns['age_known']
+        recent = known & (age <= self._param("MAX_AGE_FOR_REUSE_YEARS"))
+        mid = known & ~recent & (age <= self._param("MAX_AGE_FOR_REMANUFACTURE_YEARS"))
+        fill(recent, 3, AGE_ROWS[0])
+        fill(mid, 3, AGE_ROWS[1])
+        fill(known & ~recent & ~mid, 3, AGE_ROWS[2])
+
+        # Critère 5: Energy Throughput
+        fill(columns['energy_throughput'] > self._param("HIGH_THROUGHPUT_THRESHOLD"), 4, HIGH_THROUGHPUT_ROW)
+
+        # Critère 6: Capacity Fade
+        fade = columns['capacity_fade']
+        known = columns['fade_known']
+        fast = known & (fade > self._param("MAX_CAPACITY_FADE_FOR_REUSE"))
+        moderate = known & ~fast & (fade > self._param("MAX_CAPACITY_FADE_FOR_REMANUFACTURE"))
+        fill(fast, 5, FADE_ROWS[0])
+        fill(moderate, 5, FADE_ROWS[1])
+
+        # Critère 7: Design for Disassembly (mêmes coefficients que CompiledRules)
+        modularity = columns['modularity']
+        tensor[:, :, 6, 1] = modularity * (self._param("WEIGHT_DESIGN_DISASSEMBLY_REMANUFACTURE") / 10)
+        tensor[:, :, 6, 3] = modularity * (self._param("WEIGHT_DESIGN_DISASSEMBLY_RECYCLE") / 10)
+
+        # Critère 8: Manufacturer Intent (une colonne prend le poids si l'un de ses mots-clés apparaît)
+        intent = columns['intent']
+        for column in sorted({column for _, column, _ in INTENT_KEYWORDS}):
+            bits = sum(1 << i for i, (_, c, _) in enumerate(INTENT_KEYWORDS) if c == column)
+            name = next(name for _, c, name in INTENT_KEYWORDS if c == column)
+            found = (intent & bits) != 0
+            tensor[:, :, 7, column] = np.where(found, self._param(name), 0)
+
+        # Critère 11: Internal Resistance
+        fill(columns['resistance_known'] &
+             (columns['internal_resistance'] < self._param("MAX_RESISTANCE_FOR_REUSE")), 10, LOW_RESISTANCE_ROW)
+
+        return tensor
+
+    def table(self):
+        """
+        Une ligne par variante : paramètres, nombre de batteries par recommandation,
+        nombre de recommandations différentes des règles de base (et transitions),
+        score moyen de l'option retenue et score moyen par option.
+        """
+        total = max(self.total, 1)
+        rows = []
+        for i, variant in enumerate(self.variants):
+            transitions = {
+                f"{OPTIONS[a]}->{OPTIONS[b]}": int(self.transitions[i, a, b])
+                for a in range(4) for b in range(4)
+                if a != b and self.transitions[i, a, b]
+            }
+            rows.append({
+                "variant": variant,
+                "counts": dict(zip(OPTIONS, (int(c) for c in self.counts[i]))),
+                "changed": int(self.changed[i]),
+                "transitions": transitions,
+                "mean_best_score": float(self.best_sums[i] / total),
+                "mean_scores": dict(zip(OPTIONS, (float(s / total) for s in self.score_sums[i]))),
+            })
+        return rows
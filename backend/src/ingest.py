@@ -0,0 +1,244 @@
+"""
+Streaming bulk ingest of garagist battery measurements.
+
+The request body is consumed line by line (NDJSON or CSV with a header row,
+one record per line), every record is validated on its own, and valid rows
+are flushed to the repository in fixed-size chunks. Only the current chunk,
+one line of at most MAX_LINE_BYTES and a bounded list of rejection details
+are ever held in memory, so a multi-gigabyte upload costs the same as a
+small one.
+"""
+
+import csv
+import json
+import math
+
+FIELDS = ('battery_id', 'voltage', 'capacity', 'temperature')
+NUMERIC_FIELDS = FIELDS[1:]
+
+# Rejections beyond this count are tallied but their details are dropped
+MAX_REPORTED_ERRORS = 100
+
+# Longest accepted input line; longer lines are rejected without being buffered
+MAX_LINE_BYTES = 64 * 1024
+
+
+class RecordError(ValueError):
+    """A single input line that cannot be ingested."""
+
+
+def validate_record(record):
+    """
+    Normalize one parsed record into a repository row.
+
+    Raises:
+        RecordError: when a field is missing or not a finite number
+    """
+    if not isinstance(record, dict):
+        raise RecordError('Record must be an object')
+    battery_id = record.get('battery_id')
+    if battery_id is None or not str(battery_id).strip():
+        raise RecordError('battery_id is required')
+    row = {'battery_id': str(battery_id).strip()}
+    for field in NUMERIC_FIELDS:
+        value = record.get(field)
+        if value is None or value == '' or isinstance(value, bool):
+            raise RecordError(f'{field} is required')
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise RecordError(f'{field} must be a number')
+        if not math.isfinite(number):
+            raise RecordError(f'{field} must be a finite number')
+        row[field] = number
+    return row
+
+
+def read_lines(stream, max_length=MAX_LINE_BYTES):
+    """
+    Yield the lines of a binary stream, reading at most `max_length` bytes of each.
+
+    A longer line is consumed up to its newline without being kept and
+    yielded as a RecordError, so it still counts as one input line.
+    """
+    while True:
+        line = stream.readline(max_length + 1)
+        if not line:
+            return
+        if len(line.rstrip(b'\r\n')) <= max_length:
+            yield line
+            continue
+        while not line.endswith(b'\n'):
+            line = stream.readline(max_length)
+            if not line:
+                break
+        yield RecordError(f'Line longer than {max_length} bytes')
+
+
+def _decode(line):
+    return line.decode('utf-8', errors='replace') if isinstance(line, bytes) else line
+
+
+class LineParser:
+    """Turn raw lines into records one at a time (CSV: the first non-blank line is the header)."""
+
+    def __init__(self, fmt='ndjson'):
+        self.fmt = fmt
+        self.line_number = 0
+        self.fieldnames = None
+
+    def parse(self, line):
+        """Return a record dict, a RecordError, or None for blank and header lines."""
+        self.line_number += 1
+        if isinstance(line, RecordError):
+            return line
+        line = _decode(line)
+        if self.fmt != 'csv':
+            if not line.strip():
+                return None
+            try:
+                return json.loads(line)
+            except ValueError as e:
+                return RecordError(f'Invalid JSON: {e.msg}')
+        values = next(csv.reader([line]), [])
+        if not any(value.strip() for value in values):
+            return None
+        if self.fieldnames is None:
+            self.fieldnames = [name.strip() for name in values]
+            return None
+        if len(values) > len(self.fieldnames):
+            return RecordError('Too many columns')
+        return dict(zip(self.fieldnames, values))
+
+
+class BulkIngest:
+    """
+    Validation and chunking state of one upload, independent of how lines
+    arrive and how chunks are written (shared by the sync and async servers).
+    """
+
+    def __init__(self, fmt='ndjson', chunk_size=500):
+        self.parser = LineParser(fmt)
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.chunk_lines = []
+        self.summary = {'accepted': 0, 'rejected': 0, 'chunks': 0, 'last_line': 0, 'errors': []}
+
+    def feed(self, line):
+        """Consume one line; returns a full chunk to write, or None."""
+        record = self.parser.parse(line)
+        if record is None:
+            return None
+        try:
+            if isinstance(record, RecordError):
+                raise record
+            self.chunk.append(validate_record(record))
+            self.chunk_lines.append(self.parser.line_number)
+        except RecordError as e:
+            self.summary['rejected'] += 1
+            if len(self.summary['errors']) < MAX_REPORTED_ERRORS:
+                self.summary['errors'].append({'line': self.parser.line_number, 'error': str(e)})
+            return None
+        return self.chunk if len(self.chunk) >= self.chunk_size else None
+
+    def finish(self):
+        """Last partial chunk to write, or None."""
+        return self.chunk or None
+
+    def written(self):
+        """The chunk returned by feed/finish was written."""
+        self.summary['accepted'] += len(self.chunk)
+        self.summary['chunks'] += 1
+        self.summary['last_line'] = self.chunk_lines[-1]
+        self.chunk, self.chunk_lines = [], []
+
+    def failed(self, error):
+        """The chunk write failed: record where ingestion stopped."""
+        self.summary['error'] = str(error)
+        self.summary['failed_line'] = self.chunk_lines[0]
+
+
+def ingest_stream(lines, repo, fmt='ndjson', chunk_size=500):
+    """
+    Validate and write a stream of measurement lines in chunks.
+
+    Args:
+        lines: Iterable of str/bytes lines (e.g. the raw request stream)
+        repo: Repository exposing create_battery_records(rows)
+        fmt: 'ndjson' or 'csv'
+        chunk_size: Rows per UNWIND write
+
+    Returns:
+        Dict {accepted, rejected, chunks, last_line, errors: [{line, error}]}.
+        `accepted` counts rows written and `last_line` is the input line of the
+        last one. If a chunk write fails, ingestion stops there and the summary
+        also holds `error` and `failed_line` (first line of the failed chunk):
+        the upload can be resumed after `last_line`.
+    """
+    ingest = BulkIngest(fmt, chunk_size)
+    for line in lines:
+        chunk = ingest.feed(line)
+        if chunk and not _write(ingest, repo, chunk):
+            return ingest.summary
+    chunk = ingest.finish()
+    if chunk:
+        _write(ingest, repo, chunk)
+    return ingest.summary
+
+
+def _write(ingest, repo, chunk):
+    try:
+        repo.create_battery_records(chunk)
+    except Exception as e:
+        ingest.failed(e)
+        return False
+    ingest.written()
+    return True
+
+
+async def ingest_stream_async(body, repo, fmt='ndjson', chunk_size=500, max_length=MAX_LINE_BYTES):
+    """ingest_stream for an async iterable of body chunks and an AsyncBatteryRepository."""
+    ingest = BulkIngest(fmt, chunk_size)
+    async for line in _aiter_lines(body, max_length):
+        chunk = ingest.feed(line)
+        if chunk and not await _write_async(ingest, repo, chunk):
+            return ingest.summary
+    chunk = ingest.finish()
+    if chunk:
+        await _write_async(ingest, repo, chunk)
+    return ingest.summary
+
+
+async def _write_async(ingest, repo, chunk):
+    try:
+        await repo.create_battery_records(chunk)
+    except Exception as e:
+        ingest.failed(e)
+        return False
+    ingest.written()
+    return True
+
+
+async def _aiter_lines(body, max_length=MAX_LINE_BYTES):
+    """
+    Re-split arbitrary byte chunks into lines, with the same cap as read_lines:
+    the tail of an over-long line is dropped as it arrives.
+    """
+    pending = b''
+    overlong = False
+    async for data in body:
+        pending += data
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if overlong or len(line.rstrip(b'\r')) > max_length:
+                overlong = False
+                yield RecordError(f'Line longer than {max_length} bytes')
+            else:
+                yield line
+        if len(pending) > max_length:
+            pending = b''
+            overlong = True
+    if overlong or len(pending) > max_length:
+        yield RecordError(f'Line longer than {max_length} bytes')
+    elif pending:
+        yield pending
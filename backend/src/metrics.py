@@ -0,0 +1,222 @@
+"""
+Low-overhead, in-process metrics with a Prometheus text exposition.
+
+Engine stages and repository queries are timed through the `timed` decorator
+or the `timer` context manager; when metrics are disabled both only check a
+boolean. Values are per process (each Gunicorn worker exposes its own).
+"""
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le=bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+def _labels(names, values, le=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.engine_stage_seconds = Histogram(
+            "engine_stage_seconds", "DecisionEngine stage duration in seconds", ["stage"]
+        )
+        self.repository_query_seconds = Histogram(
+            "repository_query_seconds", "Named repository query duration in seconds", ["query"]
+        )
+        self.neo4j_pool_wait_seconds = Histogram(
+            "neo4j_pool_wait_seconds",
+            "Time from transaction request to transaction function start (pooled connection + BEGIN)",
+            ["access_mode"]
+        )
+        self.http_requests_total = Counter(
+            "http_requests_total", "HTTP requests by route, method and status", ["route", "method", "status"]
+        )
+        self.http_request_seconds = Histogram(
+            "http_request_seconds", "HTTP request duration in seconds", ["route", "method"]
+        )
+        self.engine_batch_fallbacks_total = Counter(
+            "engine_batch_fallbacks_total", "Vectorized batch evaluations that failed and were re-scored per twin", []
+        )
+
+    def render(self):
+        lines = []
+        for metric in (self.http_requests_total, self.http_request_seconds, self.engine_stage_seconds,
+                       self.repository_query_seconds, self.neo4j_pool_wait_seconds,
+                       self.engine_batch_fallbacks_total):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def timed(self, histogram_name, label):
+        """Decorator observing the duration of each call under `label` (coroutine functions included)."""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        getattr(self, histogram_name).observe((label,), time.perf_counter() - start)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    getattr(self, histogram_name).observe((label,), time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @contextlib.contextmanager
+    def timer(self, histogram_name, label):
+        """Context manager observing the duration of its block under `label`."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            getattr(self, histogram_name).observe((label,), time.perf_counter() - start)
+
+    def instrument_session(self, session):
+        """Wrap a driver session to observe pool wait time of managed transactions."""
+        if not self.enabled:
+            return session
+        return _InstrumentedSession(session, self)
+
+    def instrument_async_session(self, session):
+        """Async counterpart of instrument_session (neo4j.AsyncSession)."""
+        if not self.enabled:
+            return session
+        return _InstrumentedAsyncSession(session, self)
+
+
+class _InstrumentedSession:
+    def __init__(self, session, registry):
+        self._session = session
+        self._registry = registry
+
+    def __enter__(self):
+        self._session.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._session.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def execute_read(self, work, *args, **kwargs):
+        return self._session.execute_read(self._measured(work, "read"), *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return self._session.execute_write(self._measured(work, "write"), *args, **kwargs)
+
+    def _measured(self, work, access_mode):
+        requested_at = time.perf_counter()
+        observed = []
+
+        def measured_work(tx, *args, **kwargs):
+            if not observed:  # first attempt only, retries are not pool waits
+                observed.append(True)
+                self._registry.neo4j_pool_wait_seconds.observe((access_mode,), time.perf_counter() - requested_at)
+            return work(tx, *args, **kwargs)
+        return measured_work
+
+
+class _InstrumentedAsyncSession(_InstrumentedSession):
+    async def __aenter__(self):
+        await self._session.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._session.__aexit__(*exc)
+
+    async def execute_read(self, work, *args, **kwargs):
+        return await self._session.execute_read(self._measured_async(work, "read"), *args, **kwargs)
+
+    async def execute_write(self, work, *args, **kwargs):
+        return await self._session.execute_write(self._measured_async(work, "write"), *args, **kwargs)
+
+    def _measured_async(self, work, access_mode):
+        measured = self._measured(work, access_mode)
+
+        async def measured_work(tx, *args, **kwargs):
+            return await measured(tx, *args, **kwargs)
+        return measured_work
+
+
+# Process-wide registry (toggled with METRICS_ENABLED in app.py)
+metrics = MetricsRegistry()
@@ -0,0 +1,331 @@
+"""
+Fleet-wide re-scoring job: store a fresh Decision for every battery.
+
+Usage (from backend/):
+    python -m src.rescore --market MKT_STD_2024 --workers 8
+    python -m src.rescore --market MKT_STD_2024 --restart    # ignore the checkpoint
+    python -m src.rescore --market MKT_STD_2024 --incremental
+
+Batteries are paged by keyset on Battery.id (no SKIP), each page is scored
+across a process pool with DecisionEngine.evaluate_batch while the next page
+is being read, and its decisions are written in one UNWIND transaction.
+After every committed page the last battery ID is saved to a checkpoint
+file, so an interrupted run resumes after the last written page. A page
+committed just before a crash is scored again on resume (at-least-once):
+those batteries simply get one more, identical, Decision.
+
+--incremental only re-scores batteries whose engine inputs changed since the
+start of the last completed run (its watermark, taken from the Neo4j clock):
+a passport or diagnosis written through the repository (Battery.inputs_updated_at)
+or a current SortingDiagnosis dated after the watermark. The job falls back to
+a full run when there is no watermark yet, or when the BusinessRules or the
+MarketConfig changed since it was taken.
+
+A battery the engine cannot score does not stop the run: when a batch
+raises, its batteries are scored one by one, and the IDs that still fail
+are listed in the checkpoint and in the summary.
+
+Batteries are scored with the rule set the API uses: RULES_FILE (or --rules)
+when set, otherwise the active :RuleSet node, otherwise the BusinessRules
+defaults. Its version is recorded on every Decision.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from .database.connection import close_driver, get_driver
+from .database.markets import MarketRegistry
+from .database.repository import BatteryRepository
+from .database.rulesets import RuleSetRegistry
+from .engine.decision import DecisionEngine
+from .engine.rulesets import RuleSet
+
+DEFAULT_PAGE_SIZE = 1000
+
+_worker_engine = None
+
+
+def _init_worker(rule_set):
+    global _worker_engine
+    _worker_engine = DecisionEngine(compiled=rule_set.compile())
+
+
+def _score_chunk(digital_twins):
+    return _score_twins(_worker_engine, digital_twins)
+
+
+def _score_twins(engine, digital_twins):
+    """
+    evaluate_batch, or each twin alone if the batch raises.
+    Returns one result per twin, None where the twin cannot be scored.
+    """
+    try:
+        return engine.evaluate_batch(digital_twins)
+    except Exception:
+        pass
+    results = []
+    for twin in digital_twins:
+        try:
+            results.append(engine.evaluate_battery(twin))
+        except Exception:
+            results.append(None)
+    return results
+
+
+class Checkpoint:
+    """Progress of one re-scoring run, persisted as JSON (atomic replace)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, state):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+
+class _Scorer:
+    """Score pages in-process (workers=0) or split across a process pool."""
+
+    def __init__(self, workers, rule_set, compiled):
+        self.workers = workers
+        self.engine = DecisionEngine(compiled=compiled)
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(rule_set,)
+        ) if workers > 0 else None
+
+    def submit(self, digital_twins):
+        if self.pool is None:
+            return digital_twins
+        size = math.ceil(len(digital_twins) / self.workers)
+        return [
+            (chunk, self.pool.submit(_score_chunk, chunk))
+            for chunk in (digital_twins[i:i + size] for i in range(0, len(digital_twins), size))
+        ]
+
+    def collect(self, pending):
+        if self.pool is None:
+            return _score_twins(self.engine, pending)
+        results = []
+        for chunk, future in pending:
+            try:
+                results.extend(future.result())
+            except Exception:
+                # Lost worker (crash, unpicklable twin): score this chunk here instead
+                results.extend(_score_twins(self.engine, chunk))
+        return results
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def market_fingerprint(registry, market_config_id):
+    """Stable hash of one MarketConfig's properties (detects weight changes between runs)."""
+    payload = json.dumps(registry.get(market_config_id)["market"], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _incremental_since(previous, market_config_id, rules_version, fingerprint):
+    """(watermark datetime or None, reason) for an incremental run."""
+    watermark = previous.get("watermark") if previous else None
+    if not watermark or previous["market_id"] != market_config_id:
+        return None, "no watermark yet, scoring the whole fleet"
+    if watermark["rules_version"] != rules_version:
+        return None, "BusinessRules changed since the watermark, scoring the whole fleet"
+    if fingerprint is None or watermark["market_fingerprint"] != fingerprint:
+        return None, "MarketConfig changed since the watermark, scoring the whole fleet"
+    return datetime.fromisoformat(watermark["at"]), f"inputs changed since {watermark['at']}"
+
+
+def rescore_fleet(repo, market_config_id, workers=0, page_size=DEFAULT_PAGE_SIZE,
+                  checkpoint=None, restart=False, incremental=False, fingerprint=None, rule_set=None,
+                  report=print):
+    """
+    Re-score every battery for one market and save the decisions.
+
+    Args:
+        repo: BatteryRepository
+        market_config_id: MarketConfig to score against
+        workers: Scoring processes (0 = score in this process)
+        page_size: Batteries per read page / write transaction
+        checkpoint: Optional Checkpoint to resume from and update
+        restart: Ignore an unfinished checkpoint and start from the first battery
+        incremental: Only score batteries changed since the checkpoint's watermark
+        fingerprint: market_fingerprint() of the market, recorded with the watermark
+        rule_set: RuleSet to score with (default: the BusinessRules defaults)
+        report: Progress callback taking one line of text
+
+    Returns:
+        Dict {processed, pages, seconds, rate, resumed_from, since, failed}; `failed`
+        lists the IDs that could not be scored in this run and the run it resumes
+
+    Raises:
+        ValueError: the checkpoint belongs to another market or to other business rules
+    """
+    rule_set = rule_set or RuleSet()
+    compiled = rule_set.compile()
+    rules_version = compiled.version
+    previous = checkpoint.load() if checkpoint is not None else None
+    state = None
+    if previous and not previous.get("completed") and not restart:
+        if previous["market_id"] != market_config_id:
+            raise ValueError(f"Checkpoint is for market {previous['market_id']}; use --restart")
+        if previous["rules_version"] != rules_version:
+            raise ValueError("BusinessRules changed since the checkpoint was written; use --restart")
+        state = previous
+
+    resumed_from = state["last_id"] if state else None
+    if state is None:
+        since = None
+        # Kept until this run completes, so an interrupted run leaves the last watermark usable
+        watermark = previous.get("watermark") if previous and previous["market_id"] == market_config_id else None
+        if incremental:
+            since, reason = _incremental_since(previous, market_config_id, rules_version, fingerprint)
+            report(f"🔎 Incremental: {reason}")
+        state = {
+            "market_id": market_config_id,
+            "rules_version": rules_version,
+            "market_fingerprint": fingerprint,
+            "since": since.isoformat() if since else None,
+            # Taken before the first read: changes made during the run are picked up next time
+            "started_at": repo.get_database_time().isoformat(),
+            "watermark": watermark,
+            "last_id": "",
+            "processed": 0,
+            "failed": [],
+            "completed": False,
+        }
+    else:
+        report(f"↪️  Resuming after {resumed_from} ({state['processed']} batteries already done)")
+
+    since = datetime.fromisoformat(state["since"]) if state.get("since") else None
+
+    def fetch_page(after_id):
+        if since is None:
+            return repo.get_digital_twin_page(after_id, page_size, market_config_id)
+        return repo.get_changed_twin_page(since, after_id, page_size, market_config_id)
+
+    scorer = _Scorer(workers, rule_set, compiled)
+    started_at = time.perf_counter()
+    processed = pages = 0
+    try:
+        page = fetch_page(state["last_id"])
+        while page:
+            pending = scorer.submit(page)
+            # Read the next page while the current one is being scored
+            next_page = fetch_page(page[-1]["battery_id"])
+            results = scorer.collect(pending)
+            repo.save_decisions(
+                {twin["battery_id"]: result for twin, result in zip(page, results) if result is not None},
+                market_config_id
+            )
+            failed = [twin["battery_id"] for twin, result in zip(page, results) if result is None]
+            if failed:
+                report(f"⚠️  {len(failed)} batteries could not be scored: {', '.join(failed[:10])}")
+
+            processed += len(page)
+            pages += 1
+            state.update(last_id=page[-1]["battery_id"], processed=state["processed"] + len(page),
+                         failed=state["failed"] + failed)
+            if checkpoint is not None:
+                checkpoint.save(state)
+            elapsed = time.perf_counter() - started_at
+            report(f"  {state['processed']} batteries, {processed / elapsed:.0f}/s (last {state['last_id']})")
+            page = next_page
+    finally:
+        scorer.shutdown()
+
+    state["completed"] = True
+    state["watermark"] = {
+        "at": state["started_at"],
+        "rules_version": state["rules_version"],
+        "market_fingerprint": state.get("market_fingerprint"),
+    }
+    if checkpoint is not None:
+        checkpoint.save(state)
+    seconds = time.perf_counter() - started_at
+    return {
+        "processed": processed,
+        "pages": pages,
+        "seconds": seconds,
+        "rate": processed / seconds if seconds > 0 else 0.0,
+        "resumed_from": resumed_from,
+        "since": state.get("since"),
+        "failed": state["failed"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score every battery and store the new decisions")
+    parser.add_argument("--market", default="MKT_STD_2024", help="MarketConfig id (default: MKT_STD_2024)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Scoring processes, 0 scores in-process (default: CPU count)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Batteries per page and write transaction (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: .rescore-<market>.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an unfinished checkpoint")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-score batteries whose passport or diagnosis changed since the last completed run")
+    parser.add_argument("--rules", help="Rule set JSON file (default: RULES_FILE, else the active RuleSet node)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    database = os.getenv("NEO4J_DB_NAME") or "neo4j"
+    driver = get_driver()
+
+    try:
+        registry = MarketRegistry()
+        registry.refresh(driver, database)
+        if not registry.has(args.market):
+            print(f"❌ Market config not found: {args.market}")
+            return 2
+
+        try:
+            rule_set = RuleSetRegistry(None, path=args.rules or os.getenv("RULES_FILE") or None).load(driver, database)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
+        print(f"📐 Rule set {rule_set.id}")
+
+        repo = BatteryRepository(driver=driver, database_name=database)
+        checkpoint = Checkpoint(args.checkpoint or f".rescore-{args.market}.json")
+        try:
+            summary = rescore_fleet(
+                repo, args.market, workers=args.workers, page_size=args.page_size,
+                checkpoint=checkpoint, restart=args.restart, incremental=args.incremental,
+                fingerprint=market_fingerprint(registry, args.market), rule_set=rule_set
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
+        except KeyboardInterrupt:
+            print(f"⏸️  Interrupted - run the same command to resume from {checkpoint.path}")
+            return 130
+
+        print(f"✅ {summary['processed']} batteries re-scored for {args.market} "
+              f"in {summary['seconds']:.1f}s ({summary['rate']:.0f}/s, {summary['pages']} pages)")
+        if summary['failed']:
+            print(f"⚠️  {len(summary['failed'])} batteries could not be scored (listed in {checkpoint.path})")
+        return 0
+    finally:
+        close_driver()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+What-if sweep: recommendation distribution of the fleet for every point of a
+grid of BusinessRules variants, without writing any Decision.
+
+Usage (from backend/):
+    python -m src.sweep --market MKT_STD_2024 --vary MIN_SOH_FOR_REUSE=80:95:2.5
+    python -m src.sweep --vary MIN_SOH_FOR_REUSE=85,90 --vary MAX_RESISTANCE_FOR_REUSE=20:40:10
+    python -m src.sweep --snapshot fleet.json --vary MIN_SOH_FOR_REUSE=80:95:5 --json sweep.json
+
+Each --vary gives the values of one scalar constant (start:stop:step, stop
+included, or a comma-separated list); the grid is their cartesian product.
+The fleet snapshot is read once, page by page (keyset on Battery.id), or from
+a JSON file of digital twins; every page is scored for all variants at once
+(see src/engine/sweep.py). Variants override the rule set the API uses
+(--rules, else RULES_FILE, else the active :RuleSet node); "changed" counts
+batteries whose recommendation differs from that rule set.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from .database.connection import close_driver, get_driver
+from .database.markets import MarketRegistry
+from .database.repository import BatteryRepository
+from .database.rulesets import RuleSetRegistry
+from .engine.compiled import OPTIONS
+from .engine.sweep import RuleSweep
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def parse_vary(spec):
+    """'NAME=80:95:5' or 'NAME=85,90' -> (NAME, [values])."""
+    name, sep, values = spec.partition("=")
+    if not sep or not values:
+        raise ValueError(f"Expected NAME=start:stop:step or NAME=v1,v2: {spec}")
+    try:
+        if ":" in values:
+            start, stop, step = (float(v) for v in values.split(":"))
+            if step <= 0:
+                raise ValueError(f"Step must be positive: {spec}")
+            count = int(round((stop - start) / step)) + 1
+            return name.strip(), [round(start + i * step, 10) for i in range(max(count, 0))]
+        return name.strip(), [float(v) for v in values.split(",")]
+    except ValueError as e:
+        raise ValueError(f"Invalid values in {spec}: {e}") from e
+
+
+def sweep_fleet(sweep, pages, report=print):
+    """
+    Feed every page of digital twins into `sweep`.
+
+    Returns:
+        Dict {batteries, variants, seconds, rows}
+    """
+    started_at = time.perf_counter()
+    for page in pages:
+        sweep.add(page)
+        report(f"  {sweep.total} batteries x {len(sweep.variants)} variants")
+    return {
+        "batteries": sweep.total,
+        "variants": len(sweep.variants),
+        "seconds": time.perf_counter() - started_at,
+        "rows": sweep.table(),
+    }
+
+
+def graph_pages(repo, market_config_id, page_size=DEFAULT_PAGE_SIZE):
+    page = repo.get_digital_twin_page("", page_size, market_config_id)
+    while page:
+        yield page
+        page = repo.get_digital_twin_page(page[-1]["battery_id"], page_size, market_config_id)
+
+
+def snapshot_pages(path, page_size=DEFAULT_PAGE_SIZE):
+    with open(path) as f:
+        twins = json.load(f)
+    for i in range(0, len(twins), page_size):
+        yield twins[i:i + page_size]
+
+
+def print_table(summary):
+    names = list(summary["rows"][0]["variant"]) if summary["rows"] else []
+    header = names + list(OPTIONS) + ["changed", "mean best"]
+    widths = [max(len(h), 9) for h in header]
+    print("  ".join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in summary["rows"]:
+        cells = [f"{row['variant'][n]:g}" for n in names]
+        cells += [str(row["counts"][o]) for o in OPTIONS]
+        cells += [str(row["changed"]), f"{row['mean_best_score']:.1f}"]
+        print("  ".join(c.rjust(w) for c, w in zip(cells, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommendation distribution of the fleet for a grid of rule variants")
+    parser.add_argument("--vary", action="append", required=True, metavar="NAME=VALUES",
+                        help="Constant and its values: start:stop:step (stop included) or v1,v2,... (repeatable)")
+    parser.add_argument("--market", default="MKT_STD_2024", help="MarketConfig id (default: MKT_STD_2024)")
+    parser.add_argument("--snapshot", help="JSON file with a list of digital twins (default: read the graph)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Batteries per read page (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument("--rules", help="Base rule set JSON file (default: RULES_FILE, else the active RuleSet node)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the table as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        grid = dict(parse_vary(spec) for spec in args.vary)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    load_dotenv()
+    database = os.getenv("NEO4J_DB_NAME") or "neo4j"
+    rules_path = args.rules or os.getenv("RULES_FILE") or None
+    driver = None if args.snapshot and rules_path else get_driver()
+
+    try:
+        try:
+            rule_set = RuleSetRegistry(None, path=rules_path).load(driver, database)
+            sweep = RuleSweep(grid, compiled=rule_set.compile())
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
+        print(f"📐 Rule set {rule_set.id}, {len(sweep.variants)} variants")
+
+        if args.snapshot:
+            pages = snapshot_pages(args.snapshot, args.page_size)
+        else:
+            registry = MarketRegistry()
+            registry.refresh(driver, database)
+            if not registry.has(args.market):
+                print(f"❌ Market config not found: {args.market}")
+                return 2
+            repo = BatteryRepository(driver=driver, database_name=database)
+            pages = graph_pages(repo, args.market, args.page_size)
+
+        summary = sweep_fleet(sweep, pages)
+        print_table(summary)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(summary, f, indent=2)
+        print(f"✅ {summary['batteries']} batteries x {summary['variants']} variants in {summary['seconds']:.1f}s")
+        return 0
+    finally:
+        if driver is not None:
+            close_driver()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
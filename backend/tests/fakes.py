@@ -0,0 +1,116 @@
+"""In-memory stand-ins for the Neo4j driver, recording every query they run."""
+
+
+class FakeResult:
+    def __init__(self, records):
+        self._records = list(records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+    def consume(self):
+        return None
+
+
+class FakeTx:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        self.driver.queries.append((query, params))
+        return FakeResult(self.driver.respond(query, params))
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_read(self, work, *args, **kwargs):
+        self.driver.transactions.append('read')
+        return work(FakeTx(self.driver), *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        self.driver.transactions.append('write')
+        return work(FakeTx(self.driver), *args, **kwargs)
+
+    def run(self, query, parameters=None, **kwargs):
+        self.driver.transactions.append('auto')
+        return FakeTx(self.driver).run(query, parameters, **kwargs)
+
+
+class FakeDriver:
+    """`respond(query, params)` returns the records (dicts) of each query."""
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda query, params: [])
+        self.queries = []
+        self.transactions = []
+        self.closed = False
+
+    def session(self, database=None):
+        return FakeSession(self)
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncFakeResult(FakeResult):
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for record in self._records:
+            yield record
+
+    async def single(self):
+        return FakeResult.single(self)
+
+    async def consume(self):
+        return None
+
+
+class AsyncFakeTx(FakeTx):
+    async def run(self, query, parameters=None, **kwargs):
+        params = dict(parameters or {}, **kwargs)
+        self.driver.queries.append((query, params))
+        return AsyncFakeResult(self.driver.respond(query, params))
+
+
+class AsyncFakeSession(FakeSession):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_read(self, work, *args, **kwargs):
+        self.driver.transactions.append('read')
+        return await work(AsyncFakeTx(self.driver), *args, **kwargs)
+
+    async def execute_write(self, work, *args, **kwargs):
+        self.driver.transactions.append('write')
+        return await work(AsyncFakeTx(self.driver), *args, **kwargs)
+
+    async def run(self, query, parameters=None, **kwargs):
+        self.driver.transactions.append('auto')
+        return await AsyncFakeTx(self.driver).run(query, parameters, **kwargs)
+
+
+class AsyncFakeDriver(FakeDriver):
+    """Async counterpart of FakeDriver (neo4j.AsyncDriver sessions)."""
+
+    def session(self, database=None):
+        return AsyncFakeSession(self)
+
+    async def close(self):
+        self.closed = True
@@ -0,0 +1,183 @@
+"""ASGI serving mode: AsyncBatteryRepository and the async routes on AsyncFakeDriver."""
+import asyncio
+
+import pytest
+
+import asgi
+from src.database.async_repository import DECISION_WRITE_ATTEMPTS, AsyncBatteryRepository
+from src.database.cache import DigitalTwinCache
+from src.engine.decision import DecisionEngine
+from src.ingest import ingest_stream_async
+from tests.fakes import AsyncFakeDriver
+from tests.test_evaluate_batch import make_twin
+from tests.test_twin_cache import GraphDriver
+
+
+class AsyncGraphDriver(AsyncFakeDriver):
+    """GraphDriver semantics (decision written only for the latest diagnosis) on async sessions."""
+
+    def __init__(self, twin):
+        graph = GraphDriver(twin)
+        super().__init__(graph._respond)
+        self.graph = graph
+
+    def reads(self):
+        return sum('AS digital_twin' in query for query, _ in self.queries)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_async_decision_is_written_against_the_diagnosis_that_was_read():
+    driver = AsyncGraphDriver(make_twin())
+    repo = AsyncBatteryRepository(driver, cache=DigitalTwinCache())
+
+    result = run(repo.evaluate_and_save_decision('BAT_1', DecisionEngine(), 'MKT_1'))
+
+    assert result['scores']
+    assert driver.transactions == ['read', 'write']
+    _, params = driver.queries[-1]
+    assert params['diagnosis_ref'] == '4:db:1'
+
+
+def test_async_stale_cached_twin_is_reread_and_rescored():
+    driver = AsyncGraphDriver(make_twin())
+    repo = AsyncBatteryRepository(driver, cache=DigitalTwinCache())
+    run(repo.evaluate_and_save_decision('BAT_1', DecisionEngine(), 'MKT_1'))
+    # A new diagnosis arrives through another worker: this worker's cache is stale
+    driver.graph.latest_ref = '4:db:2'
+
+    result = run(repo.evaluate_and_save_decision('BAT_1', DecisionEngine(), 'MKT_1'))
+
+    assert result['scores']
+    assert driver.reads() == 2
+    writes = [params['diagnosis_ref'] for query, params in driver.queries if 'CREATE (dec:Decision' in query]
+    assert writes == ['4:db:1', '4:db:1', '4:db:2']
+    assert repo.cache.twins.get('BAT_1')['diagnosis_ref'] == '4:db:2'
+
+
+def test_async_decision_gives_up_when_no_write_matches():
+    driver = AsyncGraphDriver(make_twin())
+    driver.graph.latest_ref = None
+    driver.respond = lambda query, params: (
+        [] if 'CREATE (dec:Decision' in query else driver.graph._respond(query, params)
+    )
+    repo = AsyncBatteryRepository(driver)
+
+    with pytest.raises(Exception, match='Database error'):
+        run(repo.evaluate_and_save_decision('BAT_1', DecisionEngine(), 'MKT_1'))
+    assert driver.reads() == DECISION_WRITE_ATTEMPTS
+
+
+def test_async_bulk_write_splits_repeated_ids_into_rounds():
+    driver = AsyncFakeDriver(lambda query, params: [{'written': len(params['rows']), 'owner_statuses': []}])
+    repo = AsyncBatteryRepository(driver)
+    rows = [
+        {'battery_id': 'BAT_1', 'voltage': 3.6, 'capacity': 50, 'temperature': 20},
+        {'battery_id': 'BAT_1', 'voltage': 3.5, 'capacity': 49, 'temperature': 21},
+    ]
+
+    assert run(repo.create_battery_records(rows)) == 2
+    assert driver.transactions == ['write']
+    assert [[row['voltage'] for row in params['rows']] for _, params in driver.queries] == [[3.6], [3.5]]
+
+
+async def body(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class Recorder:
+    def __init__(self, fail_on_call=None):
+        self.chunks = []
+        self.fail_on_call = fail_on_call
+
+    async def create_battery_records(self, rows):
+        if len(self.chunks) + 1 == self.fail_on_call:
+            raise Exception("Database error: unavailable")
+        self.chunks.append([row['battery_id'] for row in rows])
+        return len(rows)
+
+
+def line(battery_id):
+    return b'{"battery_id": "%s", "voltage": 3.6, "capacity": 50, "temperature": 20}\n' % battery_id.encode()
+
+
+def test_async_ingest_resplits_arbitrary_body_chunks_into_lines():
+    repo = Recorder()
+    data = line('BAT_1') + b'\n' + line('BAT_2')
+
+    summary = run(ingest_stream_async(body(data[:30], data[30:100], data[100:]), repo, chunk_size=10))
+
+    assert repo.chunks == [['BAT_1', 'BAT_2']]
+    assert summary['accepted'] == 2 and summary['last_line'] == 3
+    assert summary['rejected'] == 0
+
+
+def test_async_ingest_drops_overlong_lines_as_they_arrive():
+    repo = Recorder()
+    overlong = (b'y' * 50, b'y' * 50, b'y' * 50 + b'\n')
+
+    summary = run(ingest_stream_async(body(line('BAT_1'), *overlong, line('BAT_2'), b'z' * 90), repo, max_length=80))
+
+    assert repo.chunks == [['BAT_1', 'BAT_2']]
+    assert summary['errors'] == [
+        {'line': 2, 'error': 'Line longer than 80 bytes'},
+        {'line': 4, 'error': 'Line longer than 80 bytes'},
+    ]
+
+
+def test_async_ingest_stops_at_a_failed_chunk_with_a_resume_point():
+    repo = Recorder(fail_on_call=2)
+    data = b''.join(line(f'BAT_{i}') for i in range(5))
+
+    summary = run(ingest_stream_async(body(data), repo, chunk_size=2))
+
+    assert repo.chunks == [['BAT_0', 'BAT_1']]
+    assert summary['accepted'] == 2 and summary['last_line'] == 2
+    assert summary['failed_line'] == 3
+    assert summary['error'] == 'Database error: unavailable'
+
+
+class AsyncRepository:
+    def __init__(self, twins):
+        self.twins = twins
+        self.saved = None
+
+    async def get_digital_twins(self, battery_ids, market_config_id):
+        return {battery_id: self.twins[battery_id] for battery_id in battery_ids if battery_id in self.twins}
+
+    async def save_decisions(self, decisions, market_config_id):
+        self.saved = dict(decisions)
+        return {battery_id: 'DEC_' + battery_id for battery_id in decisions}
+
+
+def test_async_batch_route_isolates_a_twin_the_engine_cannot_score(monkeypatch):
+    repo = AsyncRepository({
+        'BAT_1': make_twin(battery_id='BAT_1'),
+        'BAT_BAD': make_twin(battery_id='BAT_BAD', passport={'chemistry': 42}),
+    })
+    monkeypatch.setattr(asgi, 'get_repository', lambda: repo)
+
+    async def known_market(market_id):
+        return True
+    monkeypatch.setattr(asgi, 'is_known_market', known_market)
+
+    async def installed_rules():
+        pass
+    monkeypatch.setattr(asgi, 'ensure_rules', installed_rules)
+
+    async def post():
+        client = asgi.app.test_client()
+        response = await client.post('/recycler/evaluate/batch', json={'ids': ['BAT_1', 'BAT_BAD', 'BAT_X']})
+        return response.status_code, await response.get_json()
+
+    status, body_json = run(post())
+
+    assert status == 200
+    assert [result['id'] for result in body_json['results']] == ['BAT_1']
+    assert body_json['errors'][0] == {'id': 'BAT_X', 'error': 'Battery not found'}
+    assert body_json['errors'][1]['id'] == 'BAT_BAD'
+    assert body_json['errors'][1]['error'].startswith('Evaluation failed')
+    assert set(repo.saved) == {'BAT_1'}
@@ -0,0 +1,54 @@
+"""Benchmark suite: seeded generator, regression check and a tiny end-to-end run."""
+import json
+
+import app as app_module
+from benchmarks import run
+from benchmarks.twins import MARKETS, generate_fleet
+from src.engine.decision import DecisionEngine
+from src.engine.rules import BusinessRules
+
+
+def test_fleet_is_reproducible_and_covers_every_category():
+    fleet = generate_fleet(400, seed=7)
+
+    assert fleet == generate_fleet(400, seed=7)
+    assert fleet != generate_fleet(400, seed=8)
+    chemistries = {twin['passport'].get('chemistry') for twin in fleet}
+    statuses = {twin['passport']['battery_status'] for twin in fleet}
+    assert set(BusinessRules.CHEMISTRY_WEIGHTS) <= chemistries
+    assert set(BusinessRules.STATUS_WEIGHTS) <= statuses
+    assert {twin['market']['id'] for twin in fleet} == set(MARKETS)
+    assert any(twin['passport']['critical_defects'] or twin['diagnosis']['history_of_abuse'] for twin in fleet)
+
+
+def test_batched_engine_matches_single_evaluation_on_the_fleet():
+    fleet = generate_fleet(300, seed=3)
+    engine = DecisionEngine()
+
+    assert engine.evaluate_batch(fleet) == [engine.evaluate_battery(twin) for twin in fleet]
+
+
+def test_compare_flags_cases_slower_than_the_tolerance():
+    baseline = {'results': [{'name': 'a', 'ops_per_sec': 100.0}, {'name': 'b', 'ops_per_sec': 100.0}]}
+    results = [{'name': 'a', 'ops_per_sec': 85.0}, {'name': 'b', 'ops_per_sec': 95.0}, {'name': 'c', 'ops_per_sec': 1.0}]
+
+    assert [case['name'] for case in run.compare(results, baseline, 0.10)] == ['a']
+    assert results[1]['vs_baseline'] == 0.95
+
+
+def test_small_run_saves_a_baseline_it_can_compare_to(tmp_path, monkeypatch):
+    # api_cases swaps app globals for the in-memory stand-in: restore them afterwards
+    monkeypatch.setattr(app_module, 'get_repository', app_module.get_repository)
+    monkeypatch.setattr(app_module, 'is_known_market', app_module.is_known_market)
+    monkeypatch.setattr(app_module, 'ensure_rules', app_module.ensure_rules)
+    baseline = tmp_path / 'baseline.json'
+
+    assert run.main(['--size', '40', '--batch-size', '10', '--save', str(baseline)]) == 0
+    saved = json.loads(baseline.read_text())
+    assert saved['meta']['size'] == 40
+    assert {case['name'] for case in saved['results']} >= {
+        'engine.evaluate_battery', 'engine.evaluate_batch[10]', 'POST /recycler/evaluate'
+    }
+    assert all(case['p50_us'] <= case['p99_us'] for case in saved['results'])
+    assert run.main(['--size', '40', '--batch-size', '10', '--skip-api',
+                     '--compare', str(baseline), '--tolerance', '1.0']) == 0
@@ -0,0 +1,140 @@
+"""Change bus and GET /battery/events/<id>: writes are pushed to the subscribers of their battery."""
+import asyncio
+import threading
+
+import pytest
+
+import app as app_module
+from src.database.cache import DigitalTwinCache
+from src.database.changes import EVICTED, ChangeBus
+from src.database.repository import BatteryRepository
+from src.engine.decision import DecisionEngine
+from tests.test_evaluate_batch import make_twin
+from tests.test_evaluate_markets import MarketsGraphDriver, registry
+from tests.test_owner_status import GraphDriver, status
+
+
+def drain(subscription):
+    events = []
+    while (change := subscription.get(0)) is not None:
+        events.append(change)
+    return events
+
+
+def test_subscribers_only_receive_their_battery():
+    bus = ChangeBus()
+    with bus.subscribe('BAT_1') as mine, bus.subscribe('BAT_2') as other:
+        bus.publish_many('status', [('BAT_1', {'v': 1}), ('BAT_3', {'v': 2})])
+
+        assert drain(mine) == [('status', {'v': 1})]
+        assert drain(other) == []
+    assert len(bus) == 0
+
+
+def test_a_full_queue_evicts_the_subscriber_instead_of_growing():
+    bus = ChangeBus(max_queue=2)
+    subscription = bus.subscribe('BAT_1')
+
+    for version in range(4):
+        bus.publish('status', 'BAT_1', {'version': version})
+
+    assert drain(subscription) == [(EVICTED, None)]
+    assert subscription.closed and len(bus) == 0
+    assert bus.stats()['evictions'] == 1
+
+
+def test_subscriptions_beyond_the_limit_are_refused():
+    bus = ChangeBus(max_subscribers=1)
+    bus.subscribe('BAT_1')
+
+    with pytest.raises(RuntimeError, match='Too many open subscriptions'):
+        bus.subscribe('BAT_2')
+
+
+def test_async_consumer_is_woken_by_a_write_from_another_thread():
+    bus = ChangeBus()
+    subscription = bus.subscribe('BAT_1')
+
+    async def consume():
+        threading.Timer(0.05, bus.publish, ('status', 'BAT_1', {'version': 2})).start()
+        return await subscription.get_async(timeout=5)
+
+    assert asyncio.run(consume()) == ('status', {'version': 2})
+
+
+def test_status_write_publishes_the_new_owner_status():
+    bus = ChangeBus()
+    repo = BatteryRepository(driver=GraphDriver({'BAT_1': status()}), changes=bus)
+    subscription = bus.subscribe('BAT_1')
+
+    repo.update_battery_status('BAT_1', 'waste')
+
+    ((event, data),) = drain(subscription)
+    assert event == 'status' and data['status'] == 'waste' and data['version'] == 2
+
+
+def test_only_decisions_actually_saved_are_published():
+    bus = ChangeBus()
+    driver = MarketsGraphDriver(make_twin())
+    repo = BatteryRepository(driver=driver, cache=DigitalTwinCache(), markets=registry(), changes=bus)
+    subscription = bus.subscribe('BAT_1')
+    repo.evaluate_markets('BAT_1', DecisionEngine())
+    # The cached diagnosis is superseded: the first write links nothing, the re-read one does
+    driver.latest_ref = '4:db:2'
+
+    results = repo.evaluate_markets('BAT_1', DecisionEngine(), save=True)
+
+    ((event, data),) = drain(subscription)
+    assert event == 'decision'
+    assert (data['market_id'], data['recommendation']) == (results[0]['market_id'], results[0]['recommendation'])
+
+
+class StatusRepository:
+    def __init__(self, version=3):
+        self.version = version
+
+    def get_battery_status_payload(self, battery_id):
+        if battery_id != 'BAT_1':
+            return None, None
+        return b'{"battery_id":"BAT_1","status":"original"}\n', self.version
+
+    def get_owner_status_version(self, battery_id):
+        return self.version
+
+
+@pytest.fixture
+def events(monkeypatch):
+    bus = ChangeBus(max_subscribers=1)
+    monkeypatch.setattr(app_module, 'change_bus', bus)
+    monkeypatch.setattr(app_module, 'get_repository', lambda: StatusRepository())
+    monkeypatch.setattr(app_module, 'write_buffer', None)
+    monkeypatch.setattr(app_module, 'EVENTS_STREAM_SECONDS', 0.2)
+    monkeypatch.setattr(app_module, 'EVENTS_HEARTBEAT_INTERVAL', 0.05)
+    return bus
+
+
+def test_stream_starts_with_the_current_status_then_pushes_writes(events):
+    threading.Timer(0.05, events.publish, ('decision', 'BAT_1', {'recommendation': 'Reuse'})).start()
+
+    body = app_module.app.test_client().get('/battery/events/BAT_1').get_data(as_text=True)
+
+    assert body.startswith('retry: 1000\n\n')
+    assert 'id: v3\nevent: status\ndata: {"battery_id":"BAT_1","status":"original"}\n\n' in body
+    assert 'event: decision\ndata: {"recommendation":"Reuse"}\n\n' in body
+    assert len(events) == 0
+
+
+def test_reconnect_with_the_current_event_id_skips_the_snapshot(events):
+    body = app_module.app.test_client().get(
+        '/battery/events/BAT_1', headers={'Last-Event-ID': 'v3'}
+    ).get_data(as_text=True)
+
+    assert 'event: status' not in body and ': keep-alive' in body
+
+
+def test_unknown_battery_and_full_bus(events):
+    client = app_module.app.test_client()
+
+    assert client.get('/battery/events/BAT_X').status_code == 404
+    events.subscribe('BAT_2')
+    assert client.get('/battery/events/BAT_1').status_code == 503
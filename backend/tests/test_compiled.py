@@ -0,0 +1,76 @@
+"""CompiledRules: precomputed weight tables, installed into the engine as one unit."""
+import pytest
+
+from src.engine.compiled import CompiledRules, KeywordMatcher
+from src.engine.decision import DecisionEngine
+from src.engine.memo import DecisionMemo
+from src.engine.rules import BusinessRules
+from tests.test_evaluate_batch import TWINS, make_twin
+
+
+class StrictRules(BusinessRules):
+    MIN_SOH_FOR_REUSE = 95
+
+
+@pytest.mark.parametrize('text', [
+    'remanufacturing line', 'repurpose and remanufacture', 'none', '', 'remanufacturrepurpose',
+])
+def test_keyword_mask_matches_substring_search(text):
+    patterns = ('repurpose', 'remanufacture', 'remanufacturing')
+    matcher = KeywordMatcher(patterns)
+
+    expected = sum(1 << i for i, pattern in enumerate(patterns) if pattern in text)
+    assert matcher.match(text) == expected
+    assert matcher.match(text) == expected  # memoized
+
+
+def test_model_category_is_the_first_matching_rule():
+    compiled = CompiledRules(BusinessRules())
+    categories = list(BusinessRules.MODEL_CATEGORIES)
+
+    for category in categories:
+        assert compiled.model_category('Brand ' + category + ' v2') == category
+    assert compiled.model_category('unknown model') is None
+
+
+def test_single_and_batch_evaluations_use_the_same_tables():
+    engine = DecisionEngine()
+
+    assert engine.evaluate_batch(TWINS) == [engine.evaluate_battery(twin) for twin in TWINS]
+
+
+def test_install_switches_rules_and_version_at_once():
+    engine = DecisionEngine()
+    twin = make_twin()
+    before = engine.evaluate_battery(twin)
+    version = engine.rules_version
+
+    engine.install(CompiledRules(StrictRules()))
+
+    assert isinstance(engine.rules, StrictRules)
+    assert engine.rules_version != version
+    assert engine.evaluate_battery(twin)['scores'] != before['scores']
+    assert engine.evaluate_battery(twin) == DecisionEngine(compiled=CompiledRules(StrictRules())).evaluate_battery(twin)
+
+
+def test_rules_are_not_reread_between_installs(monkeypatch):
+    engine = DecisionEngine()
+    twin = make_twin()
+    before = engine.evaluate_battery(twin)
+
+    # Only install() changes the tables: editing the rules object is not picked up
+    monkeypatch.setattr(engine.rules, 'MIN_SOH_FOR_REUSE', 99, raising=False)
+
+    assert engine.evaluate_battery(twin) == before
+
+
+def test_memo_entries_are_keyed_by_the_installed_rules():
+    engine = DecisionEngine(memo=DecisionMemo(max_entries=64))
+    twin = make_twin()
+    engine.evaluate_battery(twin)
+
+    engine.install(CompiledRules(StrictRules()))
+    strict = engine.evaluate_battery(twin)
+
+    assert engine.memo.stats()['hits'] == 0
+    assert strict == DecisionEngine(compiled=CompiledRules(StrictRules())).evaluate_battery(twin)
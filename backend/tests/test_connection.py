@@ -0,0 +1,70 @@
+import pytest
+
+from src.database import connection
+from src.database.repository import BatteryRepository
+
+
+class FakeDriver:
+    def __init__(self, uri, auth=None, **settings):
+        self.uri = uri
+        self.auth = auth
+        self.settings = settings
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_driver(monkeypatch):
+    created = []
+
+    def factory(uri, auth=None, **settings):
+        driver = FakeDriver(uri, auth=auth, **settings)
+        created.append(driver)
+        return driver
+
+    monkeypatch.setattr(connection.GraphDatabase, 'driver', factory)
+    connection._reset_after_fork()
+    yield created
+    connection._reset_after_fork()
+
+
+def test_get_driver_is_shared_per_process(fake_driver):
+    first = connection.get_driver('bolt://db:7687', 'neo4j', 'secret')
+    assert connection.get_driver() is first
+    assert len(fake_driver) == 1
+    assert first.auth == ('neo4j', 'secret')
+
+
+def test_pool_settings_come_from_environment(fake_driver, monkeypatch):
+    monkeypatch.setenv('NEO4J_MAX_POOL_SIZE', '7')
+    monkeypatch.setenv('NEO4J_ACQUISITION_TIMEOUT', '2.5')
+    monkeypatch.setenv('NEO4J_MAX_CONNECTION_LIFETIME', '')
+    driver = connection.get_driver('bolt://db:7687', 'neo4j', 'secret')
+    assert driver.settings == {
+        'max_connection_pool_size': 7,
+        'connection_acquisition_timeout': 2.5,
+        'max_connection_lifetime': connection.DEFAULT_MAX_CONNECTION_LIFETIME,
+    }
+
+
+def test_forked_child_builds_its_own_driver(fake_driver):
+    parent = connection.get_driver('bolt://db:7687', 'neo4j', 'secret')
+    connection._reset_after_fork()
+    child = connection.get_driver('bolt://db:7687', 'neo4j', 'secret')
+    assert child is not parent
+    assert not parent.closed
+
+
+def test_close_driver_closes_and_forgets(fake_driver):
+    driver = connection.get_driver('bolt://db:7687', 'neo4j', 'secret')
+    connection.close_driver()
+    assert driver.closed
+    assert connection.get_driver() is not driver
+
+
+def test_repository_never_closes_a_borrowed_driver(fake_driver):
+    shared = connection.get_driver('bolt://db:7687', 'neo4j', 'secret')
+    BatteryRepository(driver=shared).close()
+    assert not shared.closed
@@ -0,0 +1,27 @@
+"""DecisionEngine tolerates properties that are null in the graph."""
+from src.engine.decision import DecisionEngine
+
+
+def test_null_string_properties_fall_back_to_defaults():
+    twin = {
+        "passport": {
+            "battery_model": None,
+            "chemistry": None,
+            "battery_status": None,
+            "soh_percent": 85.0,
+            "total_energy_throughput_kwh": 0,
+        },
+        "diagnosis": {
+            "soh_percent": None,
+            "battery_status": None,
+            "known_defects": None,
+            "accidents": None,
+            "total_energy_throughput_kwh": None,
+        },
+        "market": {},
+    }
+    engine = DecisionEngine()
+
+    single = engine.evaluate_battery(twin)
+    assert engine.evaluate_batch([twin]) == [single]
+    assert set(single["scores"]) == {"Reuse", "Remanufacture", "Repurpose", "Recycle"}
@@ -0,0 +1,147 @@
+"""Embedded backend: the BatteryRepositoryProtocol contract without a Neo4j server."""
+import inspect
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.database.async_repository import AsyncBatteryRepository
+from src.database.changes import ChangeBus
+from src.database.embedded import EmbeddedBatteryRepository, EmbeddedStore
+from src.database.owner_status import OwnerStatusStore
+from src.database.protocol import BatteryRepositoryProtocol
+from src.database.repository import BatteryRepository
+from src.engine.decision import DecisionEngine
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import make_twin
+
+MARKETS = [
+    {'id': 'MKT_STD_2024', 'weight_reuse': 1.0, 'weight_remanufacture': 1.0,
+     'weight_repurpose': 1.0, 'weight_recycle': 1.0},
+    {'id': 'MKT_B', 'weight_reuse': 0.2, 'weight_remanufacture': 1.0,
+     'weight_repurpose': 1.0, 'weight_recycle': 3.0},
+]
+
+
+def battery(battery_id='BAT_1', **fields):
+    twin = make_twin()
+    return dict({
+        'id': battery_id, 'voltage': 3.7, 'capacity': 50, 'temperature': 25,
+        'passport': twin['passport'],
+        'diagnoses': [dict(twin['diagnosis'], date='2024-03-01T00:00:00+00:00')],
+    }, **fields)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'edge.json'
+    path.write_text(json.dumps({'markets': MARKETS, 'batteries': [battery('BAT_1'), battery('BAT_2')]}))
+    return str(path)
+
+
+@pytest.fixture
+def store(data_file):
+    return EmbeddedStore.open(data_file)
+
+
+def test_every_backend_implements_the_protocol(store):
+    assert isinstance(BatteryRepository(driver=FakeDriver()), BatteryRepositoryProtocol)
+    assert isinstance(EmbeddedBatteryRepository(store), BatteryRepositoryProtocol)
+    for name in vars(BatteryRepositoryProtocol):
+        if hasattr(AsyncBatteryRepository, name) and not name.startswith('_') and name != 'close':
+            assert inspect.iscoroutinefunction(getattr(AsyncBatteryRepository, name)), name
+
+
+def test_every_battery_write_bumps_the_version(store):
+    repo = EmbeddedBatteryRepository(store)
+    assert repo.get_battery_version('BAT_1') == 0
+
+    repo.update_battery_measurements('BAT_1', voltage=3.6)
+    repo.update_battery_measurements_batch({'BAT_1': {'capacity': 48}, 'BAT_X': {'capacity': 1}})
+    assert repo.update_battery_status('BAT_1', 'repaired') is True
+    # Neither payload exposes diagnoses nor decisions
+    repo.add_sorting_diagnosis('BAT_1', {'soh_percent': 80})
+    repo.evaluate_and_save_decision('BAT_1', DecisionEngine())
+
+    assert repo.get_battery_version('BAT_1') == 3
+    assert repo.get_all_battery_data('BAT_1')['version'] == 3
+    assert repo.get_battery_status('BAT_1') == {
+        'battery_id': 'BAT_1', 'status': 'repaired', 'voltage': 3.6, 'capacity': 48,
+        'soh_percent': 92.0, 'version': 3
+    }
+    assert repo.get_battery_version('BAT_X') is None and not repo.battery_exists('BAT_X')
+
+
+def test_the_latest_diagnosis_is_the_most_recent_date(store):
+    repo = EmbeddedBatteryRepository(store)
+
+    older = repo.add_sorting_diagnosis('BAT_1', {'soh_percent': 50, 'date': '2023-01-01T00:00:00+00:00'})
+    newer = repo.add_sorting_diagnosis('BAT_1', {'soh_percent': 70, 'date': '2025-01-01T00:00:00+00:00'})
+
+    assert older != newer
+    assert repo.get_digital_twin('BAT_1')['diagnosis']['soh_percent'] == 70
+    assert repo.add_sorting_diagnosis('BAT_X', {'soh_percent': 70}) is None
+
+
+def test_a_decision_is_never_linked_to_a_superseded_diagnosis(store):
+    repo = EmbeddedBatteryRepository(store)
+
+    class DiagnosedMeanwhile(DecisionEngine):
+        def evaluate_battery(self, twin):
+            if twin['diagnosis']['soh_percent'] != 60:
+                repo.add_sorting_diagnosis('BAT_1', {'soh_percent': 60})
+            return super().evaluate_battery(twin)
+
+    repo.evaluate_and_save_decision('BAT_1', DiagnosedMeanwhile())
+
+    (decision,) = store.decisions['BAT_1']
+    assert decision['diagnosis_ref'] == store.latest_diagnosis('BAT_1')['_ref']
+
+
+def test_markets_are_ranked_and_the_best_is_saved(store):
+    repo = EmbeddedBatteryRepository(store)
+
+    results = repo.evaluate_markets('BAT_1', DecisionEngine(), save=True)
+
+    assert {result['market_id'] for result in results} == {'MKT_STD_2024', 'MKT_B'}
+    (decision,) = store.decisions['BAT_1']
+    assert decision['market_id'] == results[0]['market_id']
+    assert repo.evaluate_markets('BAT_X', DecisionEngine()) is None
+
+
+def test_writes_feed_the_owner_status_store_and_the_change_bus(store, tmp_path):
+    owner_status = OwnerStatusStore(str(tmp_path / 'owner_status.db'))
+    bus = ChangeBus()
+    repo = EmbeddedBatteryRepository(store, owner_status=owner_status, changes=bus)
+    subscription = bus.subscribe('BAT_1')
+
+    repo.update_battery_status('BAT_1', 'waste')
+    repo.save_decision('BAT_1', DecisionEngine().evaluate_battery(repo.get_digital_twin('BAT_1')))
+
+    payload, version = owner_status.get('BAT_1')
+    assert json.loads(payload)['status'] == 'waste' and version == 1
+    assert [event for event, _ in (subscription.get(0), subscription.get(0))] == ['status', 'decision']
+    # Loaded from the file, never written: read through into the store on first lookup
+    assert owner_status.get_version('BAT_2') is None
+    assert repo.get_owner_status_version('BAT_2') == 0
+    assert repo.get_battery_status_payload('BAT_2') == owner_status.get('BAT_2')
+
+
+def test_save_and_load_round_trip(store, tmp_path):
+    repo = EmbeddedBatteryRepository(store)
+    repo.create_battery_record('BAT_3', 3.9, 60, 20)
+    repo.update_battery_status('BAT_1', 'repaired')
+    repo.add_sorting_diagnosis('BAT_1', {'soh_percent': 85})
+    repo.evaluate_and_save_decision('BAT_1', DecisionEngine())
+    since = datetime.now(timezone.utc) - timedelta(minutes=1)
+    path = str(tmp_path / 'saved.json')
+
+    store.save(path)
+    reloaded = EmbeddedBatteryRepository(EmbeddedStore.open(path))
+
+    for battery_id in ('BAT_1', 'BAT_2', 'BAT_3'):
+        assert reloaded.get_all_battery_data(battery_id) == repo.get_all_battery_data(battery_id)
+        assert reloaded.get_digital_twin(battery_id) == repo.get_digital_twin(battery_id)
+        assert reloaded.get_telemetry_blocks(battery_id) == repo.get_telemetry_blocks(battery_id)
+    assert reloaded.store.stats() == store.stats()
+    assert [twin['battery_id'] for twin in reloaded.get_changed_twin_page(since)] == ['BAT_1']
@@ -0,0 +1,105 @@
+"""ETag / If-None-Match on the battery read endpoints, answered from Battery.version."""
+import asyncio
+
+import pytest
+
+import app as app_module
+import asgi
+from src.database import repository
+
+VERSION_BUMP = 'b.version = coalesce(b.version, 0) + 1'
+
+
+class VersionedRepository:
+    """Counts full reads: a 304 must be answered from the version lookup alone."""
+
+    def __init__(self, version=3):
+        self.version = version
+        self.full_reads = 0
+
+    def get_battery_version(self, battery_id):
+        return self.version if battery_id == 'BAT_1' else None
+
+    def get_owner_status_version(self, battery_id):
+        return self.get_battery_version(battery_id)
+
+    def get_all_battery_data(self, battery_id):
+        self.full_reads += 1
+        return {'battery_id': 'BAT_1', 'voltage': 3.7, 'version': self.version} if battery_id == 'BAT_1' else None
+
+    def get_battery_status_payload(self, battery_id):
+        self.full_reads += 1
+        return (b'{"battery_id":"BAT_1"}\n', self.version) if battery_id == 'BAT_1' else (None, None)
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    repo = VersionedRepository()
+    monkeypatch.setattr(app_module, 'get_repository', lambda: repo)
+    monkeypatch.setattr(app_module, 'write_buffer', None)
+    monkeypatch.setattr(app_module, 'owner_status_store', None)
+    return repo
+
+
+@pytest.mark.parametrize('query', [
+    repository.CREATE_BATTERY_QUERY,
+    repository.CREATE_BATTERIES_BATCH_QUERY,
+    repository.UPDATE_MEASUREMENTS_QUERY,
+    repository.UPDATE_MEASUREMENTS_BATCH_QUERY,
+    repository.UPDATE_STATUS_QUERY,
+])
+def test_every_battery_write_bumps_the_version(query):
+    assert VERSION_BUMP in query
+
+
+@pytest.mark.parametrize('path', ['/garagist/battery/BAT_1', '/proprietaire/status/BAT_1'])
+def test_matching_etag_is_answered_304_without_the_full_read(repo, path):
+    client = app_module.app.test_client()
+
+    first = client.get(path)
+    assert first.status_code == 200 and first.headers['ETag'] == '"v3"'
+
+    again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.get_data() == b''
+    assert again.headers['ETag'] == '"v3"'
+    assert repo.full_reads == 1
+
+
+@pytest.mark.parametrize('path', ['/garagist/battery/BAT_1', '/proprietaire/status/BAT_1'])
+def test_changed_version_returns_the_new_body(repo, path):
+    client = app_module.app.test_client()
+    etag = client.get(path).headers['ETag']
+    repo.version = 4
+
+    response = client.get(path, headers={'If-None-Match': etag})
+
+    assert response.status_code == 200 and response.headers['ETag'] == '"v4"'
+    assert 'version' not in response.get_json()
+
+
+def test_unknown_battery_with_if_none_match_is_404(repo):
+    response = app_module.app.test_client().get('/garagist/battery/BAT_X', headers={'If-None-Match': '"v3"'})
+
+    assert response.status_code == 404
+
+
+def test_async_owner_status_answers_304_from_the_version(monkeypatch):
+    class AsyncVersionedRepository(VersionedRepository):
+        async def get_owner_status_version(self, battery_id):
+            return self.get_battery_version(battery_id)
+
+        async def get_battery_status_payload(self, battery_id):
+            return VersionedRepository.get_battery_status_payload(self, battery_id)
+
+    repo = AsyncVersionedRepository()
+    monkeypatch.setattr(asgi, 'get_repository', lambda: repo)
+    monkeypatch.setattr(app_module, 'write_buffer', None)
+    monkeypatch.setattr(app_module, 'owner_status_store', None)
+
+    async def get(headers):
+        response = await asgi.app.test_client().get('/proprietaire/status/BAT_1', headers=headers)
+        return response.status_code, response.headers.get('ETag')
+
+    assert asyncio.run(get({})) == (200, '"v3"')
+    assert asyncio.run(get({'If-None-Match': '"v3"'})) == (304, '"v3"')
+    assert repo.full_reads == 1
@@ -0,0 +1,37 @@
+"""Read, score and persist a decision in one write transaction."""
+from src.database.repository import BatteryRepository
+from src.engine.decision import DecisionEngine
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import make_twin
+
+
+def twin_driver(twin):
+    def respond(query, params):
+        if 'AS digital_twin' in query:
+            return [{'digital_twin': twin, 'diagnosis_ref': '4:db:7', 'market_ref': '4:db:9'}] if twin else []
+        return []
+    return FakeDriver(respond)
+
+
+def test_read_score_and_write_share_one_write_transaction():
+    twin = make_twin()
+    driver = twin_driver(twin)
+    engine = DecisionEngine()
+
+    result = BatteryRepository(driver=driver).evaluate_and_save_decision('BAT_1', engine, 'MKT_1')
+
+    assert result == engine.evaluate_battery(twin)
+    assert driver.transactions == ['write']
+    (read_query, _), (write_query, params) = driver.queries
+    assert 'CREATE (dec:Decision' in write_query
+    # The write reuses the nodes read, it does not re-match the latest diagnosis
+    assert 'UNDERWENT_DIAGNOSIS' not in write_query
+    assert params['diagnosis_ref'] == '4:db:7' and params['market_ref'] == '4:db:9'
+    assert params['recommendation'] == result['recommendation']
+
+
+def test_unknown_battery_writes_nothing():
+    driver = twin_driver(None)
+
+    assert BatteryRepository(driver=driver).evaluate_and_save_decision('BAT_X', DecisionEngine()) is None
+    assert len(driver.queries) == 1
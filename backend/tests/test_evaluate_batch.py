@@ -0,0 +1,66 @@
+from src.engine.decision import DecisionEngine
+
+
+def make_twin(**overrides):
+    passport = {
+        'soh_percent': 92.0,
+        'battery_model': 'Automotive X1',
+        'chemistry': 'NMC',
+        'date_placing_market': '2023-01-15',
+        'total_energy_throughput_kwh': 400,
+        'potentials_repurposing_remanufacturing': 'Suitable for repurpose',
+        'design_for_disassembly': 'modular',
+        'capacity_fade_percent_per_year': 1.5,
+        'battery_status': 'original',
+    }
+    diag = {
+        'soh_percent': 91.0,
+        'soc_percent': 50.0,
+        'internal_resistance_mOhm': 20,
+        'battery_status': 'original',
+    }
+    market = {'weight_reuse': 1.0, 'weight_remanufacture': 1.0,
+              'weight_repurpose': 1.0, 'weight_recycle': 1.0}
+    passport.update(overrides.pop('passport', {}))
+    diag.update(overrides.pop('diagnosis', {}))
+    market.update(overrides.pop('market', {}))
+    return {'battery_id': overrides.get('battery_id', 'BAT_1'),
+            'passport': passport, 'diagnosis': diag, 'market': market}
+
+
+TWINS = [
+    make_twin(),
+    make_twin(passport={'soh_percent': 55.0, 'chemistry': 'LFP',
+                        'battery_model': 'e-bike city', 'battery_status': 'waste'},
+              diagnosis={'soh_percent': 0, 'internal_resistance_mOhm': 45}),
+    make_twin(passport={'chemistry': 'LCO', 'date_placing_market': 'not-a-date',
+                        'total_energy_throughput_kwh': 2500,
+                        'potentials_repurposing_remanufacturing': 'remanufacture ready'},
+              diagnosis={'soc_percent': 90.0}),
+    make_twin(passport={'soh_percent': 70.0, 'chemistry': 'NCA',
+                        'battery_model': 'Industrial rack'},
+              diagnosis={'soh_percent': 70.0, 'soc_percent': None,
+                         'internal_resistance_mOhm': None},
+              market={'weight_repurpose': 1.5, 'weight_reuse': 0.5}),
+    make_twin(diagnosis={'critical_defects': True}),
+    make_twin(passport={'history_of_abuse': True}),
+]
+
+
+def test_evaluate_batch_matches_evaluate_battery():
+    engine = DecisionEngine()
+    assert engine.evaluate_batch(TWINS) == [engine.evaluate_battery(t) for t in TWINS]
+
+
+def test_evaluate_batch_applies_kill_switch_per_twin():
+    engine = DecisionEngine()
+    results = engine.evaluate_batch(TWINS)
+    assert [r['reason'] for r in results[-2:]] == ['CRITICAL_SAFETY_FAIL'] * 2
+    assert results[0]['reason'] != 'CRITICAL_SAFETY_FAIL'
+
+
+def test_evaluate_batch_only_kill_switch_and_empty():
+    engine = DecisionEngine()
+    assert engine.evaluate_batch([]) == []
+    results = engine.evaluate_batch(TWINS[-2:])
+    assert all(r['recommendation'] == 'Recycle' for r in results)
@@ -0,0 +1,109 @@
+"""Multi-market evaluation: one read, one scoring pass, the best market's Decision saved."""
+import asyncio
+
+import numpy as np
+
+from src.database.async_repository import AsyncBatteryRepository
+from src.database.cache import DigitalTwinCache
+from src.database.markets import MarketRegistry, MarketSnapshot
+from src.database.repository import BatteryRepository
+from src.engine.decision import DecisionEngine
+from tests.fakes import AsyncFakeDriver
+from tests.test_evaluate_batch import TWINS, make_twin
+from tests.test_markets import market_row, markets_driver
+from tests.test_twin_cache import GraphDriver
+
+ROWS = [
+    market_row('MKT_A', weight_reuse=0.2),
+    market_row('MKT_B', weight_recycle=3.0),
+    market_row('MKT_C'),
+]
+
+
+class MarketsGraphDriver(GraphDriver):
+    """GraphDriver whose twin reads also return every MarketConfig."""
+
+    def _respond(self, query, params):
+        records = super()._respond(query, params)
+        if 'AS digital_twin' in query:
+            return [dict(record, markets=ROWS) for record in records]
+        return records
+
+
+def decision_writes(driver):
+    return [params for query, params in driver.queries if 'CREATE (dec:Decision' in query]
+
+
+def registry():
+    markets = MarketRegistry()
+    markets.refresh(markets_driver(ROWS))
+    return markets
+
+
+def test_each_market_result_equals_evaluate_battery_with_its_weights():
+    engine = DecisionEngine()
+    snapshot = MarketSnapshot(ROWS, None)
+
+    for twin in TWINS:
+        results = engine.evaluate_markets(twin, list(snapshot.ids), snapshot.weights)
+        for result in results:
+            market = snapshot.properties[result['market_id']]
+            expected = engine.evaluate_battery(dict(twin, market=market))
+            assert {key: result[key] for key in expected} == expected
+        best = [result['scores'][result['recommendation']] for result in results]
+        assert best == sorted(best, reverse=True)
+
+
+def test_killed_battery_recycles_on_every_market():
+    twin = make_twin(diagnosis={'critical_defects': True})
+
+    results = DecisionEngine().evaluate_markets(twin, ['MKT_A', 'MKT_B'], np.ones((2, 4)))
+
+    assert [(r['market_id'], r['recommendation']) for r in results] == [('MKT_A', 'Recycle'), ('MKT_B', 'Recycle')]
+
+
+def test_one_read_scores_all_markets_and_saves_the_best():
+    driver = MarketsGraphDriver(make_twin())
+    repo = BatteryRepository(driver=driver)
+
+    results = repo.evaluate_markets('BAT_1', DecisionEngine(), save=True)
+
+    assert driver.transactions == ['write']
+    assert {result['market_id'] for result in results} == {'MKT_A', 'MKT_B', 'MKT_C'}
+    (write,) = decision_writes(driver)
+    assert write['market_ref'] == '4:m:' + results[0]['market_id']
+    assert write['diagnosis_ref'] == '4:db:1'
+
+
+def test_requested_markets_are_the_only_ones_scored():
+    repo = BatteryRepository(driver=MarketsGraphDriver(make_twin()))
+
+    results = repo.evaluate_markets('BAT_1', DecisionEngine(), market_ids=['MKT_C', 'MKT_X'])
+
+    assert [result['market_id'] for result in results] == ['MKT_C']
+
+
+def test_stale_cached_twin_is_reread_before_the_decision_is_saved():
+    driver = MarketsGraphDriver(make_twin())
+    repo = BatteryRepository(driver=driver, cache=DigitalTwinCache(), markets=registry())
+    repo.evaluate_markets('BAT_1', DecisionEngine())
+    driver.latest_ref = '4:db:2'
+
+    results = repo.evaluate_markets('BAT_1', DecisionEngine(), save=True)
+
+    assert results
+    assert [write['diagnosis_ref'] for write in decision_writes(driver)] == ['4:db:1', '4:db:2']
+    assert repo.cache.twins.get('BAT_1')['diagnosis_ref'] == '4:db:2'
+
+
+def test_async_stale_cached_twin_is_reread_before_the_decision_is_saved():
+    graph = MarketsGraphDriver(make_twin())
+    driver = AsyncFakeDriver(graph._respond)
+    repo = AsyncBatteryRepository(driver, cache=DigitalTwinCache(), markets=registry())
+    asyncio.run(repo.evaluate_markets('BAT_1', DecisionEngine()))
+    graph.latest_ref = '4:db:2'
+
+    results = asyncio.run(repo.evaluate_markets('BAT_1', DecisionEngine(), save=True))
+
+    assert results
+    assert [write['diagnosis_ref'] for write in decision_writes(driver)] == ['4:db:1', '4:db:2']
@@ -0,0 +1,120 @@
+"""Streaming bulk ingest: per-line validation, chunked writes, bounded lines, partial failures."""
+import io
+import json
+
+import pytest
+
+import app as app_module
+from src.ingest import RecordError, ingest_stream, read_lines
+
+
+class RecordingRepository:
+    def __init__(self, fail_on_chunk=None):
+        self.chunks = []
+        self.fail_on_chunk = fail_on_chunk
+
+    def create_battery_records(self, rows):
+        if len(self.chunks) + 1 == self.fail_on_chunk:
+            raise Exception('Database error: connection reset')
+        self.chunks.append([row['battery_id'] for row in rows])
+        return len(rows)
+
+
+def ndjson(*records):
+    return [json.dumps(record) + '\n' for record in records]
+
+
+def row(battery_id, voltage=3.7):
+    return {'battery_id': battery_id, 'voltage': voltage, 'capacity': 50, 'temperature': 25}
+
+
+def test_valid_rows_are_written_in_chunks_and_bad_lines_rejected():
+    lines = ndjson(row('B1'), row('B2'), {'battery_id': 'B3', 'voltage': 'x'}, row('B4')) + ['\n', '{oops\n']
+    repo = RecordingRepository()
+
+    summary = ingest_stream(lines, repo, chunk_size=2)
+
+    assert repo.chunks == [['B1', 'B2'], ['B4']]
+    assert summary == {
+        'accepted': 3, 'rejected': 2, 'chunks': 2, 'last_line': 4,
+        'errors': [
+            {'line': 3, 'error': 'voltage must be a number'},
+            {'line': 6, 'error': 'Invalid JSON: Expecting property name enclosed in double quotes'},
+        ],
+    }
+
+
+def test_csv_with_header_row():
+    lines = ['battery_id,voltage,capacity,temperature\n', 'B1,3.7,50,25\n', '\n', 'B2,3.6,49,24,extra\n']
+    repo = RecordingRepository()
+
+    summary = ingest_stream(lines, repo, fmt='csv')
+
+    assert repo.chunks == [['B1']]
+    assert summary['errors'] == [{'line': 4, 'error': 'Too many columns'}]
+
+
+def test_a_failed_chunk_stops_and_reports_the_resume_point():
+    lines = ndjson(*[row(f'B{i}') for i in range(1, 8)])
+    repo = RecordingRepository(fail_on_chunk=2)
+
+    summary = ingest_stream(lines, repo, chunk_size=3)
+
+    assert repo.chunks == [['B1', 'B2', 'B3']]
+    assert summary['accepted'] == 3 and summary['last_line'] == 3
+    assert summary['failed_line'] == 4
+    assert summary['error'] == 'Database error: connection reset'
+
+
+def test_read_lines_rejects_overlong_lines_without_buffering_them():
+    stream = io.BytesIO(b'short\n' + b'x' * 50 + b'\n' + b'tail')
+
+    lines = list(read_lines(stream, max_length=10))
+
+    assert lines[0] == b'short\n' and lines[2] == b'tail'
+    assert isinstance(lines[1], RecordError)
+    assert str(lines[1]) == 'Line longer than 10 bytes'
+
+
+def test_overlong_lines_count_as_rejected_input_lines():
+    body = (json.dumps(row('B1')) + '\n' + '{"battery_id": "' + 'y' * 200 + '"}\n'
+            + json.dumps(row('B2')) + '\n').encode()
+    repo = RecordingRepository()
+
+    summary = ingest_stream(read_lines(io.BytesIO(body), max_length=100), repo)
+
+    assert repo.chunks == [['B1', 'B2']]
+    assert summary['errors'] == [{'line': 2, 'error': 'Line longer than 100 bytes'}]
+    assert summary['last_line'] == 3
+
+
+@pytest.fixture
+def bulk_client(monkeypatch):
+    def use(repo):
+        monkeypatch.setattr(app_module, 'get_repository', lambda *args, **kwargs: repo)
+        return app_module.app.test_client()
+    return use
+
+
+def test_bulk_route_returns_the_partial_summary_on_a_database_error(bulk_client, monkeypatch):
+    monkeypatch.setattr(app_module, 'INGEST_CHUNK_SIZE', 2)
+    client = bulk_client(RecordingRepository(fail_on_chunk=2))
+
+    response = client.post('/garagist/battery/bulk', data=''.join(ndjson(*[row(f'B{i}') for i in range(5)])),
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 500
+    body = response.get_json()
+    assert (body['accepted'], body['last_line'], body['failed_line']) == (2, 2, 3)
+
+
+def test_bulk_route_reads_csv_by_content_type(bulk_client):
+    repo = RecordingRepository()
+    client = bulk_client(repo)
+
+    response = client.post('/garagist/battery/bulk', data='battery_id,voltage,capacity,temperature\nB1,3.7,50,25\n',
+                           content_type='text/csv')
+
+    assert response.status_code == 200
+    assert repo.chunks == [['B1']]
+    assert client.post('/garagist/battery/bulk?format=xml', data='').status_code == 400
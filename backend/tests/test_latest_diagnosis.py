@@ -0,0 +1,58 @@
+"""Reads follow the maintained LATEST_DIAGNOSIS pointer; maintenance commands report on it."""
+import pytest
+
+from src.database import maintenance
+from src.database.repository import BatteryRepository
+from src.engine.decision import DecisionEngine
+from tests.fakes import FakeDriver
+
+
+def run_all_reads(driver):
+    repo = BatteryRepository(driver=driver)
+    repo.get_digital_twin('BAT_1')
+    repo.get_digital_twins(['BAT_1'])
+    repo.evaluate_and_save_decision('BAT_1', DecisionEngine())
+    return [query for query, _ in driver.queries]
+
+
+def test_twin_reads_use_the_pointer_instead_of_sorting_history():
+    for query in run_all_reads(FakeDriver()):
+        assert '[:LATEST_DIAGNOSIS]' in query
+        assert 'UNDERWENT_DIAGNOSIS' not in query
+        assert 'ORDER BY d.date' not in query
+
+
+def test_add_sorting_diagnosis_moves_the_pointer_in_the_same_write():
+    driver = FakeDriver(lambda query, params: [{'diagnosis_ref': '4:db:12'}])
+
+    ref = BatteryRepository(driver=driver).add_sorting_diagnosis('BAT_1', {'soh_percent': 88.0})
+
+    assert ref == '4:db:12'
+    assert driver.transactions == ['write']
+    query, params = driver.queries[0]
+    assert 'CREATE (b)-[:UNDERWENT_DIAGNOSIS]->(d)' in query
+    assert 'CREATE (b)-[:LATEST_DIAGNOSIS]->(d)' in query
+    assert params == {'bat_id': 'BAT_1', 'props': {'soh_percent': 88.0}}
+
+
+@pytest.mark.parametrize('problems, exit_code', [
+    ([], 0),
+    ([{'battery_id': 'BAT_1', 'problem': 'STALE_POINTER', 'pointers': 1}], 1),
+])
+def test_check_command_exit_code(monkeypatch, capsys, problems, exit_code):
+    monkeypatch.setattr(maintenance, 'get_driver', lambda *args, **kwargs: FakeDriver())
+    monkeypatch.setattr(maintenance, 'close_driver', lambda: None)
+    monkeypatch.setattr(maintenance, 'check_latest_diagnosis', lambda driver, database: problems)
+
+    assert maintenance.main(['check-latest-diagnosis']) == exit_code
+    if problems:
+        assert 'BAT_1: STALE_POINTER' in capsys.readouterr().out
+
+
+def test_backfill_runs_in_batched_auto_commit_transactions():
+    driver = FakeDriver(lambda query, params: [{'processed': 3}])
+
+    assert maintenance.backfill_latest_diagnosis(driver, batch_size=50) == 3
+    assert driver.transactions == ['auto']
+    query, params = driver.queries[0]
+    assert 'IN TRANSACTIONS OF $batch_size ROWS' in query and params == {'batch_size': 50}
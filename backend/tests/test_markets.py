@@ -0,0 +1,60 @@
+"""MarketRegistry: configs served from memory, refreshed on a fingerprint change."""
+from src.database.markets import MarketRegistry
+from src.database.repository import BatteryRepository
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import make_twin
+
+
+def markets_driver(rows):
+    return FakeDriver(lambda query, params: rows if 'MATCH (m:MarketConfig)' in query else [])
+
+
+def market_row(market_id, **weights):
+    return {'id': market_id, 'market': dict(id=market_id, **weights), 'market_ref': '4:m:' + market_id}
+
+
+def test_registry_serves_configs_and_weights_from_memory():
+    registry = MarketRegistry()
+    registry.refresh(markets_driver([market_row('MKT_A', weight_reuse=0.5), market_row('MKT_B')]))
+
+    assert registry.has('MKT_A') and not registry.has('MKT_X')
+    assert registry.get('MKT_A') == {'market': {'id': 'MKT_A', 'weight_reuse': 0.5}, 'market_ref': '4:m:MKT_A'}
+    assert registry.get('MKT_X') is None
+    assert registry.snapshot.weights.tolist() == [[0.5, 1.0, 1.0, 1.0], [1.0, 1.0, 1.0, 1.0]]
+
+
+def test_snapshot_is_only_swapped_when_the_fingerprint_changes():
+    rows = [market_row('MKT_A')]
+    driver = markets_driver(rows)
+    registry = MarketRegistry()
+
+    assert registry.refresh(driver) is True
+    snapshot = registry.snapshot
+    assert registry.refresh(driver) is False
+    assert registry.snapshot is snapshot
+
+    rows[0] = market_row('MKT_A', weight_recycle=2.0)
+    assert registry.refresh(driver) is True
+    assert registry.get('MKT_A')['market']['weight_recycle'] == 2.0
+
+
+def test_ensure_fresh_waits_for_the_refresh_interval():
+    driver = markets_driver([market_row('MKT_A')])
+    registry = MarketRegistry(refresh_interval=3600)
+
+    registry.ensure_fresh(driver)
+    registry.ensure_fresh(driver)
+    assert len(driver.queries) == 1
+
+
+def test_repository_reads_only_the_battery_when_the_market_is_registered():
+    registry = MarketRegistry()
+    registry.refresh(markets_driver([market_row('MKT_A', weight_reuse=0.5)]))
+    twin = make_twin()
+    driver = FakeDriver(lambda query, params: [{'digital_twin': twin, 'diagnosis_ref': '4:d:1'}])
+
+    result = BatteryRepository(driver=driver, markets=registry).get_digital_twin('BAT_1', 'MKT_A')
+
+    assert result['market'] == {'id': 'MKT_A', 'weight_reuse': 0.5}
+    query, params = driver.queries[0]
+    assert 'MarketConfig' not in query and params == {'bat_id': 'BAT_1'}
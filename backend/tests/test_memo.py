@@ -0,0 +1,59 @@
+"""DecisionMemo: memoized scores are exactly the scores the matrix would produce."""
+import pytest
+
+from src.engine.decision import DecisionEngine
+from src.engine.memo import DecisionMemo
+from tests.test_evaluate_batch import TWINS, make_twin
+
+
+def memo_engine():
+    return DecisionEngine(memo=DecisionMemo(max_entries=64))
+
+
+def test_memoized_results_equal_fresh_results():
+    engine, plain = memo_engine(), DecisionEngine()
+
+    for _ in range(2):
+        assert [engine.evaluate_battery(t) for t in TWINS] == [plain.evaluate_battery(t) for t in TWINS]
+    assert engine.memo.stats()['hits'] > 0
+
+
+def test_a_hit_skips_matrix_construction(monkeypatch):
+    engine = memo_engine()
+    twin = make_twin()
+    expected = engine.evaluate_battery(twin)
+
+    def fail(*args):
+        raise AssertionError('matrix built on a memo hit')
+
+    monkeypatch.setattr(engine, '_build_ponderation_matrix', fail)
+    assert engine.evaluate_battery(twin) == expected
+
+
+def test_age_is_bucketed_so_dates_share_a_key():
+    engine = memo_engine()
+    engine.evaluate_battery(make_twin(passport={'date_placing_market': '2024-01-10'}))
+    engine.evaluate_battery(make_twin(passport={'date_placing_market': '2024-02-20'}))
+
+    assert engine.memo.stats()['hits'] == 1
+
+
+@pytest.mark.parametrize('warm, probe', [
+    ('Remanufacturing line B', 'remanufacturability unknown'),  # probe has no engine keyword
+    ('remanufacture ready', 'Remanufacturing line B'),
+    ('REPURPOSE only', 'repurpose and remanufacture'),
+])
+def test_intent_shares_keys_only_with_identical_engine_weights(warm, probe):
+    engine, plain = memo_engine(), DecisionEngine()
+    engine.evaluate_battery(make_twin(passport={'potentials_repurposing_remanufacturing': warm}))
+    twin = make_twin(passport={'potentials_repurposing_remanufacturing': probe})
+
+    assert engine.evaluate_battery(twin) == plain.evaluate_battery(twin)
+
+
+def test_market_weights_are_part_of_the_key():
+    engine = memo_engine()
+    low = engine.evaluate_battery(make_twin(market={'weight_reuse': 0.1}))
+    high = engine.evaluate_battery(make_twin(market={'weight_reuse': 2.0}))
+
+    assert low['scores']['Reuse'] < high['scores']['Reuse']
@@ -0,0 +1,91 @@
+"""Metrics: histogram/counter exposition, stage timers and the /metrics endpoint."""
+import pytest
+
+import app as app_module
+from src.engine.decision import DecisionEngine
+from src.metrics import Counter, Histogram, MetricsRegistry, metrics
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import TWINS, make_twin
+from tests.test_recycler_batch import use_repository
+
+
+def observations(histogram, *labels):
+    series = histogram._series.get(labels)
+    return sum(series[:-1]) if series else 0
+
+
+@pytest.fixture
+def fresh_stages(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    stages = Histogram('engine_stage_seconds', 'test', ['stage'])
+    monkeypatch.setattr(metrics, 'engine_stage_seconds', stages)
+    return stages
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    histogram = Histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0))
+    histogram.observe(('/a',), 0.05)
+    histogram.observe(('/a',), 5.0)
+    counter = Counter('events_total', 'Events', [])
+    counter.inc(())
+
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 1',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 2',
+        'latency_seconds_sum{route="/a"} 5.05',
+        'latency_seconds_count{route="/a"} 2',
+    ]
+    assert counter.render()[2:] == ['events_total 1']
+
+
+def test_disabled_registry_observes_nothing():
+    registry = MetricsRegistry(enabled=False)
+
+    @registry.timed('engine_stage_seconds', 'stage')
+    def work():
+        return 42
+
+    assert work() == 42
+    with registry.timer('engine_stage_seconds', 'block'):
+        pass
+    assert registry.engine_stage_seconds._series == {}
+
+
+def test_batch_stages_are_timed_once_per_batch(fresh_stages):
+    DecisionEngine().evaluate_batch(TWINS * 10)
+
+    assert observations(fresh_stages, 'kill_switch') == 1
+    assert observations(fresh_stages, 'extract_attributes') == 1
+    assert observations(fresh_stages, 'evaluate_batch') == 1
+
+
+def test_single_evaluation_times_each_stage(fresh_stages):
+    DecisionEngine().evaluate_battery(make_twin())
+
+    for stage in ('kill_switch', 'extract_attributes', 'build_ponderation_matrix',
+                  'calculate_scores', 'market_weights'):
+        assert observations(fresh_stages, stage) == 1, stage
+
+
+def test_pool_wait_is_observed_once_per_transaction():
+    registry = MetricsRegistry()
+    session = registry.instrument_session(FakeDriver().session())
+
+    with session:
+        assert session.execute_read(lambda tx, value: value, 7) == 7
+    assert observations(registry.neo4j_pool_wait_seconds, 'read') == 1
+
+
+def test_metrics_endpoint_counts_requests_and_batch_fallbacks(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    fallbacks = Counter('engine_batch_fallbacks_total', 'test', [])
+    monkeypatch.setattr(metrics, 'engine_batch_fallbacks_total', fallbacks)
+    use_repository(monkeypatch, {'BAT_BAD': make_twin(passport={'chemistry': 42})})
+    client = app_module.app.test_client()
+
+    client.post('/recycler/evaluate/batch', json={'ids': ['BAT_BAD']})
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert 'engine_batch_fallbacks_total 1' in body
+    assert 'http_requests_total{route="/recycler/evaluate/batch",method="POST",status="200"}' in body
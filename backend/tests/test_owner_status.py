@@ -0,0 +1,186 @@
+"""Owner-status read model: kept current by repository writes, read through on a miss, versioned."""
+import json
+
+import pytest
+
+import app as app_module
+from src.database.owner_status import OwnerStatusStore
+from src.database.repository import BatteryRepository
+from tests.fakes import FakeDriver
+
+
+def status(battery_id='BAT_1', voltage=3.7, battery_status='original', version=1):
+    return {'battery_id': battery_id, 'status': battery_status, 'voltage': voltage,
+            'capacity': 50, 'soh_percent': 90, 'version': version}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OwnerStatusStore(str(tmp_path / 'owner_status.db'))
+
+
+def stored(store, battery_id='BAT_1'):
+    payload, _ = store.get(battery_id)
+    return json.loads(payload) if payload is not None else None
+
+
+class GraphDriver(FakeDriver):
+    """Serves the owner status of known batteries and returns it from status writes."""
+
+    def __init__(self, statuses):
+        super().__init__(self._respond)
+        self.statuses = statuses
+
+    def _respond(self, query, params):
+        if 'p.battery_status = $status' in query:
+            self.statuses[params['bat_id']]['status'] = params['status']
+            self.statuses[params['bat_id']]['version'] += 1
+            return [{'updated_status': params['status'], 'owner_status': self.statuses[params['bat_id']]}]
+        if 'AS owner_status' in query and 'UNWIND' not in query and 'LIMIT $limit' in query:
+            after = params['after_id']
+            return [{'owner_status': s} for i, s in sorted(self.statuses.items()) if i > after][:params['limit']]
+        if 'AS version' in query:
+            found = self.statuses.get(params['battery_id'])
+            return [{'version': found['version']}] if found else []
+        if 'p.soh_percent as soh_percent' in query:
+            found = self.statuses.get(params['battery_id'])
+            return [found] if found else []
+        if 'owner_statuses' in query:
+            return [{'written': len(params['rows']), 'owner_statuses': [
+                status(row['battery_id'], row['voltage']) for row in params['rows']
+            ]}]
+        return []
+
+    def status_reads(self):
+        return sum('p.soh_percent as soh_percent' in query for query, _ in self.queries)
+
+
+def test_payload_is_compact_json_with_the_owner_fields(store):
+    store.put(dict(status(), temperature=20))
+
+    assert store.get('BAT_1') == (
+        b'{"battery_id":"BAT_1","capacity":50,"soh_percent":90,"status":"original","voltage":3.7}\n', 1
+    )
+    assert store.get('BAT_X') == (None, None)
+
+
+def test_status_write_updates_the_store_and_reads_skip_neo4j(store):
+    driver = GraphDriver({'BAT_1': status()})
+    repo = BatteryRepository(driver=driver, owner_status=store)
+
+    assert repo.update_battery_status('BAT_1', 'waste') is True
+    queries = len(driver.queries)
+
+    payload, version = repo.get_battery_status_payload('BAT_1')
+    assert json.loads(payload)['status'] == 'waste' and version == 2
+    assert len(driver.queries) == queries
+
+
+def test_a_battery_missing_from_the_store_is_read_through_once(store):
+    driver = GraphDriver({'BAT_1': status()})
+    repo = BatteryRepository(driver=driver, owner_status=store)
+
+    first = repo.get_battery_status_payload('BAT_1')
+    second = repo.get_battery_status_payload('BAT_1')
+
+    assert first == second == store.get('BAT_1')
+    assert driver.status_reads() == 1
+
+
+def test_a_conditional_lookup_of_a_missing_battery_reads_it_through(store):
+    driver = GraphDriver({'BAT_1': status(version=4)})
+    repo = BatteryRepository(driver=driver, owner_status=store)
+
+    assert repo.get_owner_status_version('BAT_1') == 4
+    assert repo.get_owner_status_version('BAT_1') == 4
+    assert store.get_version('BAT_1') == 4
+    assert driver.status_reads() == 1
+
+
+def test_an_unknown_battery_is_not_stored(store):
+    repo = BatteryRepository(driver=GraphDriver({}), owner_status=store)
+
+    assert repo.get_battery_status_payload('BAT_X') == (None, None)
+    assert repo.get_owner_status_version('BAT_X') is None
+    assert len(store) == 0
+
+
+def test_a_read_through_never_replaces_a_newer_write(store):
+    stale = status(voltage=3.5, version=1)
+    store.put(status(voltage=3.9, version=2))
+
+    store.fill(stale)
+
+    assert stored(store)['voltage'] == 3.9
+
+
+def test_a_lower_version_written_later_does_not_replace_a_newer_payload(store):
+    store.put_many([status(voltage=3.9, version=3)], updated_at=100)
+    # Committed afterwards (later wall clock) by a worker that read version 2
+    store.put_many([status(voltage=3.7, version=2)], updated_at=200)
+
+    assert stored(store)['voltage'] == 3.9
+    assert store.get_version('BAT_1') == 3
+
+    store.put_many([status(voltage=3.8, version=4)], updated_at=50)
+    assert store.get_version('BAT_1') == 4
+
+
+def test_bulk_write_keeps_the_last_row_of_a_repeated_battery(store):
+    driver = GraphDriver({})
+    repo = BatteryRepository(driver=driver, owner_status=store)
+    rows = [
+        {'battery_id': 'BAT_1', 'voltage': 3.6, 'capacity': 50, 'temperature': 20},
+        {'battery_id': 'BAT_2', 'voltage': 3.4, 'capacity': 50, 'temperature': 20},
+        {'battery_id': 'BAT_1', 'voltage': 3.8, 'capacity': 50, 'temperature': 20},
+    ]
+
+    assert repo.create_battery_records(rows) == 3
+    assert stored(store, 'BAT_1')['voltage'] == 3.8
+    assert stored(store, 'BAT_2')['voltage'] == 3.4
+
+
+def test_rebuild_reloads_every_battery_and_drops_deleted_ones(store):
+    store.put(status('BAT_GONE'))
+    driver = GraphDriver({f'BAT_{i}': status(f'BAT_{i}') for i in range(5)})
+
+    assert store.rebuild(driver, page_size=2) == 5
+
+    assert len(store) == 5 and store.get_version('BAT_GONE') is None
+    assert sum('LIMIT $limit' in query for query, _ in driver.queries) == 4
+
+
+def test_rebuild_page_does_not_overwrite_a_write_made_during_the_rebuild(store):
+    driver = GraphDriver({'BAT_1': status(voltage=3.5, version=1)})
+    read_page = store._fetch_page_query
+
+    def page_then_live_write(tx, after_id, limit):
+        statuses = read_page(tx, after_id, limit)
+        if statuses:
+            store.put(status(voltage=3.9, version=2))
+        return statuses
+    store._fetch_page_query = page_then_live_write
+
+    store.rebuild(driver)
+
+    # Kept, and not deleted as unseen by the rebuild
+    assert stored(store)['voltage'] == 3.9
+
+
+def test_owner_route_serves_the_store_without_the_write_buffer_barrier(monkeypatch, store):
+    class Barrier:
+        def barrier(self, battery_id):
+            raise AssertionError('owner read waited on the write buffer')
+
+    store.put(status())
+    repo = BatteryRepository(driver=GraphDriver({}), owner_status=store)
+    monkeypatch.setattr(app_module, 'owner_status_store', store)
+    monkeypatch.setattr(app_module, 'write_buffer', Barrier())
+    monkeypatch.setattr(app_module, 'get_repository', lambda: repo)
+
+    response = app_module.app.test_client().get('/proprietaire/status/BAT_1')
+
+    assert response.status_code == 200
+    assert response.get_data() == store.get('BAT_1')[0]
+    assert response.headers['ETag'] == '"v1"'
+    assert repo.driver.queries == []
@@ -0,0 +1,114 @@
+"""Batch recycler evaluation: one UNWIND read, one batched write, per-item errors."""
+import pytest
+
+import app as app_module
+from src.database.repository import BatteryRepository
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import make_twin
+
+
+class FakeRepository:
+    def __init__(self, twins):
+        self.twins = twins
+        self.saved = None
+
+    def get_digital_twins(self, battery_ids, market_config_id):
+        return {battery_id: self.twins[battery_id] for battery_id in battery_ids if battery_id in self.twins}
+
+    def save_decisions(self, decisions, market_config_id):
+        self.saved = dict(decisions)
+        return {battery_id: 'DEC_' + battery_id for battery_id in decisions}
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+MARKETS = [{'id': 'MKT_STD_2024', 'market': {'id': 'MKT_STD_2024'}, 'market_ref': '4:db:9'}]
+
+
+def market_driver():
+    return FakeDriver(lambda query, params: MARKETS if 'MATCH (m:MarketConfig)' in query else [])
+
+
+def use_repository(monkeypatch, twins):
+    repo = FakeRepository(twins)
+    monkeypatch.setattr(app_module, 'get_repository', lambda *args, **kwargs: repo)
+    # The market registry loads from this driver instead of Neo4j
+    monkeypatch.setattr(app_module, 'get_driver', lambda *args, **kwargs: market_driver())
+    monkeypatch.setattr(app_module.market_registry, '_checked_at', None)
+    return repo
+
+
+def test_get_digital_twins_is_one_unwind_read():
+    twin = make_twin(battery_id='BAT_1')
+    driver = FakeDriver(lambda query, params: [{'digital_twin': twin}])
+    repo = BatteryRepository(driver=driver)
+
+    assert repo.get_digital_twins(['BAT_1', 'BAT_X'], 'MKT_1') == {'BAT_1': twin}
+    assert driver.transactions == ['read']
+    query, params = driver.queries[0]
+    assert 'UNWIND $bat_ids' in query
+    assert params == {'bat_ids': ['BAT_1', 'BAT_X'], 'mkt_id': 'MKT_1'}
+
+
+def test_save_decisions_is_one_write_and_skips_empty_batches():
+    driver = FakeDriver(lambda query, params: [
+        {'battery_id': row['bat_id'], 'decision_id': 'DEC_' + row['bat_id']} for row in params['rows']
+    ])
+    repo = BatteryRepository(driver=driver)
+    result = {'recommendation': 'Reuse', 'reason': 'r', 'scores': {'Reuse': 80.0}}
+
+    assert repo.save_decisions({}, 'MKT_1') == {}
+    assert driver.transactions == []
+    assert repo.save_decisions({'BAT_1': result, 'BAT_2': result}, 'MKT_1') == {
+        'BAT_1': 'DEC_BAT_1', 'BAT_2': 'DEC_BAT_2'
+    }
+    assert driver.transactions == ['write']
+    rows = driver.queries[0][1]['rows']
+    assert [row['bat_id'] for row in rows] == ['BAT_1', 'BAT_2']
+    assert rows[0]['score_reuse'] == 80.0 and rows[0]['score_recycle'] == 0
+
+
+def test_batch_reports_unknown_ids_and_dedupes(client, monkeypatch):
+    repo = use_repository(monkeypatch, {'BAT_1': make_twin(battery_id='BAT_1')})
+
+    response = client.post('/recycler/evaluate/batch', json={'ids': ['BAT_1', 'BAT_X', 'BAT_1']})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [item['id'] for item in body['results']] == ['BAT_1']
+    assert body['errors'] == [{'id': 'BAT_X', 'error': 'Battery not found'}]
+    assert list(repo.saved) == ['BAT_1']
+
+
+def test_a_twin_that_cannot_be_scored_fails_alone(client, monkeypatch, caplog):
+    broken = make_twin(battery_id='BAT_BAD', passport={'chemistry': 42})
+    repo = use_repository(monkeypatch, {'BAT_1': make_twin(battery_id='BAT_1'), 'BAT_BAD': broken})
+
+    response = client.post('/recycler/evaluate/batch', json={'ids': ['BAT_1', 'BAT_BAD']})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [item['id'] for item in body['results']] == ['BAT_1']
+    assert body['errors'][0]['id'] == 'BAT_BAD'
+    assert body['errors'][0]['error'].startswith('Evaluation failed:')
+    assert list(repo.saved) == ['BAT_1']
+    assert 'Batch evaluation of 2 twins failed' in caplog.text
+
+
+@pytest.mark.parametrize('payload', [{}, {'ids': []}, {'ids': 'BAT_1'}, {'ids': [1, 2]}])
+def test_batch_rejects_invalid_id_lists(client, monkeypatch, payload):
+    use_repository(monkeypatch, {})
+    assert client.post('/recycler/evaluate/batch', json=payload).status_code == 400
+
+
+def test_unknown_market_is_rejected_before_reading_batteries(client, monkeypatch):
+    repo = use_repository(monkeypatch, {'BAT_1': make_twin(battery_id='BAT_1')})
+    repo.get_digital_twins = None  # any read would fail
+
+    response = client.post('/recycler/evaluate/batch', json={'ids': ['BAT_1'], 'market_id': 'MKT_NOPE'})
+
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Market config not found'}
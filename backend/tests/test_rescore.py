@@ -0,0 +1,268 @@
+"""Checkpointed fleet re-scoring: paging, resume, restart, at-least-once and per-twin failures."""
+import pytest
+
+from benchmarks.memory_repository import InMemoryBatteryRepository
+from benchmarks.twins import MARKETS
+from src import rescore
+from src.database.repository import BatteryRepository
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import make_twin
+
+MARKET = 'MKT_STD_2024'
+
+
+def fleet(size):
+    return [make_twin(battery_id=f'BAT_{i:03d}') for i in range(size)]
+
+
+def quiet(line):
+    pass
+
+
+class CrashingRepository(InMemoryBatteryRepository):
+    """Raises KeyboardInterrupt on the n-th save_decisions call, before writing."""
+
+    def __init__(self, twins, crash_on_save=None):
+        super().__init__(twins, MARKETS)
+        self.crash_on_save = crash_on_save
+        self.saves = 0
+
+    def save_decisions(self, decisions, market_config_id="MKT_STD_2024"):
+        self.saves += 1
+        if self.saves == self.crash_on_save:
+            raise KeyboardInterrupt
+        return super().save_decisions(decisions, market_config_id)
+
+
+class CrashingCheckpoint(rescore.Checkpoint):
+    """Raises KeyboardInterrupt on the n-th save, i.e. after that page was committed."""
+
+    def __init__(self, path, crash_on_save):
+        super().__init__(path)
+        self.crash_on_save = crash_on_save
+        self.saves = 0
+
+    def save(self, state):
+        self.saves += 1
+        if self.saves == self.crash_on_save:
+            raise KeyboardInterrupt
+        super().save(state)
+
+
+def scored_ids(repo):
+    return [battery_id for _, battery_id, _, _ in repo.decisions]
+
+
+def test_every_battery_is_scored_once_page_by_page(tmp_path):
+    repo = CrashingRepository(fleet(7))
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+
+    summary = rescore.rescore_fleet(repo, MARKET, page_size=3, checkpoint=checkpoint, report=quiet)
+
+    assert (summary['processed'], summary['pages'], summary['failed']) == (7, 3, [])
+    assert scored_ids(repo) == [f'BAT_{i:03d}' for i in range(7)]
+    state = checkpoint.load()
+    assert state['completed'] and state['last_id'] == 'BAT_006' and state['processed'] == 7
+
+
+def test_an_interrupted_run_resumes_after_the_last_committed_page(tmp_path):
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    repo = CrashingRepository(fleet(7), crash_on_save=2)
+
+    with pytest.raises(KeyboardInterrupt):
+        rescore.rescore_fleet(repo, MARKET, page_size=3, checkpoint=checkpoint, report=quiet)
+    assert checkpoint.load()['last_id'] == 'BAT_002'
+
+    repo.crash_on_save = None
+    summary = rescore.rescore_fleet(repo, MARKET, page_size=3, checkpoint=checkpoint, report=quiet)
+
+    assert summary['resumed_from'] == 'BAT_002'
+    assert summary['processed'] == 4
+    assert scored_ids(repo) == [f'BAT_{i:03d}' for i in range(7)]
+    assert checkpoint.load()['processed'] == 7
+
+
+def test_a_page_committed_before_its_checkpoint_is_scored_again(tmp_path):
+    repo = CrashingRepository(fleet(6))
+    path = str(tmp_path / 'rescore.json')
+
+    with pytest.raises(KeyboardInterrupt):
+        rescore.rescore_fleet(repo, MARKET, page_size=3, checkpoint=CrashingCheckpoint(path, 2), report=quiet)
+    rescore.rescore_fleet(repo, MARKET, page_size=3, checkpoint=rescore.Checkpoint(path), report=quiet)
+
+    # At-least-once: the second page got one extra Decision, no battery was skipped
+    ids = scored_ids(repo)
+    assert sorted(set(ids)) == [f'BAT_{i:03d}' for i in range(6)]
+    assert [ids.count(f'BAT_{i:03d}') for i in range(6)] == [1, 1, 1, 2, 2, 2]
+
+
+def test_restart_ignores_an_unfinished_checkpoint(tmp_path):
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    repo = CrashingRepository(fleet(4), crash_on_save=2)
+    with pytest.raises(KeyboardInterrupt):
+        rescore.rescore_fleet(repo, MARKET, page_size=2, checkpoint=checkpoint, report=quiet)
+
+    repo.crash_on_save = None
+    summary = rescore.rescore_fleet(repo, MARKET, page_size=2, checkpoint=checkpoint, restart=True, report=quiet)
+
+    assert summary['resumed_from'] is None
+    assert summary['processed'] == 4
+
+
+def test_resume_is_refused_for_another_market_or_other_rules(tmp_path):
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    base = {'market_id': MARKET, 'last_id': 'BAT_001', 'processed': 2, 'failed': [], 'completed': False}
+    repo = CrashingRepository(fleet(4))
+
+    checkpoint.save(dict(base, rules_version=rescore.DecisionEngine().rules_version, market_id='MKT_OTHER'))
+    with pytest.raises(ValueError, match='market'):
+        rescore.rescore_fleet(repo, MARKET, checkpoint=checkpoint, report=quiet)
+
+    checkpoint.save(dict(base, rules_version='stale'))
+    with pytest.raises(ValueError, match='BusinessRules'):
+        rescore.rescore_fleet(repo, MARKET, checkpoint=checkpoint, report=quiet)
+    assert repo.decisions == []
+
+
+def test_a_twin_the_engine_cannot_score_is_skipped_and_recorded(tmp_path):
+    twins = fleet(6)
+    twins[1]['passport']['chemistry'] = 42
+    repo = CrashingRepository(twins)
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    lines = []
+
+    summary = rescore.rescore_fleet(repo, MARKET, page_size=3, checkpoint=checkpoint, report=lines.append)
+
+    assert summary['failed'] == ['BAT_001']
+    assert summary['pages'] == 2
+    assert scored_ids(repo) == ['BAT_000', 'BAT_002', 'BAT_003', 'BAT_004', 'BAT_005']
+    assert checkpoint.load()['failed'] == ['BAT_001']
+    assert any('could not be scored: BAT_001' in line for line in lines)
+
+
+def test_failed_ids_survive_a_resume(tmp_path):
+    twins = fleet(4)
+    twins[0]['passport']['chemistry'] = 42
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    repo = CrashingRepository(twins, crash_on_save=2)
+    with pytest.raises(KeyboardInterrupt):
+        rescore.rescore_fleet(repo, MARKET, page_size=2, checkpoint=checkpoint, report=quiet)
+
+    repo.crash_on_save = None
+    summary = rescore.rescore_fleet(repo, MARKET, page_size=2, checkpoint=checkpoint, report=quiet)
+
+    assert summary['failed'] == ['BAT_000']
+
+
+def test_process_pool_scoring_matches_in_process_scoring():
+    twins = fleet(5)
+    twins[3]['passport']['chemistry'] = 42
+    in_process, pooled = CrashingRepository(twins), CrashingRepository(twins)
+
+    rescore.rescore_fleet(in_process, MARKET, page_size=5, report=quiet)
+    summary = rescore.rescore_fleet(pooled, MARKET, workers=2, page_size=5, report=quiet)
+
+    assert summary['failed'] == ['BAT_003']
+    assert [d[1:] for d in pooled.decisions] == [d[1:] for d in in_process.decisions]
+
+
+def test_repository_page_is_a_keyset_read():
+    driver = FakeDriver(lambda query, params: [{'digital_twin': make_twin(battery_id='BAT_005')}])
+    repo = BatteryRepository(driver=driver)
+
+    assert [twin['battery_id'] for twin in repo.get_digital_twin_page('BAT_004', 2, MARKET)] == ['BAT_005']
+    query, params = driver.queries[0]
+    assert 'b.id > $after_id' in query and 'SKIP' not in query
+    assert params == {'after_id': 'BAT_004', 'limit': 2, 'mkt_id': MARKET}
+    assert driver.transactions == ['read']
+
+
+# ========== Incremental runs (inputs watermark) ==========
+
+def incremental(repo, checkpoint, lines=None, **kwargs):
+    return rescore.rescore_fleet(
+        repo, MARKET, page_size=2, checkpoint=checkpoint, incremental=True,
+        fingerprint=kwargs.pop('fingerprint', 'fp-1'), report=(lines.append if lines is not None else quiet), **kwargs
+    )
+
+
+def test_incremental_run_only_rescores_batteries_changed_since_the_watermark(tmp_path):
+    repo = CrashingRepository(fleet(5))
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    lines = []
+
+    assert incremental(repo, checkpoint, lines)['processed'] == 5
+    assert 'no watermark yet' in lines[0]
+    assert checkpoint.load()['watermark']['at']
+
+    assert incremental(repo, checkpoint)['processed'] == 0
+
+    repo.touch_inputs('BAT_003', passport=dict(repo.batteries['BAT_003']['passport'], soh_percent=61.0))
+    summary = incremental(repo, checkpoint)
+    assert summary['processed'] == 1 and summary['since']
+    assert scored_ids(repo)[-1] == 'BAT_003'
+
+
+@pytest.mark.parametrize('change, reason', [
+    ({'fingerprint': 'fp-2'}, 'MarketConfig changed'),
+    ({'rules_version': 'older-rules'}, 'BusinessRules changed'),
+])
+def test_incremental_run_falls_back_to_the_whole_fleet(tmp_path, change, reason):
+    repo = CrashingRepository(fleet(3))
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    incremental(repo, checkpoint)
+    if 'rules_version' in change:
+        state = checkpoint.load()
+        state['watermark']['rules_version'] = change['rules_version']
+        checkpoint.save(state)
+    lines = []
+
+    summary = incremental(repo, checkpoint, lines, fingerprint=change.get('fingerprint', 'fp-1'))
+
+    assert summary['processed'] == 3
+    assert reason in lines[0]
+
+
+def test_an_interrupted_run_keeps_the_previous_watermark(tmp_path):
+    repo = CrashingRepository(fleet(4))
+    checkpoint = rescore.Checkpoint(str(tmp_path / 'rescore.json'))
+    incremental(repo, checkpoint)
+    watermark = checkpoint.load()['watermark']
+
+    repo.crash_on_save = repo.saves + 1
+    with pytest.raises(KeyboardInterrupt):
+        rescore.rescore_fleet(repo, MARKET, page_size=2, checkpoint=checkpoint, restart=True, report=quiet)
+
+    assert checkpoint.load()['watermark'] == watermark
+
+
+def test_market_fingerprint_ignores_property_order():
+    class Registry:
+        def __init__(self, market):
+            self.market = market
+
+        def get(self, market_config_id):
+            return {'market': self.market, 'market_ref': '4:db:9'}
+
+    first = rescore.market_fingerprint(Registry({'id': MARKET, 'weight_reuse': 1.0, 'weight_recycle': 0.8}), MARKET)
+    same = rescore.market_fingerprint(Registry({'weight_recycle': 0.8, 'weight_reuse': 1.0, 'id': MARKET}), MARKET)
+    changed = rescore.market_fingerprint(Registry({'id': MARKET, 'weight_reuse': 1.1, 'weight_recycle': 0.8}), MARKET)
+
+    assert first == same != changed
+
+
+def test_repository_writes_stamp_the_inputs_watermark():
+    driver = FakeDriver(lambda query, params: (
+        [] if 'AS digital_twin' in query else [{'updated_status': 'waste', 'diagnosis_ref': '4:db:1', 'owner_status': None}]
+    ))
+    repo = BatteryRepository(driver=driver)
+
+    repo.update_battery_status('BAT_1', 'waste')
+    repo.add_sorting_diagnosis('BAT_1', {'soh_percent': 80})
+    repo.get_changed_twin_page('2026-01-01T00:00:00Z', 'BAT_0', 10, MARKET)
+
+    status_query, diagnosis_query, page_query = (query for query, _ in driver.queries)
+    assert 'b.inputs_updated_at = datetime()' in status_query
+    assert 'b.inputs_updated_at = datetime()' in diagnosis_query
+    assert 'b.inputs_updated_at > $since' in page_query and 'd.date > $since' in page_query
+    assert driver.queries[2][1] == {'since': '2026-01-01T00:00:00Z', 'after_id': 'BAT_0', 'limit': 10, 'mkt_id': MARKET}
@@ -0,0 +1,114 @@
+"""Versioned rule sets: validation, hot reload into the engine, rule version on decisions."""
+import json
+
+import pytest
+
+from src.database.repository import BatteryRepository
+from src.database.rulesets import RuleSetRegistry, publish_rule_set
+from src.engine.decision import DecisionEngine
+from src.engine.rules import BusinessRules
+from src.engine.rulesets import RuleSet
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import make_twin
+
+
+def write_rules(path, rule_set_id, **rules):
+    path.write_text(json.dumps({'id': rule_set_id, 'rules': rules}))
+
+
+def test_overrides_replace_constants_and_keep_the_defaults():
+    rules = RuleSet('strict', {'MIN_SOH_FOR_REUSE': 95}).build()
+
+    assert rules.MIN_SOH_FOR_REUSE == 95
+    assert rules.MIN_SOH_FOR_REPURPOSE == BusinessRules.MIN_SOH_FOR_REPURPOSE
+    assert type(RuleSet().build()) is BusinessRules
+
+
+@pytest.mark.parametrize('overrides, error', [
+    ({'NOT_A_RULE': 1}, 'Unknown business rule'),
+    ({'MIN_SOH_FOR_REUSE': 'high'}, 'must be a'),
+    ({'MIN_SOH_FOR_REUSE': True}, 'must be a'),
+])
+def test_invalid_overrides_are_refused(overrides, error):
+    with pytest.raises(ValueError, match=error):
+        RuleSet('bad', overrides)
+
+
+def test_registry_installs_a_changed_file_once(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, 'strict-v1', MIN_SOH_FOR_REUSE=95)
+    engine = DecisionEngine()
+    registry = RuleSetRegistry(engine, path=str(path), refresh_interval=0)
+
+    assert registry.refresh() is True
+    compiled = engine.compiled
+    assert registry.refresh() is False
+    assert engine.compiled is compiled
+    assert registry.current() == {
+        'rule_set': 'strict-v1', 'rules_version': compiled.version, 'last_error': None
+    }
+    assert engine.evaluate_battery(make_twin())['rule_set'] == 'strict-v1'
+
+
+def test_an_invalid_rule_set_keeps_the_installed_rules(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, 'strict-v1', MIN_SOH_FOR_REUSE=95)
+    engine = DecisionEngine()
+    registry = RuleSetRegistry(engine, path=str(path), refresh_interval=0)
+    registry.refresh()
+    compiled = engine.compiled
+
+    write_rules(path, 'broken', NOT_A_RULE=1)
+
+    assert registry.refresh() is False
+    assert engine.compiled is compiled
+    assert 'Unknown business rule' in registry.last_error
+
+
+def test_switching_back_reuses_the_compiled_tables(tmp_path):
+    path = tmp_path / 'rules.json'
+    engine = DecisionEngine()
+    registry = RuleSetRegistry(engine, path=str(path), refresh_interval=0)
+    write_rules(path, 'strict-v1', MIN_SOH_FOR_REUSE=95)
+    registry.refresh()
+    strict = engine.compiled
+
+    write_rules(path, 'loose-v1', MIN_SOH_FOR_REUSE=80)
+    registry.refresh()
+    write_rules(path, 'strict-v1', MIN_SOH_FOR_REUSE=95)
+    registry.refresh()
+
+    assert engine.compiled is strict
+
+
+def test_registry_reads_the_active_rule_set_node():
+    driver = FakeDriver(lambda query, params: [
+        {'id': 'graph-v2', 'rules': json.dumps({'MIN_SOH_FOR_REUSE': 97})}
+    ])
+    engine = DecisionEngine()
+
+    RuleSetRegistry(engine).refresh(driver)
+
+    assert engine.compiled.rule_set == 'graph-v2'
+    assert engine.rules.MIN_SOH_FOR_REUSE == 97
+    assert driver.transactions == ['read']
+
+
+def test_publishing_an_existing_id_with_other_rules_is_refused():
+    driver = FakeDriver(lambda query, params: [{'rules_version': 'other'}])
+
+    with pytest.raises(ValueError, match='already published'):
+        publish_rule_set(driver, RuleSet('strict-v1', {'MIN_SOH_FOR_REUSE': 95}))
+
+
+def test_decisions_record_the_rule_version_they_were_scored_with():
+    driver = FakeDriver(lambda query, params: [{'battery_id': 'BAT_1', 'decision_id': 'DEC_1'}])
+    repo = BatteryRepository(driver=driver)
+    engine = DecisionEngine(compiled=RuleSet('strict-v1', {'MIN_SOH_FOR_REUSE': 95}).compile())
+    result = engine.evaluate_battery(make_twin())
+
+    repo.save_decisions({'BAT_1': result})
+
+    _, params = driver.queries[-1]
+    assert params['rows'][0]['rules_version'] == engine.rules_version
+    assert params['rows'][0]['rule_set'] == 'strict-v1'
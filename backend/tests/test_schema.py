@@ -0,0 +1,67 @@
+"""Schema bootstrap and the EXPLAIN-based check of every repository query."""
+from types import SimpleNamespace
+
+from src.database import schema
+from tests.fakes import FakeDriver
+
+
+class PlanDriver(FakeDriver):
+    """Answers EXPLAIN with a plan scanning labels for the queries matching `scanning`."""
+
+    def __init__(self, scanning):
+        super().__init__()
+        self.scanning = scanning
+
+    def session(self, database=None):
+        driver = self
+
+        class Session:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def run(self, query, parameters=None):
+                driver.queries.append((query, parameters))
+                leaf = 'NodeByLabelScan@neo4j' if driver.scanning in query else 'NodeIndexSeek@neo4j'
+                plan = {'operatorType': 'ProduceResults@neo4j', 'children': [{'operatorType': leaf}]}
+                return SimpleNamespace(consume=lambda: SimpleNamespace(plan=plan))
+
+        return Session()
+
+
+def test_apply_schema_runs_idempotent_statements():
+    driver = FakeDriver()
+
+    assert schema.apply_schema(driver) == schema.SCHEMA_STATEMENTS
+    assert [query for query, _ in driver.queries] == schema.SCHEMA_STATEMENTS
+    assert all('IF NOT EXISTS' in statement for statement in schema.SCHEMA_STATEMENTS)
+
+
+def test_capture_repository_queries_covers_every_repository_call():
+    captured = schema.capture_repository_queries()
+
+    assert set(captured) == set(schema.REPOSITORY_CALLS)
+    for name, queries in captured.items():
+        assert queries, name
+        assert all(query.strip() for query, _ in queries)
+    # The decision write is reached, not just the twin read
+    assert any('CREATE (dec:Decision' in query for query, _ in captured['evaluate_and_save_decision'])
+
+
+def test_check_query_plans_reports_label_scans():
+    assert schema.check_query_plans(PlanDriver(scanning='NO_SUCH_QUERY')) == []
+
+    problems = schema.check_query_plans(PlanDriver(scanning='MERGE (b:Battery { id: $battery_id })'))
+    assert problems == [{'query_name': 'create_battery_record', 'operator': 'NodeByLabelScan@neo4j'}]
+
+
+def test_decision_ids_cannot_collide_under_the_uniqueness_constraint():
+    creates = [
+        query for queries in schema.capture_repository_queries().values()
+        for query, _ in queries if 'CREATE (dec:Decision' in query
+    ]
+
+    assert creates
+    assert all("+ '_' + randomUUID()" in query for query in creates)
@@ -0,0 +1,170 @@
+"""Append-only telemetry blocks: bulk appends, block reads and bucketed downsampling."""
+import math
+
+import pytest
+
+import app as app_module
+from src.database import schema
+from src.database.repository import BatteryRepository
+from src.database.telemetry import (
+    TELEMETRY_APPEND, TELEMETRY_APPEND_ROW, TELEMETRY_BLOCK_SIZE, downsample, parse_timestamp, unique_rounds
+)
+from tests.fakes import FakeDriver
+
+NAN = float('nan')
+
+
+def block(timestamps, voltage, capacity=None, temperature=None):
+    return {
+        'timestamps': timestamps,
+        'voltage': voltage,
+        'capacity': capacity or [NAN] * len(timestamps),
+        'temperature': temperature or [NAN] * len(timestamps),
+    }
+
+
+def test_duplicate_ids_in_one_chunk_are_written_in_separate_rounds():
+    rows = [
+        {'battery_id': 'BAT_1', 'voltage': 3.6, 'capacity': 50, 'temperature': 20},
+        {'battery_id': 'BAT_2', 'voltage': 3.7, 'capacity': 60, 'temperature': 21},
+        {'battery_id': 'BAT_1', 'voltage': 3.5, 'capacity': 49, 'temperature': 22},
+        {'battery_id': 'BAT_1', 'voltage': 3.4, 'capacity': 48, 'temperature': 23},
+    ]
+    driver = FakeDriver(lambda query, params: [{'written': len(params['rows']), 'owner_statuses': []}])
+
+    assert BatteryRepository(driver=driver).create_battery_records(rows) == 4
+    assert driver.transactions == ['write']
+    batches = [params['rows'] for _, params in driver.queries]
+    assert [[row['voltage'] for row in batch] for batch in batches] == [[3.6, 3.7], [3.5], [3.4]]
+    assert all(params['telemetry_block_size'] == TELEMETRY_BLOCK_SIZE for _, params in driver.queries)
+
+
+def test_unique_rounds_keeps_each_battery_in_input_order():
+    rows = [{'battery_id': 'A', 'n': 1}, {'battery_id': 'A', 'n': 2}, {'battery_id': 'B', 'n': 3}]
+    assert unique_rounds(rows) == [[rows[0], rows[2]], [rows[1]]]
+
+
+def test_bulk_append_reads_the_row_values():
+    assert 'row.voltage' in TELEMETRY_APPEND_ROW and 'b.voltage' not in TELEMETRY_APPEND_ROW
+    assert 'b.voltage' in TELEMETRY_APPEND and 'row.' not in TELEMETRY_APPEND
+
+    driver = FakeDriver(lambda query, params: [{'written': 1, 'owner_statuses': []}])
+    BatteryRepository(driver=driver).create_battery_records(
+        [{'battery_id': 'BAT_1', 'voltage': 3.6, 'capacity': 50, 'temperature': 20}]
+    )
+    assert TELEMETRY_APPEND_ROW in driver.queries[0][0]
+
+
+def test_get_telemetry_blocks_distinguishes_unknown_battery_from_empty_history():
+    blocks = [{'seq': 0, 'timestamps': [1], 'voltage': [3.6], 'capacity': [50.0], 'temperature': [20.0]}]
+    driver = FakeDriver(lambda query, params: (
+        [{'battery_id': params['battery_id'], 'blocks': blocks if params['battery_id'] == 'BAT_1' else []}]
+        if params['battery_id'] != 'BAT_X' else []
+    ))
+    repo = BatteryRepository(driver=driver)
+
+    assert repo.get_telemetry_blocks('BAT_1', 0, 10) == blocks
+    assert repo.get_telemetry_blocks('BAT_2') == []
+    assert repo.get_telemetry_blocks('BAT_X') is None
+    assert driver.queries[0][1] == {'battery_id': 'BAT_1', 'start': 0, 'end': 10}
+
+
+def test_captured_telemetry_read_is_well_typed():
+    captured = schema.capture_repository_queries()['get_telemetry_blocks']
+
+    assert len(captured) == 1
+    assert schema._RecordedRecord()['blocks'] == []
+
+
+def test_downsample_merges_blocks_and_reduces_each_bucket():
+    blocks = [
+        block([30, 40], [4.0, 5.0]),
+        block([0, 10, 20], [1.0, NAN, 3.0]),
+    ]
+
+    result = downsample(blocks, buckets=2)
+
+    assert (result['start'], result['end'], result['bucket_ms'], result['points']) == (0, 40, 21, 5)
+    first, second = result['buckets']
+    assert (first['start'], first['count']) == (0, 3)
+    assert first['voltage'] == {'min': 1.0, 'max': 3.0, 'mean': 2.0}
+    assert first['capacity'] is None
+    assert (second['start'], second['count']) == (21, 2)
+    assert second['voltage'] == {'min': 4.0, 'max': 5.0, 'mean': 4.5}
+
+
+def test_downsample_clips_to_the_requested_range():
+    result = downsample([block([0, 10, 20, 30], [1.0, 2.0, 3.0, 4.0])], start=10, end=20, buckets=1)
+
+    assert result['points'] == 2
+    assert result['buckets'] == [{
+        'start': 10, 'count': 2,
+        'voltage': {'min': 2.0, 'max': 3.0, 'mean': 2.5}, 'capacity': None, 'temperature': None,
+    }]
+
+
+def test_downsample_of_an_empty_range():
+    assert downsample([], start=5, end=6) == {'start': 5, 'end': 6, 'bucket_ms': None, 'points': 0, 'buckets': []}
+    assert downsample([block([0], [1.0])], start=5)['buckets'] == []
+
+
+def test_downsample_never_exceeds_the_bucket_count():
+    timestamps = list(range(0, 1000, 7))
+    result = downsample([block(timestamps, [float(t) for t in timestamps])], buckets=10)
+
+    assert len(result['buckets']) <= 10
+    assert sum(bucket['count'] for bucket in result['buckets']) == len(timestamps)
+    assert not any(math.isnan(bucket['voltage']['mean']) for bucket in result['buckets'])
+
+
+def test_parse_timestamp_accepts_epoch_ms_and_iso_8601():
+    assert parse_timestamp(None) is None
+    assert parse_timestamp('') is None
+    assert parse_timestamp('1700000000000') == 1700000000000
+    assert parse_timestamp('2024-01-01T00:00:00Z') == 1704067200000
+    assert parse_timestamp('2024-01-01T00:00:00') == 1704067200000
+    with pytest.raises(ValueError):
+        parse_timestamp('yesterday')
+
+
+class TelemetryRepository:
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.calls = []
+
+    def get_telemetry_blocks(self, battery_id, start=None, end=None):
+        self.calls.append((battery_id, start, end))
+        return self.blocks.get(battery_id)
+
+
+@pytest.fixture
+def telemetry_repo(monkeypatch):
+    repo = TelemetryRepository({'BAT_1': [block([0, 10], [3.6, 3.8])]})
+    monkeypatch.setattr(app_module, 'get_repository', lambda *args, **kwargs: repo)
+    return repo
+
+
+def test_telemetry_route_downsamples_the_history(telemetry_repo):
+    client = app_module.app.test_client()
+
+    response = client.get('/garagist/battery/BAT_1/telemetry?start=0&end=10&buckets=1')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['battery_id'] == 'BAT_1'
+    assert body['buckets'][0]['voltage']['mean'] == pytest.approx(3.7)
+    assert telemetry_repo.calls == [('BAT_1', 0, 10)]
+
+
+@pytest.mark.parametrize('query', ['start=soon', 'buckets=0', 'buckets=100000', 'start=10&end=0'])
+def test_telemetry_route_rejects_bad_parameters(telemetry_repo, query):
+    response = app_module.app.test_client().get('/garagist/battery/BAT_1/telemetry?' + query)
+
+    assert response.status_code == 400
+    assert telemetry_repo.calls == []
+
+
+def test_telemetry_route_unknown_battery(telemetry_repo):
+    response = app_module.app.test_client().get('/garagist/battery/BAT_X/telemetry')
+
+    assert response.status_code == 404
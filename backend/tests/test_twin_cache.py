@@ -0,0 +1,107 @@
+"""Read-through digital twin cache, its invalidation and the stale-reference fallback."""
+from src.cache import LRUCache
+from src.database.cache import DigitalTwinCache
+from src.database.repository import BatteryRepository
+from src.engine.decision import DecisionEngine
+from tests.fakes import FakeDriver
+from tests.test_evaluate_batch import make_twin
+
+
+class GraphDriver(FakeDriver):
+    """Serves one twin; Decision writes succeed only while `latest_ref` is its latest diagnosis."""
+
+    def __init__(self, twin):
+        super().__init__(self._respond)
+        self.twin = twin
+        self.latest_ref = '4:db:1'
+
+    def _respond(self, query, params):
+        if 'AS digital_twin' in query:
+            return [{'digital_twin': self.twin, 'diagnosis_ref': self.latest_ref, 'market_ref': '4:db:9'}]
+        if 'CREATE (dec:Decision' in query:
+            return [{'decision_id': 'DEC_1'}] if params['diagnosis_ref'] == self.latest_ref else []
+        if 'RETURN b' in query or 'updated_status' in query:
+            return [{'b': {}, 'updated_status': 'waste', 'owner_status': None}]
+        return []
+
+    def reads(self):
+        return sum('AS digital_twin' in query for query, _ in self.queries)
+
+
+def test_lru_cache_evicts_least_recently_used_and_counts():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.stats() == {
+        'size': 2, 'max_entries': 2, 'ttl_seconds': None,
+        'hits': 1, 'misses': 1, 'evictions': 1, 'expirations': 0,
+    }
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('src.cache.time.monotonic', lambda: now[0])
+    cache = LRUCache(max_entries=4, ttl_seconds=10)
+    cache.put('a', 1)
+    now[0] = 111.0
+
+    assert cache.get('a') is None
+    assert cache.expirations == 1
+
+
+def test_twin_is_read_once_and_markets_are_cached_separately():
+    driver = GraphDriver(make_twin())
+    repo = BatteryRepository(driver=driver, cache=DigitalTwinCache())
+
+    first = repo.get_digital_twin('BAT_1', 'MKT_1')
+    assert repo.get_digital_twin('BAT_1', 'MKT_1') == first
+    assert driver.reads() == 1
+    repo.get_digital_twin('BAT_2', 'MKT_1')
+    assert repo.cache.markets.stats()['hits'] == 1
+
+
+def test_battery_writes_invalidate_the_cached_twin():
+    driver = GraphDriver(make_twin())
+    repo = BatteryRepository(driver=driver, cache=DigitalTwinCache())
+
+    for write in (
+        lambda: repo.update_battery_measurements('BAT_1', voltage=3.7),
+        lambda: repo.create_battery_record('BAT_1', 3.7, 50, 25),
+        lambda: repo.update_battery_status('BAT_1', 'waste'),
+        lambda: repo.add_sorting_diagnosis('BAT_1', {}),
+    ):
+        repo.get_digital_twin('BAT_1', 'MKT_1')
+        write()
+        assert repo.cache.twins.get('BAT_1') is None
+
+
+def test_cached_evaluation_only_writes():
+    driver = GraphDriver(make_twin())
+    repo = BatteryRepository(driver=driver, cache=DigitalTwinCache())
+    repo.get_digital_twin('BAT_1', 'MKT_1')
+
+    assert repo.evaluate_and_save_decision('BAT_1', DecisionEngine(), 'MKT_1')
+    assert driver.reads() == 1
+
+
+def test_stale_cached_diagnosis_falls_back_to_a_fresh_evaluation():
+    stale = make_twin(diagnosis={'soh_percent': 95.0})
+    fresh = make_twin(diagnosis={'soh_percent': 40.0})
+    driver = GraphDriver(stale)
+    repo = BatteryRepository(driver=driver, cache=DigitalTwinCache())
+    repo.get_digital_twin('BAT_1', 'MKT_1')
+    # Another worker records a new diagnosis: this worker's cache is not invalidated
+    driver.twin, driver.latest_ref = fresh, '4:db:2'
+    engine = DecisionEngine()
+
+    result = repo.evaluate_and_save_decision('BAT_1', engine, 'MKT_1')
+
+    assert result == engine.evaluate_battery(fresh)
+    assert driver.reads() == 2
+    writes = [params for query, params in driver.queries if 'CREATE (dec:Decision' in query]
+    assert [params['diagnosis_ref'] for params in writes] == ['4:db:1', '4:db:2']
+    assert repo.cache.twins.get('BAT_1')['diagnosis_ref'] == '4:db:2'
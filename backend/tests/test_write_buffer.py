@@ -0,0 +1,152 @@
+"""Write-behind buffer for garagist PATCHes: coalescing, requeue on failure, drain on close."""
+import time
+
+import pytest
+
+import app as app_module
+from src.database.repository import BatteryRepository
+from src.database.write_buffer import MeasurementWriteBuffer
+from tests.fakes import FakeDriver
+
+
+class Sink:
+    """flush_fn recording each batch; fails while `failing` is set."""
+
+    def __init__(self):
+        self.batches = []
+        self.failing = False
+
+    def __call__(self, updates):
+        if self.failing:
+            raise RuntimeError("neo4j unavailable")
+        self.batches.append(updates)
+
+
+@pytest.fixture
+def sink():
+    return Sink()
+
+
+@pytest.fixture
+def buffer(sink):
+    # Long interval: only explicit flushes, barriers and close() write
+    write_buffer = MeasurementWriteBuffer(sink, flush_interval=3600, max_pending=100)
+    yield write_buffer
+    sink.failing = False
+    write_buffer.close()
+
+
+def test_updates_of_one_battery_are_coalesced_last_value_wins(buffer, sink):
+    buffer.submit('BAT_1', voltage=3.6, capacity=50)
+    buffer.submit('BAT_1', voltage=3.7)
+    buffer.submit('BAT_2', temperature=21)
+
+    assert buffer.flush() == 2
+    assert sink.batches == [{'BAT_1': {'voltage': 3.7, 'capacity': 50}, 'BAT_2': {'temperature': 21}}]
+    assert buffer.stats()['coalesced_updates'] == 1
+    assert buffer.flush() == 0
+
+
+def test_submit_rejects_empty_and_unknown_fields(buffer):
+    with pytest.raises(ValueError):
+        buffer.submit('BAT_1', voltage=None)
+    with pytest.raises(ValueError):
+        buffer.submit('BAT_1', pressure=1)
+
+
+def test_failed_flush_requeues_without_overwriting_newer_values(buffer, sink):
+    buffer.submit('BAT_1', voltage=3.6, capacity=50)
+    sink.failing = True
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    buffer.submit('BAT_1', voltage=3.9)
+
+    sink.failing = False
+    assert buffer.flush() == 1
+    assert sink.batches == [{'BAT_1': {'voltage': 3.9, 'capacity': 50}}]
+    assert buffer.stats()['failed_flushes'] == 1
+
+
+def test_barrier_only_writes_when_the_battery_is_pending(buffer, sink):
+    buffer.barrier('BAT_1')
+    assert sink.batches == []
+
+    buffer.submit('BAT_1', voltage=3.6)
+    buffer.barrier('BAT_1')
+    assert sink.batches == [{'BAT_1': {'voltage': 3.6}}]
+
+
+def test_close_drains_pending_updates_and_refuses_new_ones(sink):
+    write_buffer = MeasurementWriteBuffer(sink, flush_interval=3600)
+    write_buffer.submit('BAT_1', voltage=3.6)
+
+    write_buffer.close()
+
+    assert sink.batches == [{'BAT_1': {'voltage': 3.6}}]
+    assert not write_buffer._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        write_buffer.submit('BAT_1', voltage=3.7)
+
+
+def test_max_pending_wakes_the_flusher_early(sink):
+    write_buffer = MeasurementWriteBuffer(sink, flush_interval=3600, max_pending=2)
+    try:
+        write_buffer.submit('BAT_1', voltage=3.6)
+        write_buffer.submit('BAT_2', voltage=3.7)
+        deadline = time.monotonic() + 2
+        while not sink.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sink.batches == [{'BAT_1': {'voltage': 3.6}, 'BAT_2': {'voltage': 3.7}}]
+    finally:
+        write_buffer.close()
+
+
+def test_batch_update_is_one_write_and_reports_existing_ids():
+    driver = FakeDriver(lambda query, params: [{'owner_status': {'battery_id': 'BAT_1'}}])
+    repo = BatteryRepository(driver=driver)
+
+    assert repo.update_battery_measurements_batch({'BAT_1': {'voltage': 3.6}, 'BAT_X': {'capacity': 1}}) == ['BAT_1']
+    assert driver.transactions == ['write']
+    assert driver.queries[0][1]['rows'] == [
+        {'battery_id': 'BAT_1', 'voltage': 3.6, 'capacity': None, 'temperature': None},
+        {'battery_id': 'BAT_X', 'voltage': None, 'capacity': 1, 'temperature': None},
+    ]
+
+
+class ExistenceRepository:
+    def __init__(self, known):
+        self.known = known
+        self.lookups = []
+
+    def battery_exists(self, battery_id):
+        self.lookups.append(battery_id)
+        return battery_id in self.known
+
+
+@pytest.fixture
+def buffered_app(monkeypatch, buffer):
+    repo = ExistenceRepository({'BAT_1'})
+    monkeypatch.setattr(app_module, 'write_buffer', buffer)
+    monkeypatch.setattr(app_module, 'known_batteries', app_module.LRUCache(max_entries=10))
+    monkeypatch.setattr(app_module, 'get_repository', lambda *args, **kwargs: repo)
+    return repo
+
+
+def test_buffered_patch_is_queued_for_a_known_battery(buffered_app, buffer, sink):
+    client = app_module.app.test_client()
+
+    assert client.patch('/garagist/battery/BAT_1', json={'voltage': 3.6}).status_code == 202
+    assert client.patch('/garagist/battery/BAT_1', json={'voltage': 3.7}).status_code == 202
+
+    # The second PATCH is answered from the known-ID cache
+    assert buffered_app.lookups == ['BAT_1']
+    buffer.flush()
+    assert sink.batches == [{'BAT_1': {'voltage': 3.7}}]
+
+
+def test_buffered_patch_of_an_unknown_battery_is_404(buffered_app, buffer):
+    response = app_module.app.test_client().patch('/garagist/battery/BAT_X', json={'voltage': 3.6})
+
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Battery not found'}
+    assert buffer.stats()['pending'] == 0